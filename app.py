@@ -1,19 +1,45 @@
 import asyncio
+import logging
 import os
-import tempfile
-import threading
-import time
 import re
+import threading
+import bisect
 from typing import List
 
-import edge_tts
+from tkinter import filedialog
 from pyglet.media import load
 from pyglet.media import Player
 
 import file_utils.audio_files
-from config.consts import AUDIO_UPDATE_INTERVAL_MS, PYGLET_AVAILABLE
-from config.settings import load_ui_state, StoredUiState, store_ui_state
+import file_utils.text_files
+from file_utils.temp_files import TempFileJanitor
+from file_utils.time_stretch import NUMPY_AVAILABLE
+from file_utils.playback_speed import StretchedSource, PcmCache, decode_pcm
+from file_utils.peaks import PeakPyramid, peaks_for_audio, silent_peaks
+from file_utils.chunk_polish import ChunkPolisher, POLISH_AVAILABLE
+from file_utils.multi_export import MultiFormatExporter
+from file_utils.word_boundaries import WordBoundaryIndex, LineOffsetMap
+from config.consts import AUDIO_UPDATE_INTERVAL_MS, TEMP_DELETE_RELEASE_DELAY, UI_LAG_REPORT_FILE_NAME
+from config.settings import load_ui_state, StoredUiState, store_ui_state, app_data_dir
+from config.session import StoredSession, load_session, store_session, clear_session
+from diagnostics.ui_lag import UiLagMonitor
 from ui.base import EdgeTTSUi, UIStatusUpdate
+from ui.event_bus import UiEventBus, UiEvent
+from tts.metrics import SynthesisMetrics
+from tts.job_manifest import JobManifest
+from tts.backend import list_voices, run_in_synthesis_loop, submit_to_synthesis_loop, shutdown as shutdown_backend
+from tts.synthesis import generate_job, chunk_text, ChunkSynthesisError
+from tts.job_queue import JobQueue, STATUS_QUEUED, STATUS_RUNNING
+from tts.speculation import Speculator, InputSnapshot
+from tts.chunk_planner import ChunkPlanner
+from tts.voice_preview import VoicePreviewer, VoicePreviewCache
+from tts.chapters import ChapterExporter, detect_chapters
+from tts.dialogue import Segment, VoiceScript, parse_speaker_voices, parse_script, is_dialogue, plan_voice_scripts, \
+    generate_dialogue
+from ui.queue_panel import QueuePanel
+from ui.export_dialog import ExportFormatsDialog
+
+log = logging.getLogger(__name__)
 
 
 # --- Main Application ---
@@ -24,19 +50,21 @@ class EdgeTTSApp():
     Follows system theme initially, with a toggle override.
     Includes Textbox placeholder simulation.
     """
-    def __init__(self):
+    def __init__(self, ui_lag_report: str | None = None):
+        # Temp file cleanup runs in the background, job files left by crashed sessions are swept below
+        self.janitor = TempFileJanitor()
+
         # Initialize Audio Player
 
         self.player: Player | None = None
         self.pyglet_initialized: bool = False
-        if PYGLET_AVAILABLE:
-            try:
-                self.reinitialize_player()
-                self.pyglet_initialized = True
-                print("INFO: pyglet initialized successfully.")
-            except Exception as e:
-                print(f"ERROR: Failed to initialize pyglet: {e}")
-                self.pyglet_initialized = False
+        try:
+            self.reinitialize_player()
+            self.pyglet_initialized = True
+            log.info("pyglet initialized successfully.")
+        except Exception as e:
+            log.error("Failed to initialize pyglet: %s", e)
+            self.pyglet_initialized = False
 
 
         # Application State
@@ -47,14 +75,88 @@ class EdgeTTSApp():
         self._slider_being_dragged: bool = False # Flag if user is dragging the progress slider
         self.currently_playing_file_index = 0 # Index of the currently playing file in audio_file_path
         self.last_index = -1
+        self.word_indexes: list[WordBoundaryIndex] = [] # Word boundary index per entry in audio_file_path
+        self._chunk_text_starts: list[int] = [] # First text offset of each chunk, for click-to-seek
+        self._audio_sources: dict[str, object] = {} # Chunk file -> decoded pyglet source, shared by repeated chunks
+        self._pcm = PcmCache() # Decoded samples of the chunks playing (or about to) at another speed
+        self.playback_speed = 1.0 # Local tempo change, applied by time-stretching the generated audio
+        self.peaks: PeakPyramid | None = None # Waveform overview of all loaded chunks, built as they arrive
+        self._chunk_peak_starts: list[int] = [] # First peak bucket of each chunk, for seeking on the overview
+        self.text_line_map: LineOffsetMap | None = None # Line map of the textbox content used for generation
+        self.text_offset_base = 0 # Offset of the generated text inside the textbox (stripped leading whitespace)
+        self._highlighted_word: tuple[int, int | None] | None = None
+        self.metrics = SynthesisMetrics() # Per-chunk synthesis metrics of the last generation
+        self.jobs_dir = app_data_dir("jobs") # Persistent chunk audio + manifests of generation jobs
+        self.current_job: JobManifest | None = None
+        self._voice_jobs: list[JobManifest] = [] # One job per voice of a generated dialogue
+        self.chunk_planner = ChunkPlanner(os.path.join(app_data_dir(), "chunk_planner.json")) # Learns from every generation
+        self._generated_chunks: tuple[list[str], str] | None = None # (chunks, rate) of the current generation
+        self.generating = False
+        self._speculation_text: tuple[int, str] = (-1, "") # (textbox revision, text) last seen by the speculator
+        self._generated_text = "" # Textbox content the current audio was generated from
+        self._session_status: str | None = None
+        # The audio of the last session is kept on disk and restored after the UI is up
+        self.session_dir = app_data_dir("session")
+        session = load_session(self.session_dir)
+        protected = session.job_ids if session is not None else set()
+        stale_files, stale_dirs = JobManifest.stale_paths(self.jobs_dir, protected=protected)
+        self.janitor.delete(stale_files)
+        self.janitor.delete(stale_dirs, delay=1.0) # After their files are gone
+        self.janitor.sweep_orphans(self.jobs_dir, protected) # Also job directories without a readable manifest
 
         ui_state = load_ui_state()
         self.ui = EdgeTTSUi(self, ui_state)
 
+        # Worker threads talk to the Tk thread only through this bus
+        self.events = UiEventBus(self.ui)
+        self.events.subscribe(UiEvent.STATUS, self.ui.update_status)
+        self.events.subscribe(UiEvent.STATE, self.ui.set_ui_state)
+        self.events.subscribe(UiEvent.CHUNK_READY, self._on_chunk_ready)
+        self.events.subscribe(UiEvent.ERROR, self._on_generation_error)
+        self.events.subscribe(UiEvent.FINISHED, self._on_generation_finished)
+        self.events.subscribe(UiEvent.QUEUE, self._on_queue_changed)
+        self.events.start()
+
+        # Heartbeat on the Tk loop, stalls show in the stats panel and the report is written on exit
+        self.ui_lag = UiLagMonitor(on_stall=lambda lag_ms, callback: self.ui.update_stats_panel(self._stats_text()))
+        self.ui_lag.start(self.ui)
+        self.ui_lag_report = ui_lag_report or os.path.join(app_data_dir("diagnostics"), UI_LAG_REPORT_FILE_NAME)
+
+        # Background job queue, its workers share the synthesis loop (and rate limit) with the Generate button.
+        # Its jobs live in their own directory: the Generate button never writes or deletes the chunks of a
+        # queued job, and the cleanup of old jobs above never touches the ones waiting to resume.
+        queue_jobs_dir = app_data_dir("queue", "jobs")
+        self.job_queue = JobQueue(app_data_dir("queue"), queue_jobs_dir, app_data_dir("queue", "output"),
+                                  janitor=self.janitor, on_change=lambda: self.events.post(UiEvent.QUEUE))
+        self.janitor.sweep_orphans(queue_jobs_dir, self.job_queue.manifest_ids())
+        self.queue_panel: QueuePanel | None = None
+        self._on_queue_changed()
+        self.job_queue.start()
+
+        # Voice previews play on their own player, the generated audio's queue is never touched
+        self.previews = VoicePreviewer(VoicePreviewCache(app_data_dir("previews")),
+                                       on_ready=lambda voice, path: self.events.call(self._on_preview_ready, voice, path))
+        self.preview_player: Player | None = None
+        self._preview_wanted: str | None = None # Voice whose preview plays as soon as it is fetched
+
+        self._chapter_export = None # Future of the running chapter export on the synthesis loop
+        self._format_export: threading.Thread | None = None # Running "Export Formats..." export
+        self.export_dialog: ExportFormatsDialog | None = None
+
+        # Opt-in trimming and leveling of finished chunks, off the synthesis loop
+        self.polisher = ChunkPolisher() if POLISH_AVAILABLE else None
+
+        # Opt-in pre-synthesis of the first chunk while the inputs are idle
+        self.speculator = Speculator(self.ui, self.jobs_dir, self._speculation_snapshot, self._plan_chunks_with,
+                                     janitor=self.janitor)
+        self.speculator.set_enabled(ui_state.speculate)
+
         # Set initial placeholder state after color fetch attempt
         if self.pyglet_initialized:
             self.ui.update_status("Loading voices...")
             self.load_voices_async(ui_state)
+            if session is not None:
+                self._restore_session(session)
         else:
             self.ui.update_status("❌ Error: Audio library init failed. Audio disabled.")
             self.ui.set_ui_state('error_no_audio')
@@ -69,7 +171,7 @@ class EdgeTTSApp():
         def on_eos():
             self.currently_playing_file_index += 1
             if self.player.playing:
-                self.ui.after(0, lambda: self.ui.update_status(f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK))
+                self.events.post(UiEvent.STATUS, f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK)
 
 
 
@@ -95,6 +197,41 @@ class EdgeTTSApp():
         # Return names containing the search term (case-insensitive)
         return [name for name in self._all_voice_display_names if search_term in name.lower()]
 
+    # --- Voice previews ---
+    def preview_voice(self, display_name: str):
+        """Plays the preview of a voice, right away if cached, otherwise once it is fetched."""
+        voice = self.voices_dict.get(display_name)
+        if voice is None or not self.pyglet_initialized:
+            return
+        path = self.previews.request(voice)
+        if path is None:
+            self._preview_wanted = voice
+            self.ui.update_status(f"Fetching preview of {voice}...", UIStatusUpdate.PLAYBACK)
+        else:
+            self._play_preview(voice, path)
+
+    def prefetch_previews(self, display_names: list[str]):
+        """Fetches the previews of the top search results in the background (not while generating)."""
+        if self.generating or not self.pyglet_initialized:
+            return
+        self.previews.prefetch([self.voices_dict[name] for name in display_names if name in self.voices_dict])
+
+    def _on_preview_ready(self, voice: str, path: str):
+        if voice == self._preview_wanted:
+            self._play_preview(voice, path)
+
+    def _play_preview(self, voice: str, path: str):
+        self._preview_wanted = None
+        try:
+            if self.preview_player is not None:
+                self.preview_player.delete()
+            self.preview_player = Player()
+            self.preview_player.queue(load(path, streaming=False))
+            self.preview_player.play()
+            self.ui.update_status(f"🔊 Preview of {voice}", UIStatusUpdate.PLAYBACK)
+        except Exception as e:
+            log.warning("Could not play the preview of %s: %s", voice, e)
+
     # --- Asynchronous Operations & Threading ---
     def load_voices_async(self, ui_state: StoredUiState = None):
         """Starts a thread to load the voice list asynchronously."""
@@ -113,7 +250,11 @@ class EdgeTTSApp():
              self.stop_audio() # Stop playback if currently active
 
         # Use the dedicated function to get input text, ignoring placeholder
-        text = self.ui.get_input_text()
+        raw_text = self.ui.get_input_text(strip=False)
+        text = raw_text.strip()
+        self._generated_text = raw_text
+        self.text_line_map = LineOffsetMap(raw_text, self.ui.utf16_columns)
+        self.text_offset_base = len(raw_text) - len(raw_text.lstrip())
         selected_voice_display = self.ui.voice_dropdown.get()
 
         # Input validation
@@ -128,125 +269,371 @@ class EdgeTTSApp():
         rate_str = f"{rate:+d}%"
         pitch_str = f"{pitch:+d}Hz"
 
+        try:
+            speaker_voices = parse_speaker_voices(self.ui.speaker_voices_entry.get())
+        except ValueError as e:
+            self.ui.update_status(f"❌ Error: Invalid speaker voices: {e}"); self.ui.set_ui_state('idle'); return
+        unknown = sorted(set(speaker_voices.values()) - set(self.voices_dict.values()))
+        if unknown:
+            self.ui.update_status(f"❌ Error: Unknown speaker voice {', '.join(unknown)}."); self.ui.set_ui_state('idle'); return
+        segments = parse_script(text, speaker_voices, voice_short_name) if speaker_voices else []
+        if is_dialogue(segments):
+            self._start_dialogue(segments, text, rate_str, pitch_str)
+            return
+
         self.ui.set_ui_state('generating')
         self.ui.update_status("Generating audio...", UIStatusUpdate.GENERATOR)
-        chunked_text = self._chunk_text(text, int(self.ui.min_words_entry.get()), self.ui.chunk_sep_entry.get()) if self.ui.split_chunks_checkbox.get() else [text]
+        chunked_text = self._plan_chunks(text, rate_str)
+        if self._adaptive_chunking():
+            # The plan follows the measurements, an unfinished job for this text keeps the chunks it started with
+            resumable = JobManifest.find_resumable(self.jobs_dir, text, voice_short_name, rate_str, pitch_str)
+            if resumable is not None:
+                chunked_text = resumable.planned_chunks()
+        self._generated_chunks = (chunked_text, rate_str)
+        # A pre-synthesized first chunk for exactly these inputs lives in the job Generate would open anyway
+        speculation = self.speculator.claim(JobManifest.job_id_for(chunked_text, voice_short_name, rate_str, pitch_str))
+        try:
+            if speculation is not None:
+                self.current_job = speculation.manifest
+            else:
+                self.current_job = JobManifest.open_or_create(self.jobs_dir, chunked_text, voice_short_name, rate_str, pitch_str, text)
+        except OSError as e:
+            log.error("Could not create job directory: %s", e)
+            self.ui.update_status(f"❌ Error: Could not create job directory: {e}"); self.ui.set_ui_state('idle'); return
+        self.generating = True
+        if self.current_job.done_count() and speculation is None:
+            self.ui.update_status(f"Resuming generation ({self.current_job.done_count()}/{len(chunked_text)} chunks already done)...", UIStatusUpdate.GENERATOR)
+        polisher = self.polisher if self.ui.polish_checkbox.get() else None
         thread = threading.Thread(target=self._run_async_task,
-                                  args=(self._generate_audio_task, chunked_text, voice_short_name, rate_str, pitch_str),
+                                  args=(self._generate_audio_task, self.current_job, chunked_text, voice_short_name, rate_str, pitch_str, text,
+                                        speculation.future if speculation is not None else None, polisher),
                                   daemon=True)
         thread.start()
 
-    @staticmethod
-    def _chunk_text(text: str, min_words: int, chunk_separator_regex: str) -> List[str]:
-        words = re.findall(r'\S+', text)
-        chunks = []
-        i = 0
-        n = len(words)
-        sep_pattern = re.compile(chunk_separator_regex) if chunk_separator_regex else None
-
-        while i < n:
-            start = i
-            end = min(i + min_words, n)
-            # If no separator regex, just take min_words at a time
-            if not sep_pattern:
-                chunks.append(' '.join(words[start:end]))
-                i = end
-            else:
-                # Always take at least min_words, then continue until separator is found or end
-                j = end
-                while j < n and not sep_pattern.fullmatch(words[j]):
-                    j += 1
-                # If found, include the separator word
-                if j < n:
-                    j += 1
-                chunks.append(' '.join(words[start:j]))
-                i = j
-        return [chunk for chunk in chunks if chunk]
+    def _start_dialogue(self, segments: list[Segment], text: str, rate_str: str, pitch_str: str):
+        """Generates a speaker-labelled script: the turns of every voice are batched into one job per voice."""
+        split = self.ui.split_chunks_checkbox.get()
+        scripts = plan_voice_scripts(segments, self._min_words() if split else len(text.split()))
+        try:
+            self._voice_jobs = [JobManifest.open_or_create(self.jobs_dir, script.chunks, script.voice, rate_str, pitch_str,
+                                                           script.text) for script in scripts]
+        except OSError as e:
+            log.error("Could not create job directory: %s", e)
+            self.ui.update_status(f"❌ Error: Could not create job directory: {e}"); self.ui.set_ui_state('idle'); return
+        self.current_job = None
+        self._generated_chunks = None # The chunk planner learns from single-voice generations only
+        self.generating = True
+        self.ui.set_ui_state('generating')
+        self.ui.update_status(f"Generating {len(segments)} turns with {len(scripts)} voices...", UIStatusUpdate.GENERATOR)
+        polisher = self.polisher if self.ui.polish_checkbox.get() else None
+        thread = threading.Thread(target=self._run_async_task,
+                                  args=(self._generate_dialogue_task, scripts, list(self._voice_jobs), segments,
+                                        rate_str, pitch_str, polisher),
+                                  daemon=True)
+        thread.start()
+
+    def open_queue_panel(self):
+        if self.queue_panel is not None and self.queue_panel.winfo_exists():
+            self.queue_panel.focus()
+            return
+        self.queue_panel = QueuePanel(self.ui, self)
+
+    def add_snapshot_to_queue(self, priority: str | None = None):
+        """Queues the current text with the current voice, rate, pitch and chunking settings."""
+        text = self.ui.get_input_text()
+        settings = self._selected_voice_settings()
+        if not text or settings is None:
+            self.ui.update_status("❌ Error: Enter text and select a valid voice to queue a job.")
+            return
+        title = " ".join(text[:40].split())
+        self._add_to_queue(text, title, settings, priority)
+
+    def add_files_to_queue(self, priority: str | None = None):
+        """Queues one job per selected text or subtitle file, with the current settings."""
+        settings = self._selected_voice_settings()
+        if settings is None:
+            self.ui.update_status("❌ Error: Select a valid voice to queue files.")
+            return
+        paths = filedialog.askopenfilenames(title="Select Text or Subtitle Files",
+                                            filetypes=[("Text files", "*.txt"), ("SubRip Subtitles", "*.srt"), ("All files", "*.*")])
+        for path in paths:
+            text = file_utils.text_files.load_text_from_file(self.ui, path)
+            if text and text.strip():
+                self._add_to_queue(text.strip(), os.path.splitext(os.path.basename(path))[0], settings, priority)
+
+    def _add_to_queue(self, text: str, title: str, settings: tuple[str, str, str], priority: str | None):
+        if priority is None:
+            priority = self.queue_panel.priority if self.queue_panel is not None and self.queue_panel.winfo_exists() else "normal"
+        voice, rate_str, pitch_str = settings
+        self.job_queue.add(text, title, voice, rate_str, pitch_str, bool(self.ui.split_chunks_checkbox.get()),
+                           self._min_words(), self.ui.chunk_sep_entry.get(), priority)
+        self.ui.update_status(f"➕ Queued '{title}' ({priority} priority)")
+
+    def _selected_voice_settings(self) -> tuple[str, str, str] | None:
+        """(voice short name, rate, pitch) of the current selection, None without a valid voice."""
+        selected_voice_display = self.ui.voice_dropdown.get()
+        if selected_voice_display not in self.voices_dict:
+            return None
+        return (self.voices_dict[selected_voice_display], f"{int(self.ui.rate_slider.get()):+d}%",
+                f"{int(self.ui.pitch_slider.get()):+d}Hz")
+
+    def export_chapters(self):
+        """Splits the text at its chapter headings and exports every chapter as its own MP3, in parallel."""
+        if self._chapter_export is not None and not self._chapter_export.done():
+            self.ui.update_status("⏳ A chapter export is already running.")
+            return
+        text = self.ui.get_input_text()
+        settings = self._selected_voice_settings()
+        if not text or settings is None:
+            self.ui.update_status("❌ Error: Enter text and select a valid voice to export chapters.")
+            return
+        try:
+            chapters = detect_chapters(text, self.ui.chapter_regex_entry.get())
+        except re.error as e:
+            self.ui.update_status(f"❌ Invalid chapter heading regex: {e}")
+            return
+        output_dir = filedialog.askdirectory(title=f"Export {len(chapters)} Chapters To...", mustexist=False)
+        if not output_dir:
+            self.ui.update_status("Chapter export cancelled."); return
+        name = re.sub(r"[^\w\- ]", "", " ".join(text[:40].split())).strip().replace(" ", "_")[:30] or "speech"
+        voice, rate_str, pitch_str = settings
+        exporter = ChapterExporter(self.jobs_dir, janitor=self.janitor,
+                                   on_progress=lambda message: self.events.post(UiEvent.STATUS, f"📖 {message}", UIStatusUpdate.ONLY))
+        self._chapter_export = submit_to_synthesis_loop(exporter.export(
+            chapters, output_dir, name, voice, rate_str, pitch_str, bool(self.ui.split_chunks_checkbox.get()),
+            self._min_words(), self.ui.chunk_sep_entry.get()))
+        self._chapter_export.add_done_callback(lambda future: self.events.call(self._on_chapters_exported, future))
+        self.ui.update_status(f"📖 Exporting {len(chapters)} chapters to {output_dir}...")
+
+    def _on_chapters_exported(self, future):
+        if future.cancelled():
+            return
+        try:
+            path = future.result()
+            self.ui.update_status(f"✅ Chapters exported, with playlist and chapter-marked {os.path.basename(path)}")
+        except Exception as e:
+            log.error("Chapter export failed: %s", e)
+            self.ui.update_status(f"❌ Chapter export failed (finished chapters are kept, exporting again resumes): {e}")
+
+    def _on_queue_changed(self):
+        jobs = self.job_queue.jobs()
+        pending = sum(1 for job in jobs if job.status in (STATUS_QUEUED, STATUS_RUNNING))
+        text = f"Queue ({pending})" if pending else "Queue"
+        if self.ui.queue_btn.cget("text") != text:
+            self.ui.queue_btn.configure(text=text)
+        if self.queue_panel is not None and self.queue_panel.winfo_exists():
+            self.queue_panel.refresh()
+
+    def on_inputs_changed(self):
+        """The text, voice, sliders or chunking options changed: restarts the idle timer of the speculator."""
+        speculator = getattr(self, 'speculator', None) # UI callbacks fire while the UI is built
+        if speculator is not None:
+            speculator.inputs_changed()
+
+    def set_speculation(self, enabled: bool):
+        self.speculator.set_enabled(enabled)
+
+    def _speculation_snapshot(self) -> InputSnapshot | None:
+        """
+        The inputs Generate would use right now, None while generating or without valid inputs.
+        The text is only copied out of the textbox again after it was edited; the chunks are
+        planned by the speculator on the synthesis loop.
+        """
+        if self.generating:
+            return None
+        revision = self.ui.input_text_revision()
+        if self._speculation_text[0] != revision:
+            self._speculation_text = (revision, self.ui.get_input_text())
+        text = self._speculation_text[1]
+        settings = self._selected_voice_settings()
+        if not text or settings is None:
+            return None
+        try:
+            options = self._chunking_options()
+        except ValueError:
+            return None # Chunking options are being edited
+        return text, *settings, options
+
+    def _adaptive_chunking(self) -> bool:
+        return bool(self.ui.split_chunks_checkbox.get() and self.ui.adaptive_chunks_checkbox.get())
+
+    def _chunking_options(self) -> tuple[bool, bool, int, str]:
+        """(split, adaptive, minimum words, separator regex) as set in the UI."""
+        return (bool(self.ui.split_chunks_checkbox.get()), bool(self.ui.adaptive_chunks_checkbox.get()),
+                self._min_words(), self.ui.chunk_sep_entry.get())
+
+    def _min_words(self) -> int:
+        """Words per chunk as set in the UI, at least 1 (the entry only takes digits, but may be empty)."""
+        return int(self.ui.min_words_entry.get() or 0) or 1
+
+    def _plan_chunks(self, text: str, rate_str: str) -> list[str]:
+        """Chunks of the text with the current chunking options (fixed size or adaptive)."""
+        return self._plan_chunks_with(text, rate_str, self._chunking_options())
+
+    def _plan_chunks_with(self, text: str, rate_str: str, options: tuple[bool, bool, int, str]) -> list[str]:
+        """Chunks of the text with the given chunking options, reads no widgets so it runs on any thread."""
+        split, adaptive, min_words, separator = options
+        if not split:
+            return [text]
+        if adaptive:
+            return self.chunk_planner.plan(text, min_words, separator, rate_str)
+        return chunk_text(text, min_words, separator)
+
+    def _stats_text(self) -> str:
+        text = self.metrics.summary_text()
+        if self.speculator.enabled:
+            text += f"\nPre-generation {self.speculator.hit_rate_text()}"
+        return f"{text}\n{self.ui_lag.summary_text()}"
 
     def _run_async_task(self, coro, *args):
-        """Runs an asyncio coroutine in a new event loop (suitable for threads)."""
+        """Runs an asyncio coroutine on the shared synthesis loop and waits for it (suitable for threads)."""
         try:
-            asyncio.run(coro(*args))
+            run_in_synthesis_loop(coro(*args))
         except Exception as e:
-            print(f"ERROR: Exception in async task thread: {e}")
+            log.error("Exception in async task thread: %s", e)
+            self.generating = False
             # Update status on the main thread
-            self.ui.after(0, lambda: self.ui.update_status(f"❌ Error during async operation: {e}"))
-            self.ui.after(0, lambda: self.ui.set_ui_state('idle')) # Revert to idle state on error
+            self.events.post(UiEvent.STATUS, f"❌ Error during async operation: {e}", UIStatusUpdate.ONLY)
+            self.events.post(UiEvent.STATE, 'idle') # Revert to idle state on error
 
     async def _load_voices_task(self, start_voice: str = None):
         """Coroutine to fetch the list of voices from edge-tts."""
         try:
-            voices = await edge_tts.list_voices()
+            voices = await list_voices()
             # Sort by Locale, then ShortName for a structured display
             voices.sort(key=lambda v: (v['Locale'], v['ShortName']))
-            # Create a dictionary for quick lookup {DisplayName: ShortName}
-            self.voices_dict = {f"{v['FriendlyName']} ({v['Locale']}, {v['Gender']})": v['ShortName'] for v in voices}
-            self._all_voice_display_names = list(self.voices_dict.keys())
-            # Update the UI on the main thread when done
-            self.ui.after(0, self.ui.update_voice_dropdown_ui, self._all_voice_display_names, start_voice)
+            # Update the app state and UI on the main thread when done
+            self.events.call(self._on_voices_loaded, voices, start_voice)
         except Exception as e:
-            print(f"ERROR: Failed to load voices: {e}")
-            self.ui.after(0, lambda: self.ui.update_status(f"❌ Error loading voices: {e}"))
-            self.ui.after(0, lambda: self.ui.set_ui_state('idle')) # Set to idle if loading fails
-
-
-    async def _generate_audio_task(self, chunks: List[str], voice_short_name: str, rate_str: str, pitch_str: str):
-        """Coroutine to generate audio and save it to a temporary file."""
-        tmp_path = None
-        self.audio_file_path = [] # Reset the audio file path list before generation
-        count = 1
-        for text in chunks:
-            print(f"Chunk {count}/{len(chunks)}: Generating audio for text: {text[:50]}...")  # Log first 50 chars
-            try:
-                communicate = edge_tts.Communicate(text=text, voice=voice_short_name, rate=rate_str, pitch=pitch_str)
-                # Create a temporary file (it won't be deleted automatically with delete=False)
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3", prefix="edge_tts_") as tmp_file:
-                    tmp_path = tmp_file.name
-
-                # Save the audio stream from edge-tts to the created temp file
-                await communicate.save(tmp_path)
-
-
-                # Verify that the file was created and is not empty
-                if os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
-                    self.audio_file_path.append(tmp_path) # Store the path if valid
-                    print(f"INFO: Audio saved to temp file: {self.audio_file_path}")
-                    message = "Chunk " + str(count) + " out of " + str(len(chunks)) + " generated successfully."
-                    self.ui.after(0, lambda: self.ui.update_status(message, UIStatusUpdate.GENERATOR))
-                    count += 1
-                    self._on_audio_generated(tmp_path, count)
-                    # Schedule the _on_audio_generated call on the main thread
-                else:
-                     # File is missing or empty
-                     print(f"ERROR: Temp audio file missing or empty after generation: {tmp_path}")
-                     if tmp_path and os.path.exists(tmp_path): # Attempt to remove if it exists
-                         try: os.remove(tmp_path)
-                         except OSError as rm_err: print(f"WARN: Could not remove invalid temp file {tmp_path}: {rm_err}")
-                     break
-
-            except Exception as e:
-                # Catch any other exceptions during generation
-                print(f"ERROR: Exception during audio generation: {e}")
-                if tmp_path and os.path.exists(tmp_path): # Attempt cleanup
-                     try: os.remove(tmp_path)
-                     except OSError as rm_err: print(f"WARN: Could not remove temp file {tmp_path}: {rm_err}")
-                self.ui.after(0, lambda: self.ui.update_status(f"❌ Error generating audio: {e}"))
-                self.ui.after(0, lambda: self.ui.set_ui_state('idle'))
-                self.audio_file_path = [] # Clear the path since no valid audio was generated
+            log.error("Failed to load voices: %s", e)
+            self.events.post(UiEvent.STATUS, f"❌ Error loading voices: {e}", UIStatusUpdate.ONLY)
+            self.events.post(UiEvent.STATE, 'idle') # Set to idle if loading fails
+
+    def _on_voices_loaded(self, voices: list[dict], start_voice: str = None):
+        """Main thread: stores the fetched voices and fills the dropdown."""
+        # Create a dictionary for quick lookup {DisplayName: ShortName}
+        self.voices_dict = {f"{v['FriendlyName']} ({v['Locale']}, {v['Gender']})": v['ShortName'] for v in voices}
+        self._all_voice_display_names = list(self.voices_dict.keys())
+        self.ui.update_voice_dropdown_ui(self._all_voice_display_names, start_voice)
+        if self._session_status:
+            self.ui.update_status(self._session_status)
+            self._session_status = None
+        self._offer_resume()
+
+    def _offer_resume(self):
+        """After a restart: restores the text and settings of an unfinished job so Generate resumes it."""
+        try:
+            job = JobManifest.latest_incomplete(self.jobs_dir)
+            if job is None or self.ui.has_input_text():
                 return
-        if self.audio_file_path:
+            text = job.source_text()
+        except OSError as e:
+            log.warning("Could not read unfinished job: %s", e)
+            return
+        voice_display = next((name for name, short in self.voices_dict.items() if short == job.data["voice"]), None)
+        if voice_display:
+            self.ui.voice_dropdown.set(voice_display)
+        self.ui.rate_slider.set(int(job.data["rate"].rstrip("%")))
+        self.ui.update_rate_label(self.ui.rate_slider.get())
+        self.ui.pitch_slider.set(int(job.data["pitch"].rstrip("Hz")))
+        self.ui.update_pitch_label(self.ui.pitch_slider.get())
+        self.ui.set_input_text(text)
+        self.ui.update_status(f"⏯ Unfinished job restored ({job.done_count()}/{len(job.chunks)} chunks done). Press Generate to resume.")
+
+    async def _generate_audio_task(self, manifest: JobManifest, chunks: List[str], voice_short_name: str, rate_str: str, pitch_str: str, source_text: str = "",
+                                   speculation_future=None, polisher: ChunkPolisher | None = None):
+        """
+        Coroutine to generate audio into the job directory (see tts.synthesis.generate_job).
+        Runs on a worker thread: results are only posted to the event bus, the main thread
+        owns audio_file_path and the player. With a polisher, chunks are trimmed and leveled
+        on its workers and handed to the player in order once polished.
+        """
+        post_in_order, on_chunk_ready, on_retry = self._generation_callbacks(len(chunks), polisher)
+        if speculation_future is not None:
+            # The first chunk is still being pre-synthesized, wait for it instead of requesting it again
+            await asyncio.wait([asyncio.wrap_future(speculation_future)])
+        manifest.set_speculative(False) # A real job now, kept for resuming
+        try:
+            generated = await generate_job(manifest, chunks, source_text, voice_short_name, rate_str, pitch_str,
+                                           self.metrics, on_chunk_ready, on_retry)
+        except ChunkSynthesisError as e:
+            # Out of retries: keep everything done so far (also chunks after the failed one), the next Generate resumes
+            post_in_order(UiEvent.ERROR, f"❌ Error generating chunk {e.index + 1}/{e.total}: {e.cause}. Press Generate to resume.")
+            return
+        post_in_order(UiEvent.FINISHED, generated)
+
+    async def _generate_dialogue_task(self, scripts: list[VoiceScript], manifests: list[JobManifest], segments: list[Segment],
+                                      rate_str: str, pitch_str: str, polisher: ChunkPolisher | None = None):
+        """Like _generate_audio_task for a multi-voice script (see tts.dialogue.generate_dialogue), turn by turn."""
+        post_in_order, on_segment_ready, on_retry = self._generation_callbacks(len(segments), polisher, "Turn")
+        try:
+            generated = await generate_dialogue(scripts, manifests, segments, rate_str, pitch_str, self.metrics,
+                                                on_segment_ready, on_retry)
+        except ChunkSynthesisError as e:
+            post_in_order(UiEvent.ERROR, f"❌ Error generating chunk {e.index + 1}/{e.total} of a voice: {e.cause}. Press Generate to resume.")
+            return
+        post_in_order(UiEvent.FINISHED, generated)
+
+    def _generation_callbacks(self, total: int, polisher: ChunkPolisher | None, unit: str = "Chunk"):
+        """
+        (post_in_order, on_chunk_ready, on_retry) for a generation of `total` chunks. Called
+        on the synthesis loop, they only post to the event bus; with a polisher, chunks and
+        the events posted in order are held back until everything before them is polished.
+        """
+        def post_in_order(event: UiEvent, *args):
+            # Behind the chunks still being polished
+            if polisher is None:
+                self.events.post(event, *args)
+            else:
+                polisher.then(lambda: self.events.post(event, *args))
+
+        def on_chunk_ready(i: int, path: str, word_index: WordBoundaryIndex, text_start: int):
+            if polisher is None:
+                self.events.post(UiEvent.CHUNK_READY, path, word_index, text_start)
+            else:
+                polisher.submit(path, lambda polished_path, shift: self.events.post(
+                    UiEvent.CHUNK_READY, polished_path, word_index.shifted(shift), text_start))
+            self.events.post(UiEvent.STATUS, f"{unit} {i + 1} out of {total} generated successfully.", UIStatusUpdate.GENERATOR)
+
+        def on_retry(i: int, attempt: int, error: Exception, delay: float):
+            self.events.post(UiEvent.STATUS, f"⚠️ Chunk {i + 1} failed ({error}), retry {attempt} in {delay:.1f}s...", UIStatusUpdate.GENERATOR)
+
+        return post_in_order, on_chunk_ready, on_retry
+
+    def _on_chunk_ready(self, path: str, word_index: WordBoundaryIndex, first_text_offset: int):
+        """Main thread: registers a finished chunk and queues it in the player."""
+        self._chunk_text_starts.append(first_text_offset)
+        self.word_indexes.append(word_index)
+        self.audio_file_path.append(path)
+        self._on_audio_generated(path, len(self.audio_file_path))
+        self._add_chunk_peaks(path)
+        self.ui.update_stats_panel(self._stats_text())
+
+    def _on_generation_error(self, message: str):
+        """Main thread: a chunk failed after all retries. Finished chunks stay playable and on disk for resuming."""
+        self.generating = False
+        self.ui.update_status(message)
+        self.ui.set_ui_state('generated' if self.audio_file_path else 'idle')
+
+    def _on_generation_finished(self, generated: int):
+        """Main thread: all chunks are done."""
+        self.generating = False
+        self.ui.update_stats_panel(self._stats_text())
+        if self._generated_chunks is not None:
+            self.chunk_planner.learn(self.metrics, *self._generated_chunks)
+        if generated and self.audio_file_path:
             if self.player.playing:
                 self.ui.update_status("", UIStatusUpdate.GENERATOR)
             else:
                 self.ui.update_status("✅ Audio generated! Press Play.", UIStatusUpdate.GENERATOR)
-            print(f"INFO: Successfully generated audio file(s): {self.audio_file_path}")
+            log.info("Successfully generated %s audio file(s).", generated)
         else:
-            self.ui.after(0, lambda: self.ui.update_status("❌ Error: Failed to generate valid audio file."))
-            self.ui.after(0, lambda: self.ui.set_ui_state('idle'))
+            self.ui.update_status("❌ Error: Failed to generate valid audio file.")
+            self.ui.set_ui_state('idle')
 
     def _on_audio_generated(self, path: str, index):
         """Callback on the main thread after the temporary audio file is created."""
-        print(f"INFO: Loading generated audio file: {self.audio_file_path}")
+        log.info("Loading generated audio file: %s", path)
         if index < self.last_index:
             raise ValueError(f"Index {index} is less than last index {self.last_index}. This should not happen.")
         else:
@@ -260,27 +647,119 @@ class EdgeTTSApp():
         try:
             # Load the audio file into pyglet
             if os.path.exists(path):
-                self.player.queue(load(path, streaming=False))
+                self.player.queue(self._player_source(path, index - 1))
             else:
                 raise FileNotFoundError(f"Generated audio file not found: {path}")
             # Add a small delay before getting duration, sometimes needed after load
             if self.player.playing:
-                self.ui.after(0, lambda: self.ui.update_status(f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK))
+                self.ui.update_status(f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK)
             self.ui.after(50, self._finish_audio_load)
 
         except Exception as e:
             # Catch errors during file loading *initiation* into pyglet
-                print(f"ERROR: Failed to initiate loading audio file into player: {e}")
+                log.error("Failed to initiate loading audio file into player: %s", e)
                 self.ui.update_status(f"❌ Error loading audio: {e}")
                 self.ui.set_ui_state('error_audio_format')
                 self._delete_temp_audio_file() # Delete the problematic file
 
 
+    def _audio_source(self, path: str):
+        """
+        The decoded audio of a chunk file, decoded once per file. Repeated chunks share a
+        file, so every queue entry for them references the same decoded data.
+        """
+        source = self._audio_sources.get(path)
+        if source is None:
+            source = self._audio_sources[path] = load(path, streaming=False)
+        return source
+
+    def _player_source(self, path: str, index: int):
+        """
+        The source to queue for chunk `index`: its decoded audio, time-stretched at speeds
+        other than 1x. Stretched chunks are decoded in the background once they are about
+        to play, and a chunk that starts playing has the next one decoded ahead.
+        """
+        source = self._audio_source(path)
+        if self.playback_speed == 1.0:
+            return source
+        return StretchedSource(lambda: self._pcm.request(path, source), source.audio_format, self.playback_speed,
+                               source.duration, on_start=lambda: self._prefetch_pcm(index + 1))
+
+    def _prefetch_pcm(self, index: int):
+        """Player thread: starts decoding chunk `index` if it is loaded."""
+        paths = self.audio_file_path
+        source = self._audio_sources.get(paths[index]) if index < len(paths) else None
+        if source is not None:
+            self._pcm.request(paths[index], source)
+
+    def _add_chunk_peaks(self, path: str):
+        """Appends the peaks of the next chunk to the waveform overview (from its sidecar if it was loaded before)."""
+        if not NUMPY_AVAILABLE:
+            return
+        if self.peaks is None:
+            self.peaks = PeakPyramid()
+
+        def decode():
+            source = self._audio_source(path)
+            samples = self._pcm.cached(path)
+            return (samples if samples is not None else decode_pcm(source)), source.audio_format.sample_rate
+        try:
+            peaks = peaks_for_audio(path, decode)
+        except Exception as e:
+            log.warning("No waveform for %s: %s", path, e)
+            # Silence of the chunk's length keeps the later chunks at their place on the overview
+            duration = self._audio_source(path).duration or 0.0
+            peaks = silent_peaks(round(duration / self.peaks.bucket_seconds))
+        self._chunk_peak_starts.append(self.peaks.append(peaks))
+        self.ui.waveform.schedule_redraw()
+
+    def overview_position(self) -> float | None:
+        """The playback position as a peak bucket of the waveform overview, or None."""
+        chunk = self.currently_playing_file_index
+        if self.peaks is None or not self.player or self.player.source is None or chunk >= len(self._chunk_peak_starts):
+            return None
+        return self._chunk_peak_starts[chunk] + max(0.0, self.player.time) * self.playback_speed / self.peaks.bucket_seconds
+
+    def seek_to_overview_position(self, bucket: float):
+        """Seeks playback to a peak bucket of the waveform overview (drag-to-seek)."""
+        if not self.pyglet_initialized or not self.player or self.peaks is None or not self._chunk_peak_starts: return
+        chunk = min(max(0, bisect.bisect_right(self._chunk_peak_starts, bucket) - 1), len(self.audio_file_path) - 1)
+        seconds = (bucket - self._chunk_peak_starts[chunk]) * self.peaks.bucket_seconds / self.playback_speed
+        try:
+            if chunk == self.currently_playing_file_index and self.player.source is not None:
+                self._perform_seek(seconds)
+            else:
+                self._play_from_chunk(chunk, seconds)
+        except Exception as e:
+            log.error("Failed to seek on the waveform: %s", e)
+            self.ui.update_status(f"❌ Error seeking: {e}")
+        self._highlighted_word = None
+        self.update_word_highlight()
+
+    def set_playback_speed(self, speed: float):
+        """Changes the tempo of the generated audio locally, keeping the playback position in the text."""
+        if speed == self.playback_speed:
+            return
+        if speed != 1.0 and not NUMPY_AVAILABLE:
+            self.ui.update_status("❌ Playback speed needs numpy (pip install numpy)."); return
+        old_speed, self.playback_speed = self.playback_speed, speed
+        if not self._can_seek():
+            return
+        # Same spot in the source audio, in the time of the new speed
+        seconds = self.player.time * old_speed / speed
+        try:
+            self._play_from_chunk(self.currently_playing_file_index, seconds)
+        except Exception as e:
+            log.error("Failed to change playback speed: %s", e)
+            self.ui.update_status(f"❌ Error changing playback speed: {e}")
+        self._highlighted_word = None
+        self.update_word_highlight()
+
     def _finish_audio_load(self):
         """Gets duration and updates UI after pyglet has loaded the file."""
         if not self.pyglet_initialized or not self.player: return
         try:
-            print(f"INFO: Audio file loaded.")
+            log.info("Audio file loaded.")
 
             self.ui.set_ui_state('generated') # State: ready to be played
             if self.ui.auto_play.get() and not self.player.playing:
@@ -288,7 +767,7 @@ class EdgeTTSApp():
 
         except Exception as e:
              # Catch errors getting duration or updating UI
-             print(f"ERROR: Failed to finalize audio load (get duration/update UI): {e}")
+             log.error("Failed to finalize audio load (get duration/update UI): %s", e)
              self.ui.update_status(f"❌ Error finalizing audio load: {e}")
              self.ui.set_ui_state('error_audio_format')
              self._delete_temp_audio_file()
@@ -314,7 +793,7 @@ class EdgeTTSApp():
                 self.ui.set_ui_state('playing')
                 self.ui.update_status(f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK)
         except Exception as e:
-            print(f"ERROR: Exception during toggle_play_pause: {e}")
+            log.error("Exception during toggle_play_pause: %s", e)
             self.ui.update_status(f"❌ Playback Error: {e}")
             self.ui.set_ui_state('generated') # Revert to generated state on error
 
@@ -324,10 +803,12 @@ class EdgeTTSApp():
 
         self.player.delete()
         self.reinitialize_player()
+        self._highlighted_word = None
+        self.ui.clear_word_highlight()
         if self.audio_file_path:
-            for path in self.audio_file_path:
+            for i, path in enumerate(self.audio_file_path):
                 if os.path.exists(path):
-                    self.player.queue(load(path, streaming=False))
+                    self.player.queue(self._player_source(path, i))
 
 
         # Only stop if currently playing or paused
@@ -339,7 +820,7 @@ class EdgeTTSApp():
                 self.ui.set_ui_state('generated') # State returns to 'ready to play'
                 self.ui.update_status("⏹ Audio stopped.",  UIStatusUpdate.PLAYBACK)
             except Exception as e:
-                print(f"ERROR: Exception during stop_audio: {e}")
+                log.error("Exception during stop_audio: %s", e)
                 self.ui.update_status(f"❌ Error stopping audio: {e}")
                 self.ui.set_ui_state('generated') # Still try to reset state
         else:
@@ -366,7 +847,7 @@ class EdgeTTSApp():
 
         except Exception as e:
              # Catch errors during the seek operation
-             print(f"ERROR: Exception during seek operation: {e}")
+             log.error("Exception during seek operation: %s", e)
              self.ui.update_status(f"❌ Error seeking: {e}")
              # Still try to schedule updater restart check if it was playing
 
@@ -381,58 +862,104 @@ class EdgeTTSApp():
 
 
 
+    # --- Read-along (word boundaries) ---
+    def update_word_highlight(self):
+        """Highlights the word currently being spoken. Called on every playback tick."""
+        if not self.pyglet_initialized or not self.player or self.text_line_map is None: return
+        chunk = self.currently_playing_file_index
+        if chunk >= len(self.word_indexes):
+            return
+        word_index = self.word_indexes[chunk]
+        word = word_index.find_word_at_time(self.player.time * self.playback_speed)
+        if (chunk, word) == self._highlighted_word:
+            return
+        self._highlighted_word = (chunk, word)
+        if word is None:
+            self.ui.clear_word_highlight()
+            return
+        start, end = word_index.text_span(word)
+        self.ui.highlight_word(self.text_line_map.to_index(self.text_offset_base + start),
+                               self.text_line_map.to_index(self.text_offset_base + end))
+
+    def seek_to_text_position(self, line: int, column: int):
+        """Seeks playback to the word at the given textbox position (click-to-seek)."""
+        if not self._can_seek() or self.text_line_map is None or not self._chunk_text_starts: return
+        offset = self.text_line_map.to_offset(line, column) - self.text_offset_base
+        chunk = bisect.bisect_right(self._chunk_text_starts, offset) - 1
+        if chunk < 0 or chunk >= len(self.word_indexes):
+            return
+        word = self.word_indexes[chunk].find_word_at_text_offset(offset)
+        if word is None:
+            return # Click was not on a spoken word
+        target_time = self.word_indexes[chunk].time_of(word) / self.playback_speed
+        if chunk == self.currently_playing_file_index:
+            self._perform_seek(target_time)
+        else:
+            self._play_from_chunk(chunk, target_time)
+        self._highlighted_word = None
+        self.update_word_highlight()
+
+    def _play_from_chunk(self, chunk: int, seconds: float):
+        """Rebuilds the player queue starting at the given chunk and seeks inside it."""
+        was_playing = self.player.playing
+        self.player.delete()
+        self.reinitialize_player()
+        for i in range(chunk, len(self.audio_file_path)):
+            if os.path.exists(self.audio_file_path[i]):
+                self.player.queue(self._player_source(self.audio_file_path[i], i))
+        self.currently_playing_file_index = chunk
+        self._perform_seek(seconds)
+        if was_playing:
+            self.player.play()
+            self.ui.update_status(f"▶ Playing audio({self.currently_playing_file_index + 1}/{len(self.audio_file_path)})", UIStatusUpdate.PLAYBACK)
+
     # --- Cleanup ---
-    def _delete_temp_audio_file(self):
-        """Deletes the temporary audio file if it exists, with retries."""
-        paths_to_delete = self.audio_file_path
-        if paths_to_delete:
+    def _delete_temp_audio_file(self, keep_files: bool = False):
+        """
+        Releases the generated audio and hands the files to the background janitor.
+        Files of an unfinished job are kept on disk so the job can be resumed, with
+        keep_files (a stored session plays them again) all files are kept.
+        """
+        loaded_paths = self.audio_file_path
+        jobs = ([self.current_job] if self.current_job is not None else []) + self._voice_jobs
+        self.current_job, self._voice_jobs = None, []
+        if loaded_paths:
             # Clear internal references *before* attempting deletion
             # Stop the player if it's active and loaded this file
             self.audio_file_path = []
+            self._audio_sources = {}
+            self._pcm.clear()
+            self.word_indexes = []
+            self._chunk_text_starts = []
+            self.peaks = None
+            self._chunk_peak_starts = []
+            self.ui.waveform.schedule_redraw()
+            self._highlighted_word = None
+            self.ui.clear_word_highlight()
             if self.pyglet_initialized and self.player:
                  # Check if the player's source matches the file to delete
                  # Note: pyglet doesn't directly expose the loaded file path easily.
                  # We assume if a file exists, the player *might* be using it.
-                 print(f"INFO: Stopping player before attempting to delete potential source file.")
+                 log.info("Stopping player before attempting to delete potential source file.")
                  try:
                      self.player.delete() # Stop playback and release resources
                      self.reinitialize_player() # Reinitialize player to reset state
-                     time.sleep(0.15) # Give OS time to release handle
                  except Exception as e:
                      # Ignore errors if player is already stopped or invalid
                      if "Playback has not been initialized" not in str(e):
-                          print(f"WARN: Exception while stopping player before delete: {e}")
-            for path_to_delete in paths_to_delete:
-                print(f"INFO: Preparing to delete temp file: {path_to_delete}")
-                # Attempt to delete the physical file with retries
-                max_retries = 4
-                retry_delay = 0.25 # seconds
-                for attempt in range(max_retries):
-                    try:
-                        os.remove(path_to_delete)
-                        print(f"INFO: Deleted temp file: {path_to_delete}")
-                        path_to_delete = None # Mark as deleted successfully
-                        break # Exit loop if successful
-                    except PermissionError as e:
-                        print(f"WARN: Attempt {attempt + 1}/{max_retries} - PermissionError removing temp file {path_to_delete}: {e}. Retrying...")
-                        time.sleep(retry_delay)
-                    except OSError as e:
-                        print(f"ERROR: Attempt {attempt + 1}/{max_retries} - OSError removing temp file {path_to_delete}: {e}. Retrying...")
-                        time.sleep(retry_delay)
-                    except Exception as e:
-                        print(f"ERROR: Unexpected exception deleting temp file {path_to_delete} (Attempt {attempt + 1}): {e}")
-                        break # Don't retry on unexpected errors
-
-                if path_to_delete and os.path.exists(path_to_delete):
-                    print(f"ERROR: Failed to delete temp file after {max_retries} retries: {path_to_delete}")
-                    # Log the failure, internal path is already None.
+                          log.warning("Exception while stopping player before delete: %s", e)
+        for job in jobs:
+            if job.is_complete() and not keep_files:
+                # Deleted on the janitor thread, slightly delayed to give the OS time to release handles
+                self.janitor.delete(job.all_paths(), delay=TEMP_DELETE_RELEASE_DELAY)
+                self.janitor.delete([job.job_dir], delay=TEMP_DELETE_RELEASE_DELAY + 1.0) # After its files are gone
 
 
     def on_closing(self):
-        store_ui_state(self.ui.voice_dropdown.get(), int(self.ui.rate_slider.get()), int(self.ui.pitch_slider.get()), self.ui.auto_play.get(), self.ui.split_chunks_checkbox.get(), int(self.ui.min_words_entry.get()), self.ui.chunk_sep_entry.get())
+        store_ui_state(self.ui.voice_dropdown.get(), int(self.ui.rate_slider.get()), int(self.ui.pitch_slider.get()), self.ui.auto_play.get(), self.ui.split_chunks_checkbox.get(), self._min_words(), self.ui.chunk_sep_entry.get(), bool(self.ui.speculate_checkbox.get()), bool(self.ui.polish_checkbox.get()), bool(self.ui.adaptive_chunks_checkbox.get()), self.ui.chapter_regex_entry.get(), self.ui.speaker_voices_entry.get())
 
         """Called when the application window is closed."""
-        print("INFO: Closing application...")
+        log.info("Closing application...")
 
         # Stop the player if active
         if self.pyglet_initialized and self.player:
@@ -442,17 +969,153 @@ class EdgeTTSApp():
              except Exception as e:
                   # Ignore "Playback has not been initialized" error if player failed
                   if "Playback has not been initialized" not in str(e):
-                     print(f"WARN: Exception stopping player during close: {e}")
+                     log.warning("Exception stopping player during close: %s", e)
 
-        # Delete the last temporary file
-        print("INFO: Cleaning up temporary audio file...")
-        self._delete_temp_audio_file()
+        # Keep the generated audio for the next start, delete it only if there is nothing to restore
+        session_stored = self._store_session()
+        log.info("Cleaning up temporary audio file...")
+        self._delete_temp_audio_file(keep_files=session_stored)
 
         # I Removed the problematic after_cancel loop entirely
         # The _stop_progress_updater() call above already handles the main updater
         # Got exceptions during the after_cancel call otherwise.
+        self.events.stop()
+        self.ui_lag.stop()
+        self.ui_lag.dump(self.ui_lag_report)
         if hasattr(self.ui,'destroy'):
             self.ui.destroy() # Close the Tkinter window
+        self.speculator.shutdown()
+        if self._chapter_export is not None:
+            self._chapter_export.cancel() # Its chapter manifests resume the export next time
+        self.previews.cancel()
+        if self.preview_player is not None:
+            self.preview_player.delete()
+        if self.polisher is not None:
+            self.polisher.shutdown()
+        self._pcm.shutdown()
+        self.job_queue.shutdown() # Running jobs stay queued and resume on the next start
+        shutdown_backend() # Close pooled service connections
+        # Window is gone, give the janitor a moment to finish. Leftovers are swept on next start.
+        self.janitor.shutdown()
+
+    # --- Session ---
+    def _store_session(self) -> bool:
+        """Saves the loaded audio and the playback position for the next start. Returns whether a session was stored."""
+        if not self.audio_file_path or not all(os.path.exists(path) for path in self.audio_file_path):
+            clear_session(self.session_dir)
+            return False
+        chunk, position = self.currently_playing_file_index, 0.0
+        if chunk >= len(self.audio_file_path):
+            chunk = 0 # Played to the end, start over next time
+        elif self.player is not None and self.player.source is not None:
+            position = max(0.0, self.player.time * self.playback_speed)
+        job = self.current_job
+        voice, rate, pitch = (job.data["voice"], job.data["rate"], job.data["pitch"]) if job is not None else ("", "", "")
+        if job is None and self._voice_jobs:
+            # A dialogue: every voice job shares the rate and pitch
+            rate, pitch = self._voice_jobs[0].data["rate"], self._voice_jobs[0].data["pitch"]
+        store_session(self.session_dir, StoredSession(
+            self._generated_text, job.job_dir if job is not None else None, voice, rate, pitch,
+            list(self.audio_file_path), list(self._chunk_text_starts), list(self.word_indexes),
+            chunk, position, self.playback_speed, [voice_job.job_dir for voice_job in self._voice_jobs]))
+        return True
+
+    def _restore_session(self, session: StoredSession):
+        """Queues the audio of the last session from disk (no synthesis) at the position playback stopped."""
+        self.ui.set_input_text(session.text)
+        self._generated_text = session.text
+        self.text_line_map = LineOffsetMap(session.text, self.ui.utf16_columns)
+        self.text_offset_base = len(session.text) - len(session.text.lstrip())
+        if session.rate:
+            self.ui.rate_slider.set(int(session.rate.rstrip("%")))
+            self.ui.update_rate_label(self.ui.rate_slider.get())
+        if session.pitch:
+            self.ui.pitch_slider.set(int(session.pitch.rstrip("Hz")))
+            self.ui.update_pitch_label(self.ui.pitch_slider.get())
+        self.current_job = JobManifest.load(session.job_dir) if session.job_dir else None
+        # Loaded so that replacing the restored audio hands the dialogue's jobs to the janitor
+        self._voice_jobs = [job for job in map(JobManifest.load, session.voice_job_dirs) if job is not None]
+        self.audio_file_path = list(session.chunk_paths)
+        self.word_indexes = list(session.word_indexes)
+        self._chunk_text_starts = list(session.text_starts)
+        self.last_index = len(self.audio_file_path)
+        for path in self.audio_file_path:
+            self._add_chunk_peaks(path)
+        if session.speed != 1.0 and NUMPY_AVAILABLE:
+            self.playback_speed = session.speed
+            self.ui.speed_menu.set(f"{session.speed:g}x")
+        chunk = min(session.chunk, len(self.audio_file_path) - 1)
+        try:
+            self._play_from_chunk(chunk, session.position / self.playback_speed)
+        except Exception as e:
+            log.error("Failed to restore session audio: %s", e)
+            self._delete_temp_audio_file(keep_files=True)
+            self.ui.update_status(f"❌ Could not restore the last session: {e}")
+            return
+        self.ui.set_ui_state('generated')
+        minutes, seconds = divmod(int(session.position), 60)
+        # Shown again once the voices are loaded, which resets the status
+        self._session_status = (f"⏯ Last session restored at chunk {chunk + 1}/{len(self.audio_file_path)}, "
+                                f"{minutes}:{seconds:02d}. Press Play to continue.")
+        self.ui.update_status(self._session_status)
+
+    def export_metrics(self):
+        """Writes the metrics of the last generation as JSON or Prometheus text (by file extension)."""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus text format", "*.prom"), ("All files", "*.*")],
+            title="Export Synthesis Metrics...",
+            initialfile="edge_tts_metrics.json"
+        )
+        if not file_path:
+            self.ui.update_status("Export cancelled."); return
+        try:
+            content = self.metrics.to_prometheus() if file_path.lower().endswith((".prom", ".txt")) else self.metrics.to_json()
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.ui.update_status(f"✅ Metrics exported to {os.path.basename(file_path)}")
+        except OSError as e:
+            log.error("Failed to export metrics: %s", e)
+            self.ui.update_status(f"❌ Error exporting metrics: {e}")
+
+    def open_export_dialog(self):
+        if self.export_dialog is not None and self.export_dialog.winfo_exists():
+            self.export_dialog.focus()
+            return
+        self.export_dialog = ExportFormatsDialog(self.ui, self)
+
+    def export_formats(self, labels: list[str]) -> bool:
+        """Exports the generated audio to every format in labels at once. Returns False if nothing was started."""
+        if self._format_export is not None and self._format_export.is_alive():
+            self.ui.update_status("⏳ An export is already running."); return False
+        if not self.audio_file_path or not all(os.path.exists(path) for path in self.audio_file_path):
+            self.ui.update_status("❌ No generated audio to export."); return False
+        output_dir = filedialog.askdirectory(title=f"Export {len(labels)} Formats To...", mustexist=False)
+        if not output_dir:
+            self.ui.update_status("Export cancelled."); return False
+        name = re.sub(r"[^\w\- ]", "", " ".join(self._generated_text[:40].split())).strip().replace(" ", "_")[:30] or "speech"
+        try:
+            duration = sum(self._audio_source(path).duration or 0.0 for path in self.audio_file_path)
+        except Exception as e:
+            log.warning("Unknown audio duration, exporting without progress: %s", e)
+            duration = None
+        exporter = MultiFormatExporter(on_progress=lambda label, fraction: self.events.post(
+            UiEvent.STATUS, f"📦 Exporting: {exporter.progress_text()}", UIStatusUpdate.ONLY))
+
+        def run(paths: list[str], speed: float):
+            try:
+                written = exporter.export(paths, output_dir, name, labels, duration, speed)
+                self.events.post(UiEvent.STATUS, f"✅ Exported {len(written)} formats to {output_dir}", UIStatusUpdate.ONLY)
+            except Exception as e:
+                log.error("Format export failed: %s", e)
+                self.events.post(UiEvent.STATUS, f"❌ Export failed: {e}", UIStatusUpdate.ONLY)
+        self._format_export = threading.Thread(target=run, args=(list(self.audio_file_path), self.playback_speed),
+                                               name="format-export", daemon=True)
+        self._format_export.start()
+        self.ui.update_status(f"📦 Exporting {', '.join(labels)} to {output_dir}...")
+        return True
 
     def save_audio(self):
-        file_utils.audio_files.AudioSaver(self.audio_file_path, self.ui, self.pyglet_initialized).save_audio()
\ No newline at end of file
+        file_utils.audio_files.AudioSaver(self.audio_file_path, self.ui, self.pyglet_initialized, self.playback_speed,
+                                          notify=lambda message: self.events.post(UiEvent.STATUS, message,
+                                                                                UIStatusUpdate.ONLY)).save_audio()
\ No newline at end of file
@@ -1,17 +1,9 @@
 # from mutagen.mp3 import MP3 # Option: Remove if no duration fallback planned
 # from mutagen import MutagenError # Option: Remove if no duration fallback planned
+import logging
 
+log = logging.getLogger(__name__)
 
-try:
-    from pyglet.media import Player
-    PYGLET_AVAILABLE = True
-except ImportError:
-    print("ERROR: Required library 'pyglet' not found. Please install it: pip install pyglet")
-    PYGLET_AVAILABLE = False
-except Exception as e:
-    # Catch other potential errors during pyglet import/initialization
-    print(f"ERROR: Failed to import or initialize pyglet: {e}")
-    PYGLET_AVAILABLE = False
 
 # --- Constants ---
 # DEFAULT_APPEARANCE_MODE = "Light" # REMOVED - Now starts with "System"
@@ -23,3 +15,116 @@ SEEK_INTERVAL_SECONDS = 5 # Number of seconds to jump forward/backward
 TEXTBOX_PLACEHOLDER_TEXT = "Enter text here or load from a file..."
 TEXTBOX_PLACEHOLDER_COLOR = "#888888" # Medium-Gray
 CONFIG_PATH = "ui_state.json"
+WORD_HIGHLIGHT_TAG = "spoken_word" # Textbox tag used for read-along highlighting
+WORD_HIGHLIGHT_COLOR = "#FFD54F" # Amber, readable in light and dark mode
+TEMP_DELETE_MAX_RETRIES = 6 # Attempts to delete a temp file that is still locked
+TEMP_DELETE_RETRY_DELAY = 0.25 # Initial retry delay in seconds, doubles on every attempt
+ORPHAN_MAX_AGE_SECONDS = 24 * 3600 # Job directories untouched for longer are left over from crashed sessions
+ORPHAN_GRACE_SECONDS = 600 # Job directories used more recently are never swept (another instance may use them)
+ORPHAN_SIZE_BUDGET_BYTES = 500 * 1024 * 1024 # Max disk space kept for job directories
+TEMP_DELETE_RELEASE_DELAY = 0.15 # Delay before deleting files the player just released
+UI_EVENT_DRAIN_INTERVAL_MS = 50 # How often worker events are applied on the Tk thread
+EDGE_TTS_BYTES_PER_SECOND = 48_000 / 8 # edge-tts streams audio-24khz-48kbitrate-mono-mp3
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_RING_BUFFER_SIZE = 2000 # Log lines kept in memory for diagnostics
+LOG_RATE_LIMIT_PER_INTERVAL = 20 # Max records per call site and interval (errors are never limited)
+LOG_RATE_LIMIT_INTERVAL_S = 5.0
+APP_DATA_DIR_NAME = "edge-tts-gui" # Folder under the per-user cache dir for persistent data
+RETRY_MAX_ATTEMPTS = 5 # Attempts per chunk before a generation stops (resumable)
+RETRY_BASE_DELAY_S = 0.5 # First retry waits up to this long, doubling per attempt (full jitter)
+RETRY_MAX_DELAY_S = 10.0
+JOB_MANIFESTS_KEPT = 5 # Job directories kept for resuming, older ones are deleted on start
+RATE_LIMIT_INITIAL_CONCURRENCY = 2 # Parallel synthesis requests at start
+RATE_LIMIT_MIN_CONCURRENCY = 1
+RATE_LIMIT_MAX_CONCURRENCY = 8
+RATE_LIMIT_LATENCY_TOLERANCE = 2.5 # Time to first byte above this multiple of the baseline counts as a spike
+RATE_LIMIT_DECREASE_FACTOR = 0.5 # Multiplicative back-off on errors / latency spikes
+RATE_LIMIT_DECREASE_COOLDOWN_S = 1.0 # Minimum time between two back-offs
+TOKEN_BUCKET_RATE_PER_S = 5.0 # Max synthesis requests per second for the whole process
+TOKEN_BUCKET_BURST = 10
+POOL_MAX_IDLE_CONNECTIONS = 4 # Warm synthesis websockets kept open between chunks and generations
+POOL_IDLE_TIMEOUT_S = 30.0 # Idle connections older than this are closed
+POOL_MAX_CONNECTION_AGE_S = 240.0 # Reconnect before the service's request token (5 min window) gets stale
+POOL_HEARTBEAT_S = 15.0 # Websocket ping interval, a missing pong closes the connection
+SYNTHESIS_CONNECT_TIMEOUT_S = 10
+SYNTHESIS_RECEIVE_TIMEOUT_S = 60
+JOB_QUEUE_WORKERS = 2 # Queued jobs synthesized at the same time (they share the rate limit)
+JOB_QUEUE_PRIORITIES = ("high", "normal", "low")
+SERVE_DEFAULT_HOST = "127.0.0.1" # --serve listens on localhost only unless told otherwise
+SERVE_DEFAULT_PORT = 8765
+SERVE_MAX_TEXT_CHARS = 200_000 # Longer synthesize requests are rejected
+SERVE_CHUNK_MIN_WORDS = 300 # Default chunking of synthesize requests (same as the GUI defaults)
+SERVE_CHUNK_REGEX = r".*(\.|\?|!|:).*"
+SERVE_COMPLETED_JOBS_CACHED = 256 # Finished job manifests kept in memory for repeated requests
+SERVE_JOBS_KEPT = 500 # Job directories kept on disk as the service's audio cache, older ones are deleted on start
+SPECULATION_DEBOUNCE_MS = 1500 # Idle time of the inputs before the first chunk is pre-synthesized
+SPECULATION_MAX_PER_MINUTE = 4 # Cap on speculative synthesis requests
+SPECULATION_MAX_CHARS = 2000 # Longer first chunks are not pre-synthesized
+PLAYBACK_SPEEDS = (0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0) # Local tempo choices (no re-synthesis)
+TIME_STRETCH_FRAME_MS = 40 # WSOLA frame length, output hop is half of it
+TIME_STRETCH_SEARCH_MS = 10 # Max shift of a frame to find the best waveform match
+TIME_STRETCH_SEARCH_DECIMATION = 4 # The match is searched on every 4th sample first, then refined
+EXPORT_SAMPLE_RATE = 24000 # Sample rate of the service's MP3 output, used when re-encoding exports
+EXPORT_BITRATE = "48k" # Bitrate of re-encoded exports, matches the service's MP3 output
+CHUNK_POLISH_WINDOW_MS = 10 # RMS window for silence detection and loudness
+CHUNK_POLISH_SILENCE_DB = -45.0 # Windows quieter than this (dBFS) count as silence
+CHUNK_POLISH_TARGET_DB = -20.0 # RMS level of the speech in every chunk after normalization (dBFS)
+CHUNK_POLISH_PEAK_DB = -1.0 # The normalization gain never pushes peaks above this (dBFS)
+CHUNK_POLISH_PAUSE_MS = 350 # Silence between two chunks after trimming
+CHUNK_POLISH_WORKERS = 2 # Threads post-processing finished chunks
+ADAPTIVE_FIRST_CHUNK_MIN_WORDS = 5 # The first chunk ends at the first separator after this many words
+ADAPTIVE_FIRST_CHUNK_MAX_WORDS = 40 # ... or here, if the first sentence is longer
+ADAPTIVE_GROWTH_MAX = 2.0 # Each chunk is at most this many times longer than the one before
+ADAPTIVE_SAFETY_MARGIN = 0.7 # Share of a chunk's playback time the next chunk's synthesis may use
+ADAPTIVE_DEFAULT_SECONDS_PER_WORD = 0.4 # Speech duration per word at +0% rate, until measured
+ADAPTIVE_DEFAULT_REALTIME_FACTOR = 0.3 # Synthesis seconds per audio second after the first byte, until measured
+ADAPTIVE_DEFAULT_OVERHEAD_S = 0.8 # Time to first byte of a request, until measured
+ADAPTIVE_LEARNING_RATE = 0.3 # Weight of the latest generation in the measured averages
+VOICE_PREVIEW_CACHE_BYTES = 20 * 1024 * 1024 # On-disk budget of cached voice previews, least recently played are evicted
+VOICE_PREVIEW_PREFETCH = 5 # Top search results whose previews are fetched in the background
+VOICE_PREVIEW_HOVER_MS = 250 # Hovering a voice in the list this long plays its preview
+VOICE_PREVIEW_SENTENCES = { # Sample sentence per language, English for languages without one
+    "en": "Hello! This is how I sound when I read your text aloud.",
+    "de": "Hallo! So klinge ich, wenn ich deinen Text vorlese.",
+    "fr": "Bonjour ! Voici comment je sonne quand je lis votre texte.",
+    "es": "¡Hola! Así sueno cuando leo tu texto en voz alta.",
+    "it": "Ciao! Ecco come suono quando leggo il tuo testo ad alta voce.",
+    "pt": "Olá! É assim que eu soo quando leio o seu texto em voz alta.",
+    "nl": "Hallo! Zo klink ik als ik je tekst voorlees.",
+    "pl": "Cześć! Tak brzmię, gdy czytam twój tekst na głos.",
+    "ru": "Привет! Вот так я звучу, когда читаю ваш текст вслух.",
+    "uk": "Привіт! Ось так я звучу, коли читаю ваш текст уголос.",
+    "ja": "こんにちは。あなたの文章を読み上げると、このような声になります。",
+    "zh": "你好！这就是我朗读你的文字时的声音。",
+    "ko": "안녕하세요! 제가 글을 읽어 드리면 이런 목소리입니다.",
+    "ar": "مرحبا! هكذا يبدو صوتي عندما أقرأ نصك بصوت عال.",
+    "hi": "नमस्ते! जब मैं आपका पाठ पढ़ता हूँ तो मेरी आवाज़ ऐसी होती है।",
+    "tr": "Merhaba! Metninizi sesli okuduğumda sesim böyle çıkıyor.",
+}
+CHAPTER_HEADING_REGEX = r"^[ \t]*(?:#{1,2}[ \t]+\S.*|(?:chapter|kapitel|chapitre|cap[ií]tulo)[ \t]+[\w.:-]+[^\n]{0,80})$" # Markdown # / ## headings and "Chapter N" lines
+CHAPTER_EXPORT_PARALLEL = 3 # Chapters synthesized at the same time by an export (their requests share the rate limit)
+SPEAKER_LABEL_REGEX = r"^[ \t]*(?:\[(?P<bracket>[^\]\n]{1,40})\]|(?P<name>[A-Z][\w.'-]*(?:[ \t]+[A-Z][\w.'-]*){0,2})[ \t]*:)[ \t]*" # "ALICE:" or "[Alice]" at the start of a line
+PEAK_BUCKET_SECONDS = 0.01 # Audio per min/max pair of the finest waveform overview level
+WAVEFORM_HEIGHT = 56 # Height of the waveform overview in the player (pixels)
+WAVEFORM_MAX_ZOOM_SECONDS = 5.0 # Narrowest span the waveform overview zooms in to
+WAVEFORM_SEEK_DELAY_MS = 80 # Dragging on the waveform seeks once the pointer rests this long (and on release)
+WATCH_DEFAULT_VOICE = "en-US-AriaNeural" # Voice of --watch unless --voice is given
+WATCH_POLL_SECONDS = 2.0 # How often --watch scans the folder
+WATCH_SETTLE_SECONDS = 3.0 # A file is only read once its size and mtime stayed the same this long (still being written otherwise)
+WATCH_PARALLEL = 2 # Files of the watched folder synthesized at the same time (they share the rate limit)
+WATCH_EXTENSIONS = (".txt", ".srt")
+UI_LAG_HEARTBEAT_MS = 100 # Interval of the Tk main loop heartbeat, how late it fires is the UI lag
+UI_LAG_STALL_MS = 250 # A heartbeat this late is a stall: the Tk thread's stack is sampled and its callback recorded
+UI_LAG_BUCKETS_MS = (16, 50, 100, 250, 500, 1000, 2500) # Upper bounds of the lag histogram buckets (plus one for longer)
+UI_LAG_SAMPLES = 3000 # Recent lags kept for percentiles (5 minutes of heartbeats)
+UI_LAG_REPORT_FILE_NAME = "ui_lag.json" # Written to the app data dir on exit unless --ui-lag-report names a file
+EXPORT_FORMATS = { # Targets of "Export Formats...": label -> (file suffix, ffmpeg encoder arguments)
+    "MP3 48 kbps": ("_48k.mp3", ["-c:a", "libmp3lame", "-b:a", "48k"]),
+    "MP3 128 kbps": ("_128k.mp3", ["-c:a", "libmp3lame", "-b:a", "128k"]),
+    "MP3 192 kbps": ("_192k.mp3", ["-c:a", "libmp3lame", "-b:a", "192k"]),
+    "Opus 32 kbps": ("_32k.opus", ["-c:a", "libopus", "-b:a", "32k"]),
+    "Opus 64 kbps": ("_64k.opus", ["-c:a", "libopus", "-b:a", "64k"]),
+    "WAV": (".wav", ["-c:a", "pcm_s16le"]),
+}
+EXPORT_DEFAULT_FORMATS = ("MP3 48 kbps", "MP3 128 kbps", "Opus 32 kbps", "WAV") # Preselected in the export dialog
+PCM_CACHE_CHUNKS = 4 # Decoded chunks kept for playback at another speed (the playing one, the next one and a few to seek back to)
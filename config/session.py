@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import time
+
+from file_utils.word_boundaries import WordBoundaryIndex
+
+log = logging.getLogger(__name__)
+
+SESSION_FILE_NAME = "session.json"
+_VERSION = 1
+
+
+class StoredSession:
+    """
+    The generated audio of the last session: the text it was generated from, the job (or
+    the per-voice jobs of a dialogue) and its settings, every chunk's audio file with its word boundaries and text offset, and
+    where playback stopped. Restoring it queues the chunk files again without synthesis.
+    """
+    def __init__(self, text: str, job_dir: str | None, voice: str, rate: str, pitch: str, chunk_paths: list[str],
+                 text_starts: list[int], word_indexes: list[WordBoundaryIndex], chunk: int = 0, position: float = 0.0,
+                 speed: float = 1.0, voice_job_dirs: list[str] | None = None):
+        self.text = text
+        self.job_dir = job_dir
+        self.voice_job_dirs = voice_job_dirs or [] # Jobs of a dialogue, one per voice
+        self.voice = voice
+        self.rate = rate
+        self.pitch = pitch
+        self.chunk_paths = chunk_paths
+        self.text_starts = text_starts
+        self.word_indexes = word_indexes
+        self.chunk = chunk # Chunk playback stopped in
+        self.position = position # Seconds into that chunk, at 1x speed
+        self.speed = speed
+
+    @property
+    def job_ids(self) -> set[str]:
+        """Ids of every job whose audio the session plays."""
+        return {os.path.basename(job_dir) for job_dir in [self.job_dir, *self.voice_job_dirs] if job_dir}
+
+
+def store_session(session_dir: str, session: StoredSession):
+    """Writes the session (word boundaries as one index file per chunk). Errors are logged, not raised."""
+    try:
+        for i, word_index in enumerate(session.word_indexes):
+            word_index.save(os.path.join(session_dir, f"chunk_{i:05d}{WordBoundaryIndex.FILE_SUFFIX}"))
+        data = {
+            "version": _VERSION,
+            "saved": time.time(),
+            "text": session.text,
+            "job_dir": session.job_dir,
+            "voice_job_dirs": session.voice_job_dirs,
+            "voice": session.voice,
+            "rate": session.rate,
+            "pitch": session.pitch,
+            "chunks": [{"path": path, "text_start": start} for path, start in zip(session.chunk_paths, session.text_starts)],
+            "chunk": session.chunk,
+            "position": session.position,
+            "speed": session.speed,
+        }
+        path = os.path.join(session_dir, SESSION_FILE_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+        log.info("Session with %s chunks saved to %s", len(session.chunk_paths), path)
+    except OSError as e:
+        log.error("Failed to save session: %s", e)
+
+
+def load_session(session_dir: str) -> StoredSession | None:
+    """The stored session, or None if there is none or any of its audio files is gone."""
+    path = os.path.join(session_dir, SESSION_FILE_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != _VERSION:
+            return None
+        chunks = data["chunks"]
+        if not chunks or not all(os.path.exists(chunk["path"]) for chunk in chunks):
+            log.info("Stored session ignored, its audio files are gone")
+            return None
+        word_indexes = [WordBoundaryIndex.load_for_audio(os.path.join(session_dir, f"chunk_{i:05d}"))
+                        for i in range(len(chunks))]
+        return StoredSession(data["text"], data.get("job_dir"), data["voice"], data["rate"], data["pitch"],
+                             [chunk["path"] for chunk in chunks], [chunk["text_start"] for chunk in chunks],
+                             word_indexes, int(data.get("chunk", 0)), float(data.get("position", 0.0)),
+                             float(data.get("speed", 1.0)), list(data.get("voice_job_dirs", [])))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.warning("Ignoring unreadable session %s: %s", path, e)
+        return None
+
+
+def clear_session(session_dir: str):
+    """Removes the stored session, so the next start does not restore it."""
+    try:
+        os.remove(os.path.join(session_dir, SESSION_FILE_NAME))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("Could not remove session file: %s", e)
@@ -1,10 +1,22 @@
 import json
+import logging
 import os
 
 import re
-import customtkinter as ctk
 
-from config.consts import CONFIG_PATH
+from config.consts import CONFIG_PATH, APP_DATA_DIR_NAME, CHAPTER_HEADING_REGEX
+
+log = logging.getLogger(__name__)
+
+
+def app_data_dir(*parts: str) -> str:
+    """Per-user directory for persistent app data (job manifests, caches). Created on demand."""
+    base = (os.environ.get("LOCALAPPDATA")
+            or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    path = os.path.join(base, APP_DATA_DIR_NAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
 
 
 class StoredUiState:
@@ -16,8 +28,14 @@ class StoredUiState:
                  auto_play: bool = False,
                  split: bool = False,
                  words_in_chunk: int = 300,
-                 chunk_regex: str = r".*(\.|\?|!|:).*") :
+                 chunk_regex: str = r".*(\.|\?|!|:).*",
+                 speculate: bool = False,
+                 polish: bool = False,
+                 adaptive_chunks: bool = False,
+                 chapter_regex: str = CHAPTER_HEADING_REGEX,
+                 speaker_voices: str = "") :
         if dark is None:
+            import customtkinter as ctk  # Only the GUI needs the appearance mode, headless modes run without Tk
             dark = ctk.get_appearance_mode() == "Dark"
         self.rate = rate
         self.pitch = pitch
@@ -27,6 +45,11 @@ class StoredUiState:
         self.split = split
         self.words_in_chunk = words_in_chunk
         self.chunk_regex = chunk_regex
+        self.speculate = speculate
+        self.polish = polish
+        self.adaptive_chunks = adaptive_chunks
+        self.chapter_regex = chapter_regex
+        self.speaker_voices = speaker_voices
 
 
 def load_ui_state() -> StoredUiState:
@@ -44,6 +67,11 @@ def load_ui_state() -> StoredUiState:
                 split = data.get("split", defaults.split)
                 words_in_chunk = int(data.get("words_in_chunk", defaults.words_in_chunk))
                 chunk_regex = data.get("chunk_regex", defaults.chunk_regex)
+                speculate = data.get("speculate", defaults.speculate)
+                polish = data.get("polish", defaults.polish)
+                adaptive_chunks = data.get("adaptive_chunks", defaults.adaptive_chunks)
+                chapter_regex = data.get("chapter_regex", defaults.chapter_regex)
+                speaker_voices = data.get("speaker_voices", defaults.speaker_voices)
                 return StoredUiState(rate=rate,
                                      pitch=pitch,
                                      voice=voice,
@@ -51,13 +79,20 @@ def load_ui_state() -> StoredUiState:
                                      auto_play=auto_play,
                                      split=split,
                                      words_in_chunk=words_in_chunk,
-                                     chunk_regex=chunk_regex)
+                                     chunk_regex=chunk_regex,
+                                     speculate=speculate,
+                                     polish=polish,
+                                     adaptive_chunks=adaptive_chunks,
+                                     chapter_regex=chapter_regex,
+                                     speaker_voices=speaker_voices)
     except Exception as e:
-        print(f"WARN: Failed to load audio settings from JSON: {e}")
+        log.warning("Failed to load audio settings from JSON: %s", e)
     return StoredUiState()  # Default settings if file missing or error
 
 
-def store_ui_state(voice:str, rate:int, pitch:int, auto_play:bool, split:bool, words_in_chunk:int, chunk_regex:str):
+def store_ui_state(voice:str, rate:int, pitch:int, auto_play:bool, split:bool, words_in_chunk:int, chunk_regex:str,
+                   speculate: bool = False, polish: bool = False, adaptive_chunks: bool = False,
+                   chapter_regex: str = CHAPTER_HEADING_REGEX, speaker_voices: str = ""):
     """Saves the current audio settings to a file."""
     if (not voice
             or voice == "Select Voice"
@@ -70,8 +105,13 @@ def store_ui_state(voice:str, rate:int, pitch:int, auto_play:bool, split:bool, w
     try:
         re.compile(chunk_regex)
     except re.error as e:
-        print(f"ERROR: Invalid chunk_regex: {e}")
+        log.error("Invalid chunk_regex: %s", e)
         chunk_regex = r".*(\.|\?|!|:).*"  # fallback to default
+    try:
+        re.compile(chapter_regex)
+    except re.error as e:
+        log.error("Invalid chapter_regex: %s", e)
+        chapter_regex = CHAPTER_HEADING_REGEX
 
     settings = StoredUiState(rate=rate,
                              pitch=pitch,
@@ -79,10 +119,15 @@ def store_ui_state(voice:str, rate:int, pitch:int, auto_play:bool, split:bool, w
                              auto_play=auto_play,
                              split=split,
                              words_in_chunk=words_in_chunk,
-                             chunk_regex=chunk_regex)
+                             chunk_regex=chunk_regex,
+                             speculate=speculate,
+                             polish=polish,
+                             adaptive_chunks=adaptive_chunks,
+                             chapter_regex=chapter_regex,
+                             speaker_voices=speaker_voices)
     try:
         with open(CONFIG_PATH, 'w') as f:
             json.dump(settings.__dict__, f)
-        print(f"INFO: Audio settings saved to {CONFIG_PATH}")
+        log.info("Audio settings saved to %s", CONFIG_PATH)
     except Exception as e:
-        print(f"ERROR: Failed to save audio settings: {e}")
\ No newline at end of file
+        log.error("Failed to save audio settings: %s", e)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import collections
+import logging
+import threading
+import time
+
+from config.consts import LOG_FORMAT, LOG_RING_BUFFER_SIZE, LOG_RATE_LIMIT_PER_INTERVAL, LOG_RATE_LIMIT_INTERVAL_S
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per call site (file + line) through per `interval` seconds.
+    The first record after a quiet period carries the number of similar records dropped in
+    its `suppressed` attribute, for SuppressedCountFormatter. The record itself is not
+    rewritten, as every handler runs its own filter on the same record. Errors are never dropped.
+    """
+    def __init__(self, limit: int = LOG_RATE_LIMIT_PER_INTERVAL, interval: float = LOG_RATE_LIMIT_INTERVAL_S):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows: dict[tuple[str, int], list] = {} # call site -> [window start, count, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    """Appends the number of records RateLimitFilter dropped before this one to its message."""
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            record = logging.makeLogRecord(record.__dict__) # Other handlers format the same record
+            record.message = f"{record.message} (suppressed {suppressed} similar messages)"
+        return super().formatMessage(record)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last formatted log lines in memory, e.g. for a diagnostics view or crash report."""
+    def __init__(self, capacity: int = LOG_RING_BUFFER_SIZE):
+        super().__init__()
+        self.records: collections.deque[str] = collections.deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.records.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def recent(self, count: int | None = None) -> list[str]:
+        lines = list(self.records)
+        return lines if count is None else lines[-count:]
+
+
+_ring_buffer: RingBufferHandler | None = None
+
+
+def setup_logging(level: str = "INFO") -> RingBufferHandler:
+    """Configures the root logger: console output, rate limiting and the in-memory ring buffer."""
+    global _ring_buffer
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    formatter = SuppressedCountFormatter(LOG_FORMAT)
+
+    # Each handler gets its own filter, a shared one would count every record twice
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    console.addFilter(RateLimitFilter())
+    _ring_buffer = RingBufferHandler()
+    _ring_buffer.setFormatter(formatter)
+    _ring_buffer.addFilter(RateLimitFilter())
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(console)
+    root.addHandler(_ring_buffer)
+    return _ring_buffer
+
+
+def recent_log_lines(count: int | None = None) -> list[str]:
+    """The most recent log lines kept in memory (empty before setup_logging)."""
+    return _ring_buffer.recent(count) if _ring_buffer else []
@@ -0,0 +1,75 @@
+import contextlib
+import cProfile
+import io
+import logging
+import pstats
+import tracemalloc
+
+log = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cpu", "mem")
+
+
+@contextlib.contextmanager
+def profile_session(mode: str | None, output_prefix: str = "edge_tts_profile"):
+    """
+    Wraps a session in cProfile ("cpu") or tracemalloc ("mem") and writes the reports
+    when the block exits. Does nothing if mode is None.
+      cpu: <prefix>.prof (load with pstats/snakeviz) and <prefix>.txt (top functions)
+      mem: <prefix>_mem.txt (top allocation sites and peak usage)
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _write_cpu_report(profiler, output_prefix)
+    else:
+        tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _write_memory_report(snapshot, current, peak, output_prefix)
+
+
+def _write_cpu_report(profiler: cProfile.Profile, output_prefix: str):
+    try:
+        profiler.dump_stats(f"{output_prefix}.prof")
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(30)
+        with open(f"{output_prefix}.txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        log.info("CPU profile written to %s.prof and %s.txt", output_prefix, output_prefix)
+    except OSError as e:
+        log.error("Failed to write CPU profile: %s", e)
+
+
+def _write_memory_report(snapshot: tracemalloc.Snapshot, current: int, peak: int, output_prefix: str):
+    path = f"{output_prefix}_mem.txt"
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Traced memory at exit: {current / 1_048_576:.2f} MiB, peak: {peak / 1_048_576:.2f} MiB\n\n")
+            f.write("Top allocation sites (by line):\n")
+            for stat in snapshot.statistics("lineno")[:40]:
+                f.write(f"  {stat}\n")
+            f.write("\nTop allocation tracebacks:\n")
+            for stat in snapshot.statistics("traceback")[:10]:
+                f.write(f"\n{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                for line in stat.traceback.format():
+                    f.write(f"  {line}\n")
+        log.info("Memory profile written to %s", path)
+    except OSError as e:
+        log.error("Failed to write memory profile: %s", e)
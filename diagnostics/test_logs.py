@@ -0,0 +1,29 @@
+import logging
+
+import diagnostics.logs
+from diagnostics.logs import RateLimitFilter, RingBufferHandler, SuppressedCountFormatter
+
+
+def test_suppressed_count_is_reported_once_per_handler(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(diagnostics.logs.time, "monotonic", lambda: now[0])
+    logger = logging.getLogger("diagnostics.test_logs")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    buffers = []
+    for _ in range(2): # Like setup_logging: every handler has its own filter
+        handler = RingBufferHandler()
+        handler.setFormatter(SuppressedCountFormatter("%(message)s"))
+        handler.addFilter(RateLimitFilter(limit=1, interval=10.0))
+        logger.addHandler(handler)
+        buffers.append(handler)
+    try:
+        for i, at in enumerate([0.0, 1.0, 2.0, 11.0]):
+            now[0] = at
+            logger.info("hello %s", i + 1)
+        logger.error("failure %s", 5)
+    finally:
+        for handler in buffers:
+            logger.removeHandler(handler)
+    for handler in buffers:
+        assert handler.recent() == ["hello 1", "hello 4 (suppressed 2 similar messages)", "failure 5"]
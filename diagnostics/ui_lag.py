@@ -0,0 +1,191 @@
+import bisect
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable
+
+from config.consts import UI_LAG_HEARTBEAT_MS, UI_LAG_STALL_MS, UI_LAG_BUCKETS_MS, UI_LAG_SAMPLES
+
+log = logging.getLogger(__name__)
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Offender:
+    """Stalls attributed to one callback of the Tk thread."""
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.worst_ms = 0.0
+        self.stack: list[str] = [] # Stack sampled during the worst stall
+
+    def to_dict(self) -> dict:
+        return {"callback": self.name, "stalls": self.count, "total_ms": round(self.total_ms, 1),
+                "worst_ms": round(self.worst_ms, 1), "stack": self.stack}
+
+
+class UiLagMonitor:
+    """
+    Measures how responsive the Tk main loop is. A heartbeat is scheduled with after()
+    every `interval_ms`, and how late it fires is the lag: the time some callback kept
+    the loop from handling events. Lags go into a histogram (a regression metric) and a
+    window of recent values for percentiles.
+
+    A watchdog thread samples the Tk thread's stack once a heartbeat is `stall_ms`
+    overdue, while the stall is still going on, and the stall is attributed to the first
+    callback of this app on that stack. on_stall(lag ms, callback) is called on the Tk
+    thread after each stall.
+    """
+    def __init__(self, interval_ms: int = UI_LAG_HEARTBEAT_MS, stall_ms: int = UI_LAG_STALL_MS,
+                 on_stall: Callable[[float, str], None] | None = None):
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self.on_stall = on_stall
+        self.histogram = [0] * (len(UI_LAG_BUCKETS_MS) + 1)
+        self.recent: collections.deque[float] = collections.deque(maxlen=UI_LAG_SAMPLES)
+        self.beats = 0
+        self.stalls = 0
+        self.worst_ms = 0.0
+        self.offenders: dict[str, _Offender] = {}
+        self._root = None
+        self._after_id: str | None = None
+        self._due = 0.0 # perf_counter time the pending heartbeat should fire
+        self._sample: tuple[str, list[str]] | None = None # (callback, stack) sampled during the current stall
+        self._lock = threading.Lock()
+        self._tk_thread_id: int | None = None
+        self._stopping = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self.started = time.time()
+
+    def start(self, root):
+        """Starts the heartbeat on root (call on the Tk thread) and the watchdog."""
+        self._root = root
+        self._tk_thread_id = threading.get_ident()
+        self._schedule()
+        self._watchdog = threading.Thread(target=self._watch, name="ui-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._after_id is not None and self._root is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass # Window already gone
+            self._after_id = None
+
+    def _schedule(self):
+        with self._lock:
+            self._due = time.perf_counter() + self.interval_ms / 1000
+            self._sample = None
+        self._after_id = self._root.after(self.interval_ms, self._beat)
+
+    def _beat(self):
+        with self._lock:
+            lag_ms = max(0.0, (time.perf_counter() - self._due) * 1000)
+            sample = self._sample
+        self.beats += 1
+        self.recent.append(lag_ms)
+        self.histogram[bisect.bisect_left(UI_LAG_BUCKETS_MS, lag_ms)] += 1
+        self.worst_ms = max(self.worst_ms, lag_ms)
+        if not self._stopping.is_set():
+            self._schedule()
+        if lag_ms >= self.stall_ms:
+            self._record_stall(lag_ms, sample)
+
+    def _record_stall(self, lag_ms: float, sample: tuple[str, list[str]] | None):
+        name, stack = sample if sample is not None else ("(not sampled)", [])
+        self.stalls += 1
+        offender = self.offenders.get(name)
+        if offender is None:
+            offender = self.offenders[name] = _Offender(name)
+        offender.count += 1
+        offender.total_ms += lag_ms
+        if lag_ms >= offender.worst_ms:
+            offender.worst_ms, offender.stack = lag_ms, stack
+        log.warning("UI stalled for %.0f ms in %s", lag_ms, name)
+        if self.on_stall:
+            self.on_stall(lag_ms, name)
+
+    def _watch(self):
+        """Watchdog thread: samples the Tk thread's stack while a heartbeat is overdue."""
+        while not self._stopping.wait(self.stall_ms / 4000):
+            with self._lock:
+                overdue_ms = (time.perf_counter() - self._due) * 1000
+                if overdue_ms < self.stall_ms or self._sample is not None:
+                    continue
+            frame = sys._current_frames().get(self._tk_thread_id)
+            if frame is None:
+                continue
+            sample = _attribute(traceback.extract_stack(frame))
+            with self._lock:
+                if self._sample is None:
+                    self._sample = sample
+
+    # --- Results ---
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    def top_offenders(self, count: int = 5) -> list[_Offender]:
+        return sorted(self.offenders.values(), key=lambda offender: offender.total_ms, reverse=True)[:count]
+
+    def summary_text(self) -> str:
+        text = (f"UI lag p50 {self.percentile(0.5):.0f} ms, p99 {self.percentile(0.99):.0f} ms, "
+                f"worst {self.worst_ms:.0f} ms, {self.stalls} stalls over {self.stall_ms} ms")
+        worst = self.top_offenders(1)
+        if worst:
+            text += f" (most in {worst[0].name}: {worst[0].count}x, {worst[0].total_ms / 1000:.1f}s)"
+        return text
+
+    def to_dict(self) -> dict:
+        bounds = [f"le_{bound}" for bound in UI_LAG_BUCKETS_MS] + ["inf"]
+        return {
+            "started": self.started,
+            "duration_s": round(time.time() - self.started, 1),
+            "heartbeat_ms": self.interval_ms,
+            "stall_ms": self.stall_ms,
+            "beats": self.beats,
+            "stalls": self.stalls,
+            "p50_ms": round(self.percentile(0.5), 1),
+            "p99_ms": round(self.percentile(0.99), 1),
+            "worst_ms": round(self.worst_ms, 1),
+            "histogram_ms": dict(zip(bounds, self.histogram)),
+            "offenders": [offender.to_dict() for offender in self.top_offenders(20)],
+        }
+
+    def dump(self, path: str):
+        """Writes the results as JSON. Errors are logged, not raised."""
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            log.info("UI lag report written to %s (%s stalls, worst %.0f ms)", path, self.stalls, self.worst_ms)
+        except OSError as e:
+            log.error("Failed to write UI lag report: %s", e)
+
+
+def _short(filename: str) -> str:
+    return os.path.relpath(filename, _APP_ROOT) if filename.startswith(_APP_ROOT) else filename
+
+
+def _attribute(stack: traceback.StackSummary) -> tuple[str, list[str]]:
+    """
+    The callback a stall is attributed to, with the stack as text: the first frame of
+    this app's code after Tk dispatched into Python (after the dispatch if there is none).
+    """
+    lines = [f"{_short(frame.filename)}:{frame.lineno} {frame.name}" for frame in stack]
+    if not stack:
+        return "(unknown)", lines
+    dispatch = max((i for i, frame in enumerate(stack) if "tkinter" in frame.filename
+                    and frame.name in ("__call__", "callit")), default=-1)
+    own = [i for i, frame in enumerate(stack) if frame.filename.startswith(_APP_ROOT) and i > dispatch]
+    frame = stack[own[0] if own else min(dispatch + 1, len(stack) - 1)]
+    return f"{frame.name} ({_short(frame.filename)}:{frame.lineno})", lines
@@ -1,15 +1,172 @@
 import os
-from tkinter import filedialog
+import logging
+import re
 import subprocess
 import tempfile
+import threading
+from typing import Callable
+
+from config.consts import EXPORT_SAMPLE_RATE, EXPORT_BITRATE
+from file_utils.time_stretch import TimeStretcher, pcm16_to_float, float_to_pcm16
+
+log = logging.getLogger(__name__)
+
+
+def _write_concat_list(paths: list[str]) -> str:
+    """A temporary ffmpeg concat list of the files (the caller removes it)."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as list_file:
+        for path in paths:
+            list_file.write("file '" + path.replace("'", "'\\''") + "'\n")
+    return list_file.name
+
+
+def concat_audio(paths: list[str], output_path: str):
+    """
+    Joins MP3 chunk files into output_path with ffmpeg's concat demuxer. The list only
+    references the files (a repeated chunk is listed again, not copied) and the streams
+    are copied without re-encoding (polished WAV chunks are encoded). Raises IOError if
+    ffmpeg fails.
+    """
+    if os.path.exists(output_path):
+        os.remove(output_path)  # Remove existing file if it exists
+    list_file = _write_concat_list(paths)
+    codec = ["-c", "copy"] if all(path.lower().endswith(".mp3") for path in paths) else ["-b:a", EXPORT_BITRATE]
+    try:
+        result = subprocess.run(["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_file, *codec, output_path],
+                                capture_output=True, text=True)
+    finally:
+        os.remove(list_file)  # Clean up temp file
+    log.debug(result.stdout)  # Output of the command
+    if result.returncode != 0:
+        log.error("ffmpeg failed with exit code %s: %s", result.returncode, result.stderr)
+        raise IOError(f"ffmpeg failed with exit code {result.returncode}")
+
+
+def transcode(paths: list[str], output_path: str, codec_args: list[str], duration: float | None = None,
+              on_progress: Callable[[float], None] | None = None):
+    """
+    Joins audio files into output_path, encoded with codec_args, with one single-threaded
+    ffmpeg. Its -progress output is reported as a fraction of `duration` (seconds).
+    Raises IOError if ffmpeg fails.
+    """
+    list_file = _write_concat_list(paths)
+    try:
+        process = subprocess.Popen(["ffmpeg", "-v", "error", "-nostats", "-progress", "pipe:1", "-y", "-threads", "1",
+                                    "-f", "concat", "-safe", "0", "-i", list_file, "-threads", "1", *codec_args,
+                                    output_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "out_time_us" and duration and on_progress and value.isdigit():
+                on_progress(min(1.0, int(value) / 1e6 / duration))
+        errors = process.stderr.read()
+        returncode = process.wait()
+    finally:
+        os.remove(list_file)
+    if returncode != 0:
+        log.error("ffmpeg failed to write %s: %s", output_path, errors)
+        raise IOError(f"ffmpeg failed with exit code {returncode}")
+    if on_progress:
+        on_progress(1.0)
+
+
+def probe_duration(path: str) -> float:
+    """Duration of an audio file in seconds, read with ffprobe. Raises IOError if ffprobe fails."""
+    result = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                             "-of", "default=noprint_wrappers=1:nokey=1", path], capture_output=True, text=True)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        log.error("ffprobe failed on %s: %s", path, result.stderr)
+        raise IOError(f"ffprobe failed with exit code {result.returncode}")
+
+
+def _metadata_escape(value: str) -> str:
+    return re.sub(r"([=;#\\\n])", r"\\\1", value)
+
+
+def write_chaptered(paths: list[str], titles: list[str], output_path: str) -> list[float]:
+    """
+    Joins MP3 files into output_path (streams copied) with one chapter per file, written
+    as ID3 chapter frames from an ffmpeg metadata file. Returns the duration of every
+    file. Raises IOError if ffmpeg fails.
+    """
+    durations = [probe_duration(path) for path in paths]
+    lines = [";FFMETADATA1"]
+    start = 0
+    for title, duration in zip(titles, durations):
+        end = start + round(duration * 1000)
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={start}", f"END={end}", f"title={_metadata_escape(title)}"]
+        start = end
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as metadata_file:
+        metadata_file.write("\n".join(lines) + "\n")
+    list_file = _write_concat_list(paths)
+    try:
+        result = subprocess.run(["ffmpeg", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+                                 "-i", metadata_file.name, "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1",
+                                 "-c", "copy", output_path], capture_output=True, text=True)
+    finally:
+        os.remove(list_file)
+        os.remove(metadata_file.name)
+    if result.returncode != 0:
+        log.error("ffmpeg failed to write chapters: %s", result.stderr)
+        raise IOError(f"ffmpeg failed with exit code {result.returncode}")
+    return durations
+
+
+def decode_pcm16(path: str, sample_rate: int = EXPORT_SAMPLE_RATE) -> bytes:
+    """Decodes an audio file with ffmpeg to mono 16-bit PCM. Raises IOError if ffmpeg fails."""
+    result = subprocess.run(["ffmpeg", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+                            capture_output=True)
+    if result.returncode != 0:
+        log.error("ffmpeg failed to decode %s: %s", path, result.stderr.decode(errors='replace'))
+        raise IOError(f"ffmpeg failed with exit code {result.returncode}")
+    return result.stdout
+
+
+def export_stretched(paths: list[str], output_path: str, speed: float, block_seconds: float = 1.0):
+    """
+    Joins MP3 chunk files into output_path at another tempo: ffmpeg decodes the joined
+    chunks to mono PCM, the blocks are time-stretched as they arrive and piped into a
+    second ffmpeg that encodes them, so memory stays flat for long texts. Raises
+    IOError if ffmpeg fails.
+    """
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    list_file = _write_concat_list(paths)
+    pcm_args = ["-f", "s16le", "-ac", "1", "-ar", str(EXPORT_SAMPLE_RATE)]
+    decoder = subprocess.Popen(["ffmpeg", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_file, *pcm_args, "-"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    encoder = subprocess.Popen(["ffmpeg", "-v", "error", "-y", *pcm_args, "-i", "-", "-b:a", EXPORT_BITRATE, output_path],
+                               stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        stretcher = TimeStretcher(speed, EXPORT_SAMPLE_RATE)
+        block_bytes = int(EXPORT_SAMPLE_RATE * block_seconds) * 2
+        while data := decoder.stdout.read(block_bytes):
+            encoder.stdin.write(float_to_pcm16(stretcher.feed(pcm16_to_float(data[:len(data) // 2 * 2], 1))))
+        encoder.stdin.write(float_to_pcm16(stretcher.flush()))
+    finally:
+        encoder.stdin.close()
+        decoder.stdout.close()
+        decoded, encoded = decoder.wait(), encoder.wait()
+        os.remove(list_file)
+    if decoded != 0 or encoded != 0:
+        log.error("ffmpeg failed while exporting at %sx (decoder %s, encoder %s)", speed, decoded, encoded)
+        raise IOError(f"ffmpeg failed with exit code {decoded or encoded}")
+
 
 # --- File Operations (Save audio) ---
 class AudioSaver:
-    def __init__(self, audio_file_path, ui, just_playback_initialized)-> None:
-        """Initializes the AudioSaver with the path to the audio file and UI instance."""
+    def __init__(self, audio_file_path, ui, just_playback_initialized, speed: float = 1.0, notify=None)-> None:
+        """
+        Initializes the AudioSaver with the path to the audio file and UI instance. At a
+        playback speed other than 1x the export is time-stretched on a worker thread,
+        which reports its result through notify (a thread-safe status callback).
+        """
         self.audio_file_path = audio_file_path
         self.ui = ui
         self.just_playback_initialized = just_playback_initialized
+        self.speed = speed
+        self.notify = notify or ui.update_status
 
     def save_audio(self):
         """Opens a dialog to save the temporary audio file to a user-chosen location."""
@@ -21,7 +178,7 @@ class AudioSaver:
 
         try: # Create default filename from the beginning of the text
             # Use get_input_text to avoid using placeholder as filename basis
-            initial_text = self.ui.get_input_text()[:40].strip().replace("\n", " ") # Limit length
+            initial_text = self.ui.get_input_text(max_chars=200)[:40].strip().replace("\n", " ") # Limit length
             # Sanitize filename: allow alphanumeric, space, underscore, hyphen
             sanitized_text = "".join(c for c in initial_text if c.isalnum() or c in (' ', '_', '-')).rstrip()
             # Replace spaces with underscores for better compatibility
@@ -29,10 +186,11 @@ class AudioSaver:
             # Limit length again after sanitization
             initial_filename = f"{sanitized_text[:30] if sanitized_text else 'speech'}.mp3"
         except Exception as e:
-            print(f"WARN: Error generating initial filename: {e}")
+            log.warning("Error generating initial filename: %s", e)
             initial_filename = "speech.mp3" # Fallback name
 
-        # Open 'Save As' dialog
+        # Open 'Save As' dialog, Tk is imported here so the headless modes can use this module without it
+        from tkinter import filedialog
         file_path = filedialog.asksaveasfilename(
             defaultextension=".mp3",
             filetypes=[("MP3 audio file", "*.mp3"), ("All files", "*.*")], # File type options
@@ -40,28 +198,28 @@ class AudioSaver:
             initialfile=initial_filename # Default filename suggestion
         )
 
-        if file_path: # If the user selected a path and name
+        if file_path and self.speed != 1.0:
+            self.ui.update_status(f"Saving audio at {self.speed:g}x...")
+            threading.Thread(target=self._save_stretched, args=(list(self.audio_file_path), file_path), daemon=True).start()
+        elif file_path: # If the user selected a path and name
             try:
-                print(f"INFO: Copying temp file {self.audio_file_path} to {file_path}")
-                # Use subprocess to copy the file to the selected location
-                if os.path.exists(file_path):
-                    os.remove(file_path)  # Remove existing file if it exists
-
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as temp_file:
-                    for path in self.audio_file_path:
-                        temp_file.write("file '" + path + "'\n")
-
-
-                result = subprocess.run(["ffmpeg", "-f", "concat", "-safe", "0", "-i", temp_file.name, "-c", "copy", file_path], capture_output=True, text=True)
-                print(result.stdout)  # Output of the command
-                os.remove(temp_file.name)  # Clean up temp file
+                log.info("Copying temp file %s to %s", self.audio_file_path, file_path)
+                concat_audio(self.audio_file_path, file_path)
                 self.ui.update_status(f"✅ Audio saved successfully to {os.path.basename(file_path)}")
             except IOError as e:
-                print(f"ERROR: IOError during file save: {e}")
+                log.error("IOError during file save: %s", e)
                 self.ui.update_status(f"❌ Error saving file: {e}")
             except Exception as e:
-                print(f"ERROR: Unexpected exception during file save: {e}")
+                log.error("Unexpected exception during file save: %s", e)
                 self.ui.update_status(f"❌ An unexpected error occurred during saving: {e}")
         else:
             # User cancelled the save dialog
-            self.ui.update_status("Save operation cancelled.")
\ No newline at end of file
+            self.ui.update_status("Save operation cancelled.")
+    def _save_stretched(self, paths: list[str], file_path: str):
+        try:
+            log.info("Exporting %s chunks at %sx to %s", len(paths), self.speed, file_path)
+            export_stretched(paths, file_path, self.speed)
+            self.notify(f"✅ Audio saved at {self.speed:g}x to {os.path.basename(file_path)}")
+        except Exception as e:
+            log.error("Exception during time-stretched save: %s", e)
+            self.notify(f"❌ Error saving file: {e}")
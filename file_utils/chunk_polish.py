@@ -0,0 +1,163 @@
+import argparse
+import collections
+import concurrent.futures
+import logging
+import os
+import shutil
+import threading
+import time
+import wave
+from typing import Callable
+
+from config.consts import CHUNK_POLISH_WINDOW_MS, CHUNK_POLISH_SILENCE_DB, CHUNK_POLISH_TARGET_DB, CHUNK_POLISH_PEAK_DB, \
+    CHUNK_POLISH_PAUSE_MS, CHUNK_POLISH_WORKERS, EXPORT_SAMPLE_RATE
+from file_utils.audio_files import decode_pcm16
+from file_utils.time_stretch import NUMPY_AVAILABLE, pcm16_to_float, float_to_pcm16
+
+log = logging.getLogger(__name__)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+POLISHED_SUFFIX = ".polished.wav"
+# Chunks are decoded with the ffmpeg command line, so the worker threads never touch the player's decoders
+POLISH_AVAILABLE = NUMPY_AVAILABLE and shutil.which("ffmpeg") is not None
+
+
+def window_levels(samples: 'np.ndarray', sample_rate: int, window_ms: float = CHUNK_POLISH_WINDOW_MS) -> 'np.ndarray':
+    """RMS level (dBFS) of consecutive windows of a mono signal, computed in one pass."""
+    window = max(1, int(sample_rate * window_ms / 1000))
+    count = -(-len(samples) // window)
+    padded = np.zeros(count * window, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(count, window)
+    power = np.einsum("ij,ij->i", frames, frames) / window
+    return 10 * np.log10(power + 1e-12)
+
+
+def speech_level(levels: 'np.ndarray', silence_db: float = CHUNK_POLISH_SILENCE_DB) -> float:
+    """Power-average level (dBFS) of the windows above the silence threshold."""
+    voiced = levels[levels > silence_db]
+    return float(10 * np.log10(np.mean(10 ** (voiced / 10)))) if len(voiced) else -120.0
+
+
+def polish(samples: 'np.ndarray', sample_rate: int, target_db: float = CHUNK_POLISH_TARGET_DB,
+           pause_ms: float = CHUNK_POLISH_PAUSE_MS, silence_db: float = CHUNK_POLISH_SILENCE_DB,
+           peak_db: float = CHUNK_POLISH_PEAK_DB, window_ms: float = CHUNK_POLISH_WINDOW_MS) -> tuple['np.ndarray', float]:
+    """
+    Trims the leading and trailing silence of a chunk (keeping one window of margin),
+    scales it so the RMS of its non-silent windows is target_db and pads half of the
+    pause on both sides, so consecutive chunks are always pause_ms apart. The gain is
+    capped so peaks stay below peak_db. Returns the polished samples and the shift of
+    the chunk's timeline in seconds (for the word boundaries).
+    """
+    window = max(1, int(sample_rate * window_ms / 1000))
+    levels = window_levels(samples, sample_rate, window_ms)
+    voiced = np.flatnonzero(levels > silence_db)
+    half_pause = np.zeros(int(sample_rate * pause_ms / 2000), dtype=np.float32)
+    if not len(voiced):
+        return half_pause, 0.0 # Nothing but silence
+    start = max(0, (voiced[0] - 1) * window)
+    end = min(len(samples), (voiced[-1] + 2) * window)
+    speech = samples[start:end]
+    loudness = speech_level(levels, silence_db)
+    peak = float(np.max(np.abs(speech)))
+    gain_db = min(target_db - loudness, peak_db - 20 * np.log10(peak + 1e-12))
+    polished = np.concatenate((half_pause, speech * np.float32(10 ** (gain_db / 20)), half_pause))
+    return polished, (len(half_pause) - start) / sample_rate
+
+
+def polish_file(path: str, sample_rate: int = EXPORT_SAMPLE_RATE) -> tuple[str, float]:
+    """Writes the polished version of an audio chunk next to it as WAV. Returns its path and the time shift."""
+    samples = pcm16_to_float(decode_pcm16(path, sample_rate), 1)[:, 0]
+    polished, shift = polish(samples, sample_rate)
+    output_path = path + POLISHED_SUFFIX
+    tmp_path = f"{output_path}.{threading.get_ident()}.tmp" # Repeated chunks may be polished twice at once
+    with wave.open(tmp_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(float_to_pcm16(polished))
+    os.replace(tmp_path, output_path)
+    return output_path, shift
+
+
+class ChunkPolisher:
+    """
+    Post-processes finished chunks on a small thread pool while later chunks are still
+    being synthesized. Results are handed to their callbacks in submission order, so
+    chunks keep their playback order even when a short one is polished first. A chunk
+    that cannot be polished is passed on unchanged.
+    """
+    def __init__(self, workers: int = CHUNK_POLISH_WORKERS):
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk-polish")
+        self._lock = threading.Lock()
+        self._pending: collections.deque = collections.deque() # (future, path, callback) in submission order
+
+    def submit(self, path: str, on_done: Callable[[str, float], None]):
+        """Polishes path in the background, then calls on_done(polished path, time shift) on a worker thread."""
+        future = self._executor.submit(polish_file, path)
+        with self._lock:
+            self._pending.append((future, path, on_done))
+        future.add_done_callback(lambda _: self._deliver())
+
+    def then(self, callback: Callable[[], None]):
+        """Calls callback once everything submitted so far has been handed on."""
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        with self._lock:
+            self._pending.append((future, None, lambda *_: callback()))
+        self._deliver()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _deliver(self):
+        with self._lock:
+            ready = []
+            while self._pending and self._pending[0][0].done():
+                ready.append(self._pending.popleft())
+            # Called under the lock so callbacks of different workers cannot overtake each other
+            for future, path, on_done in ready:
+                if future.cancelled():
+                    continue
+                try:
+                    polished_path, shift = future.result()
+                except Exception as e:
+                    log.warning("Could not polish %s, using it unchanged: %s", path, e)
+                    polished_path, shift = path, 0.0
+                on_done(polished_path, shift)
+
+
+# --- Benchmark ---
+def _benchmark(seconds: float = 60.0, chunk_seconds: float = 15.0, sample_rate: int = EXPORT_SAMPLE_RATE):
+    from file_utils.time_stretch import _speech_like_signal
+    rng = np.random.default_rng(2)
+    chunks = []
+    for _ in range(int(seconds / chunk_seconds)):
+        # Uneven levels and silence around every chunk, like the service's output
+        speech = _speech_like_signal(chunk_seconds, sample_rate) * np.float32(10 ** (rng.uniform(-6, 3) / 20))
+        lead, trail = (np.zeros(int(sample_rate * rng.uniform(0.05, 0.8)), dtype=np.float32) for _ in range(2))
+        chunks.append(np.concatenate((lead, speech, trail)))
+    audio_seconds = sum(len(chunk) for chunk in chunks) / sample_rate
+    started = time.process_time()
+    rounds = 0
+    while time.process_time() - started < 1.0:
+        results = [polish(chunk, sample_rate) for chunk in chunks]
+        rounds += 1
+    cpu = (time.process_time() - started) / rounds
+    removed = audio_seconds - sum(len(polished) for polished, _ in results) / sample_rate
+    before = [speech_level(window_levels(chunk, sample_rate)) for chunk in chunks]
+    after = [speech_level(window_levels(polished, sample_rate)) for polished, _ in results]
+    print(f"{len(chunks)} chunks, {audio_seconds:.1f}s of audio at {sample_rate} Hz")
+    print(f"Polishing (without the ffmpeg decode): {cpu * 1000:.1f}ms CPU, "
+          f"{audio_seconds / cpu:.0f} audio-seconds per CPU-second")
+    print(f"Silence removed: {removed:.2f}s; chunk level spread {max(before) - min(before):.1f}dB before, "
+          f"{max(after) - min(after):.1f}dB after")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput benchmark of chunk silence trimming and loudness normalization")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Total length of the test chunks (default: 60)")
+    args = parser.parse_args()
+    _benchmark(args.seconds)
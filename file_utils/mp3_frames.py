@@ -0,0 +1,62 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+# Layer III bitrates (kbit/s) by bitrate index, for MPEG-1 and for MPEG-2/2.5
+_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5) and sample rate index
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def frame_offsets(data: bytes) -> tuple[list[int], float]:
+    """
+    Byte offsets of the MPEG audio Layer III frames in data and the duration of one
+    frame in seconds. A leading ID3v2 tag and a trailing ID3v1 tag are skipped.
+    Raises ValueError for anything that is not a Layer III stream.
+    """
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+    offsets = []
+    frame_seconds = 0.0
+    while pos + 4 <= len(data) and data[pos:pos + 3] != b"TAG":
+        if data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+            raise ValueError(f"No MP3 frame header at byte {pos}")
+        version, layer = (data[pos + 1] >> 3) & 3, (data[pos + 1] >> 1) & 3
+        bitrate_index, rate_index = data[pos + 2] >> 4, (data[pos + 2] >> 2) & 3
+        if layer != 1 or version == 1 or bitrate_index in (0, 15) or rate_index == 3:
+            raise ValueError(f"Unsupported MP3 frame header at byte {pos}")
+        mpeg1 = version == 3
+        sample_rate = _SAMPLE_RATES[version][rate_index]
+        padding = (data[pos + 2] >> 1) & 1
+        offsets.append(pos)
+        pos += (144 if mpeg1 else 72) * _BITRATES[mpeg1][bitrate_index] * 1000 // sample_rate + padding
+        frame_seconds = (1152 if mpeg1 else 576) / sample_rate
+    return offsets, frame_seconds
+
+
+def split_mp3(path: str, cut_times: list[float], output_paths: list[str]) -> list[float]:
+    """
+    Splits an MP3 file into len(cut_times) + 1 files at the frame boundaries nearest to the
+    ascending cut times (seconds), without re-encoding. Returns the start time of every part
+    in the original file. Meant for cuts in pauses: the first frame of a part may lose the
+    bit reservoir data of the frame before it.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offsets, frame_seconds = frame_offsets(data)
+    if not offsets:
+        raise ValueError(f"No MP3 frames in {path}")
+    frames = [0]
+    for cut in cut_times:
+        frames.append(min(len(offsets), max(frames[-1], round(cut / frame_seconds))))
+    frames.append(len(offsets))
+    ends = offsets + [len(data)]
+    for k, output_path in enumerate(output_paths):
+        with open(output_path, "wb") as f:
+            f.write(data[ends[frames[k]]:ends[frames[k + 1]]])
+    return [frame * frame_seconds for frame in frames[:-1]]
@@ -0,0 +1,66 @@
+import concurrent.futures
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable
+
+from config.consts import EXPORT_FORMATS
+from file_utils.audio_files import transcode, export_stretched
+
+log = logging.getLogger(__name__)
+
+
+class MultiFormatExporter:
+    """
+    Exports one render to several formats in one go. Every format is its own ffmpeg
+    process, encoding on one thread straight from the chunk files, and up to one per CPU
+    core run at once, so the wall time grows with the number of formats per core rather
+    than with the number of formats. At a playback speed other than 1x the chunks are
+    time-stretched once into a temporary WAV that all formats are encoded from.
+    on_progress(label, fraction) is called from the worker threads.
+    """
+    def __init__(self, workers: int | None = None, on_progress: Callable[[str, float], None] | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self.progress: dict[str, float] = {}
+
+    def export(self, paths: list[str], output_dir: str, name: str, labels: list[str], duration: float | None = None,
+               speed: float = 1.0) -> list[str]:
+        """Writes <name><suffix> per format label to output_dir. Returns the written paths, raises the first failure."""
+        os.makedirs(output_dir, exist_ok=True)
+        self.progress = {label: 0.0 for label in labels}
+        stretched = None
+        try:
+            if speed != 1.0:
+                fd, stretched = tempfile.mkstemp(suffix=".wav")
+                os.close(fd)
+                export_stretched(paths, stretched, speed)
+                paths, duration = [stretched], duration / speed if duration else None
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.workers, len(labels)),
+                                                       thread_name_prefix="format-export") as executor:
+                futures = {}
+                for label in labels:
+                    suffix, codec_args = EXPORT_FORMATS[label]
+                    output_path = os.path.join(output_dir, name + suffix)
+                    futures[executor.submit(transcode, paths, output_path, codec_args, duration,
+                                            lambda fraction, label=label: self._progress(label, fraction))] = output_path
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            log.info("Exported %s to %s", ', '.join(labels), output_dir)
+            return list(futures.values())
+        finally:
+            if stretched is not None:
+                os.remove(stretched)
+
+    def _progress(self, label: str, fraction: float):
+        with self._lock:
+            self.progress[label] = fraction
+        if self.on_progress:
+            self.on_progress(label, fraction)
+
+    def progress_text(self) -> str:
+        with self._lock:
+            return ", ".join(f"{label} {'✔' if fraction >= 1.0 else f'{fraction:.0%}'}"
+                             for label, fraction in self.progress.items())
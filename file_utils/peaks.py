@@ -0,0 +1,145 @@
+import logging
+import math
+import os
+
+from config.consts import PEAK_BUCKET_SECONDS
+from file_utils.time_stretch import NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+log = logging.getLogger(__name__)
+
+PEAKS_SUFFIX = ".peaks"
+_MAGIC = b"PKS1"
+
+
+def compute_peaks(samples: 'np.ndarray', sample_rate: int, bucket_seconds: float = PEAK_BUCKET_SECONDS) -> 'np.ndarray':
+    """
+    Min/max of float samples (shape (n, channels)) over every bucket_seconds of audio,
+    over all channels, as int8 pairs of shape (buckets, 2). The last bucket may be shorter.
+    """
+    bucket = max(1, round(sample_rate * bucket_seconds))
+    if not len(samples):
+        return np.zeros((0, 2), dtype=np.int8)
+    low, high = samples.min(axis=1), samples.max(axis=1)
+    full = len(low) // bucket * bucket
+    mins, maxs = low[:full].reshape(-1, bucket).min(axis=1), high[:full].reshape(-1, bucket).max(axis=1)
+    if full < len(low):
+        mins, maxs = np.append(mins, low[full:].min()), np.append(maxs, high[full:].max())
+    return np.clip(np.round(np.stack((mins, maxs), axis=1) * 127), -127, 127).astype(np.int8)
+
+
+def silent_peaks(buckets: int) -> 'np.ndarray':
+    return np.zeros((max(0, buckets), 2), dtype=np.int8)
+
+
+def save_peaks(path: str, peaks: 'np.ndarray'):
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(peaks).to_bytes(8, "little"))
+        f.write(np.ascontiguousarray(peaks, dtype=np.int8).tobytes())
+
+
+def load_peaks(path: str) -> 'np.ndarray':
+    """Reads peaks written by save_peaks(). Raises ValueError for anything else."""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"Not a peaks file: {path}")
+        count = int.from_bytes(f.read(8), "little")
+        data = f.read()
+    if len(data) != count * 2:
+        raise ValueError(f"Truncated peaks file: {path}")
+    return np.frombuffer(data, dtype=np.int8).reshape(count, 2)
+
+
+def peaks_for_audio(audio_path: str, decode) -> 'np.ndarray':
+    """
+    The peaks of an audio file from its sidecar, or computed from decode() -> (samples,
+    sample rate) and cached in the sidecar for the next time the file is loaded.
+    """
+    path = audio_path + PEAKS_SUFFIX
+    if os.path.exists(path):
+        try:
+            return load_peaks(path)
+        except (OSError, ValueError) as e:
+            log.warning("Could not load peaks %s: %s", path, e)
+    peaks = compute_peaks(*decode())
+    try:
+        save_peaks(path, peaks)
+    except OSError as e:
+        log.warning("Could not cache peaks %s: %s", path, e)
+    return peaks
+
+
+class PeakPyramid:
+    """
+    Min/max peaks of a growing audio timeline at successively halved resolutions: level 0
+    has one pair per bucket (PEAK_BUCKET_SECONDS), level k one per 2**k buckets. Appending
+    a chunk only recomputes the tail of every level, and columns() reads only the level
+    whose resolution matches the requested zoom, so a redraw costs O(width) however long
+    the timeline is.
+    """
+    def __init__(self, bucket_seconds: float = PEAK_BUCKET_SECONDS):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("The waveform overview needs numpy (pip install numpy)")
+        self.bucket_seconds = bucket_seconds
+        self._levels: list['np.ndarray'] = [] # (capacity, 2) int8 per level, grown by doubling
+        self._lengths: list[int] = []
+
+    def __len__(self) -> int:
+        """Number of level 0 buckets."""
+        return self._lengths[0] if self._lengths else 0
+
+    @property
+    def duration(self) -> float:
+        return len(self) * self.bucket_seconds
+
+    def append(self, peaks: 'np.ndarray') -> int:
+        """Appends the level 0 peaks of a chunk. Returns the bucket the chunk starts at."""
+        start = first = len(self)
+        self._write(0, start, peaks)
+        level = 0
+        while self._lengths[level] > 1:
+            below = self._levels[level][:self._lengths[level]]
+            first //= 2 # Pair first of the level above may have lost its partner, redo it
+            pairs = below[2 * first:]
+            if len(pairs) % 2:
+                pairs = np.concatenate((pairs, pairs[-1:]))
+            pairs = pairs.reshape(-1, 2, 2)
+            self._write(level + 1, first, np.stack((pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)), axis=1))
+            level += 1
+        return start
+
+    def _write(self, level: int, at: int, values: 'np.ndarray'):
+        if level == len(self._levels):
+            self._levels.append(np.zeros((max(64, len(values)), 2), dtype=np.int8))
+            self._lengths.append(0)
+        end = at + len(values)
+        if end > len(self._levels[level]):
+            grown = np.zeros((max(end, 2 * len(self._levels[level])), 2), dtype=np.int8)
+            grown[:self._lengths[level]] = self._levels[level][:self._lengths[level]]
+            self._levels[level] = grown
+        self._levels[level][at:end] = values
+        self._lengths[level] = end
+
+    def columns(self, start: float, end: float, width: int) -> tuple['np.ndarray', 'np.ndarray']:
+        """
+        Min and max (-1..1) of every pixel column of a view of the buckets [start, end) that
+        is `width` pixels wide. Columns past the end of the timeline are left out.
+        """
+        if not len(self) or width <= 0 or end <= start:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        # At most two pairs of the chosen level per column
+        level = min(len(self._levels) - 1, max(0, int(math.log2(max(1.0, (end - start) / width)))))
+        data = self._levels[level][:self._lengths[level]]
+        edges = np.floor(np.linspace(start, end, width + 1) / (1 << level)).astype(np.int64)
+        edges = np.clip(edges, 0, len(data))
+        first = edges[:-1][edges[:-1] < len(data)]
+        if not len(first):
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        stop = max(int(edges[len(first)]), int(first[-1]) + 1)
+        window = data[first[0]:stop]
+        mins = np.minimum.reduceat(window[:, 0], first - first[0])
+        maxs = np.maximum.reduceat(window[:, 1], first - first[0])
+        return mins.astype(np.float32) / 127, maxs.astype(np.float32) / 127
@@ -0,0 +1,124 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+from typing import Callable
+
+from pyglet.media.codecs.base import AudioData, StaticSource, StreamingSource
+
+from config.consts import PCM_CACHE_CHUNKS
+from file_utils.time_stretch import TimeStretcher, pcm16_to_float, float_to_pcm16
+
+log = logging.getLogger(__name__)
+
+
+def decode_pcm(source: StaticSource) -> 'np.ndarray':
+    """The decoded 16-bit samples of a static source as float32, shape (n, channels)."""
+    if source.audio_format is None or source.audio_format.sample_size != 16:
+        raise ValueError("Only 16-bit audio can be time-stretched")
+    reader = source.get_queue_source()
+    blocks = []
+    while (data := reader.get_audio_data(1 << 16)) is not None:
+        blocks.append(bytes(data.data[:data.length]))
+    return pcm16_to_float(b"".join(blocks), source.audio_format.channels)
+
+
+class PcmCache:
+    """
+    Float samples of the most recently used chunk files, decoded on a worker thread so
+    the Tk thread never waits for them. Only `capacity` chunks are kept; a source that
+    is playing holds on to its own samples after they are evicted.
+    """
+    def __init__(self, capacity: int = PCM_CACHE_CHUNKS):
+        self.capacity = capacity
+        self._entries: collections.OrderedDict[str, concurrent.futures.Future] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="pcm-decode")
+
+    def request(self, path: str, source: StaticSource) -> concurrent.futures.Future:
+        """Future of the samples of a chunk file, decoding them unless they are cached or being decoded."""
+        with self._lock:
+            future = self._entries.get(path)
+            if future is None:
+                future = self._entries[path] = self._executor.submit(decode_pcm, source)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(path)
+            return future
+
+    def cached(self, path: str) -> 'np.ndarray | None':
+        """The samples of a chunk file if they are already decoded, without decoding them."""
+        with self._lock:
+            future = self._entries.get(path)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StretchedSource(StreamingSource):
+    """
+    Plays decoded samples at another tempo. The samples are requested (decoded in the
+    background) when the source is about to play, not when it is queued, and stretched
+    block by block as the player's audio thread asks for them, so changing the speed
+    costs nothing up front and never needs the service. When it starts playing it calls
+    on_start, e.g. to decode the next chunk ahead. Seeking restarts the stretcher at the
+    matching input position (times are in stretched seconds, like everything the player reports).
+    """
+    def __init__(self, request: Callable[[], concurrent.futures.Future], audio_format, speed: float, duration: float,
+                 on_start: Callable[[], None] | None = None):
+        self.audio_format = audio_format
+        self.speed = speed
+        self.on_start = on_start
+        self._request = request
+        self._future: concurrent.futures.Future | None = None
+        self._started = False
+        self._duration = duration / speed
+        self._start(0)
+
+    def prefetch(self):
+        """Starts decoding the samples, if that has not happened yet."""
+        if self._future is None:
+            self._future = self._request()
+
+    @property
+    def samples(self) -> 'np.ndarray':
+        if not self._started:
+            self._started = True
+            self.prefetch()
+            if self.on_start:
+                self.on_start()
+        return self._future.result()
+
+    def _start(self, input_position: int):
+        self._stretcher = TimeStretcher(self.speed, self.audio_format.sample_rate, self.audio_format.channels)
+        self._position = input_position # Next input sample to feed
+        self._timestamp = input_position / self.audio_format.sample_rate / self.speed
+
+    def seek(self, timestamp: float):
+        position = int(max(0.0, timestamp) * self.speed * self.audio_format.sample_rate)
+        self._start(position) # Past the end, get_audio_data() only flushes
+
+    def get_audio_data(self, num_bytes: int, compensation_time: float = 0.0) -> AudioData | None:
+        block = max(1, int(num_bytes // self.audio_format.bytes_per_frame * self.speed))
+        output = None
+        while output is None or not len(output):
+            if self._position >= len(self.samples):
+                output = self._stretcher.flush()
+                if not len(output):
+                    return None
+                break
+            output = self._stretcher.feed(self.samples[self._position:self._position + block])
+            self._position += block
+        data = float_to_pcm16(output)
+        duration = len(output) / self.audio_format.sample_rate
+        timestamp, self._timestamp = self._timestamp, self._timestamp + duration
+        return AudioData(data, len(data), timestamp, duration)
@@ -0,0 +1,133 @@
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
+
+from config.consts import TEMP_DELETE_MAX_RETRIES, TEMP_DELETE_RETRY_DELAY, \
+    ORPHAN_MAX_AGE_SECONDS, ORPHAN_SIZE_BUDGET_BYTES, ORPHAN_GRACE_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+# --- Temporary File Cleanup ---
+class TempFileJanitor:
+    """
+    Deletes temporary audio files on a background thread so the Tk main loop never waits
+    for the OS (or the audio backend) to release a file handle. Failed deletions are
+    retried with a growing delay instead of sleeping on the caller's thread.
+    """
+    def __init__(self, max_retries: int = TEMP_DELETE_MAX_RETRIES, retry_delay: float = TEMP_DELETE_RETRY_DELAY):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._requests: queue.Queue = queue.Queue()
+        self._pending: list[tuple[float, int, str]] = [] # Heap of (due time, attempt, path)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="temp-file-janitor", daemon=True)
+        self._thread.start()
+
+    def delete(self, paths: list[str], delay: float = 0.0):
+        """Queues files (or empty directories) for deletion. Returns immediately."""
+        due = time.monotonic() + delay
+        for path in paths:
+            self._requests.put((due, 0, path))
+
+    def sweep_orphans(self, jobs_dir: str, protected: set[str] = frozenset(), max_age: float = ORPHAN_MAX_AGE_SECONDS,
+                      size_budget: int = ORPHAN_SIZE_BUDGET_BYTES):
+        """
+        Queues a scan of jobs_dir for job directories left behind by crashed sessions
+        (or by jobs that were never resumed). Directories named in `protected` are kept.
+        """
+        self._requests.put(("sweep", jobs_dir, frozenset(protected), max_age, size_budget))
+
+    def shutdown(self, timeout: float = 2.0):
+        """Tries to finish queued deletions within timeout. Leftovers are reclaimed by the next sweep."""
+        self._stopping = True
+        self._requests.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            timeout = max(0.0, self._pending[0][0] - time.monotonic()) if self._pending else None
+            if self._stopping:
+                timeout = 0.0 if self._pending else None
+            try:
+                item = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            if item is None:
+                self._stopping = True
+            elif item and item[0] == "sweep":
+                self._sweep(*item[1:])
+            elif item:
+                heapq.heappush(self._pending, item)
+            self._process_due()
+            if self._stopping and not self._pending and self._requests.empty():
+                return
+
+    def _process_due(self):
+        now = time.monotonic()
+        while self._pending and (self._stopping or self._pending[0][0] <= now):
+            _, attempt, path = heapq.heappop(self._pending)
+            if not self._try_remove(path, attempt):
+                if attempt + 1 < self.max_retries and not self._stopping:
+                    # Back off: the player may still hold the handle for a moment
+                    heapq.heappush(self._pending, (now + self.retry_delay * (2 ** attempt), attempt + 1, path))
+                else:
+                    log.error("Failed to delete temp file after %s attempts: %s", attempt + 1, path)
+
+    @staticmethod
+    def _try_remove(path: str, attempt: int) -> bool:
+        try:
+            if os.path.isdir(path):
+                os.rmdir(path)
+            else:
+                os.remove(path)
+            log.info("Deleted temp file: %s", path)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            log.warning("Attempt %s - could not remove temp file %s: %s. Retrying...", attempt + 1, path, e)
+            return False
+
+    def _sweep(self, jobs_dir: str, protected: frozenset[str], max_age: float, size_budget: int):
+        """Deletes job directories untouched for max_age, then oldest-first until under size_budget."""
+        now = time.time()
+        candidates = []
+        try:
+            with os.scandir(jobs_dir) as entries:
+                for entry in entries:
+                    if entry.name not in protected and entry.is_dir(follow_symlinks=False):
+                        candidates.append((*self._dir_usage(entry.path), entry.path))
+        except OSError as e:
+            log.warning("Could not scan %s for orphaned jobs: %s", jobs_dir, e)
+            return
+
+        candidates.sort(reverse=True) # Most recently used first
+        kept_size = 0
+        reclaimed = 0
+        for mtime, size, files, path in candidates:
+            age = now - mtime
+            # Never touch recent jobs, they may belong to another running instance
+            over_budget = kept_size + size > size_budget and age > ORPHAN_GRACE_SECONDS
+            if age > max_age or over_budget:
+                if all(self._try_remove(file, 0) for file in files) and self._try_remove(path, 0):
+                    reclaimed += size
+                    continue
+            kept_size += size
+        if reclaimed:
+            log.info("Reclaimed %.1f MB of orphaned job files.", reclaimed / 1_048_576)
+
+    @staticmethod
+    def _dir_usage(path: str) -> tuple[float, int, list[str]]:
+        """(last modification, total size, files) of a job directory."""
+        mtime, size, files = os.stat(path).st_mtime, 0, []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    mtime, size = max(mtime, stat.st_mtime), size + stat.st_size
+                    files.append(entry.path)
+        return mtime, size, files
@@ -0,0 +1,66 @@
+from file_utils.word_boundaries import LineOffsetMap, WordBoundaryIndex, WordLocator, chunk_start_offsets
+
+
+def _index_of(text: str, locator: WordLocator) -> WordBoundaryIndex:
+    index = WordBoundaryIndex()
+    for n, word in enumerate(text[locator.cursor:].split()):
+        index.append(locator.locate(word), len(word), n * 10_000_000, 5_000_000)
+    return index
+
+
+def test_locator_only_searches_forward():
+    locator = WordLocator("one two one two")
+    assert locator.locate("two") == 4
+    assert locator.locate("one") == 8
+    assert locator.locate("missing") is None
+    assert locator.cursor == 11
+
+
+def test_chunk_start_offsets_count_words_not_characters():
+    text = "Hello  world.\nHello world. End"
+    assert chunk_start_offsets(text, ["Hello world.", "Hello world.", "End"]) == [0, 14, 27]
+
+
+def test_relocated_index_keeps_timings_and_moves_words():
+    text = "Hello world. Other. Hello world."
+    index = _index_of("Hello world.", WordLocator(text))
+    repeated = index.relocated(text, WordLocator(text, text.rindex("Hello")))
+    assert list(repeated.audio_offsets) == list(index.audio_offsets)
+    assert repeated.text_span(0) == (20, 25)
+    assert repeated.text_span(1) == (26, 32)
+
+
+def test_shifted_index_clamps_at_zero():
+    index = _index_of("one two three", WordLocator("one two three"))
+    shifted = index.shifted(-1.5)
+    assert [shifted.time_of(i) for i in range(3)] == [0.0, 0.0, 0.5]
+    assert shifted.find_word_at_time(0.7) == 2
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index_of("one two three", WordLocator("one two three"))
+    path = str(tmp_path / "chunk.mp3.wbi")
+    index.save(path)
+    loaded = WordBoundaryIndex.load(path)
+    assert list(loaded.text_offsets) == list(index.text_offsets)
+    assert list(loaded.audio_offsets) == list(index.audio_offsets)
+    assert len(WordBoundaryIndex.load_for_audio(str(tmp_path / "missing.mp3"))) == 0
+
+
+def test_line_offset_map_round_trip():
+    text = "first line\nsecond\n\nlast"
+    offsets = LineOffsetMap(text)
+    for offset in range(len(text)):
+        line, column = map(int, offsets.to_index(offset).split("."))
+        assert offsets.to_offset(line, column) == offset
+    assert offsets.to_index(text.index("last")) == "4.0"
+
+
+def test_line_offset_map_counts_emoji_twice_for_tk():
+    text = "a \U0001F600 b\n\U0001F600\U0001F600 word"
+    offsets = LineOffsetMap(text, utf16_columns=True)
+    assert offsets.to_index(text.index("b")) == "1.5"
+    assert offsets.to_index(text.index("word")) == "2.5"
+    for offset in range(len(text)):
+        line, column = map(int, offsets.to_index(offset).split("."))
+        assert offsets.to_offset(line, column) == offset
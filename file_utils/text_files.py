@@ -1,6 +1,13 @@
 import os
+import logging
 import re
 
+from config.consts import SPEAKER_LABEL_REGEX
+
+log = logging.getLogger(__name__)
+
+_SPEAKER_LABEL = re.compile(SPEAKER_LABEL_REGEX)
+
 
 # --- File Operations (Load Text) ---
 def _parse_srt(file_path: str) -> str:
@@ -12,7 +19,7 @@ def _parse_srt(file_path: str) -> str:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             full_content = f.read()
     except Exception as e: # Catch potential errors even opening the file
-        print(f"ERROR: Failed to read SRT file {file_path}: {e}")
+        log.error("Failed to read SRT file %s: %s", file_path, e)
         return ""
 
     lines = full_content.splitlines()
@@ -57,64 +64,60 @@ def _parse_srt(file_path: str) -> str:
     # Add the last buffer if file doesn't end with an empty line
     if buffer: dialogue_lines.append(" ".join(buffer))
 
-    # Join all collected dialogue lines into a single string with spaces
-    final_text = " ".join(line for line in dialogue_lines if line)
+    # Join all collected dialogue lines into a single string with spaces,
+    # a block with a speaker label ("ALICE: ...", "[Alice] ...") starts a new line for multi-voice dialogue
+    final_text = ""
+    for line in dialogue_lines:
+        if line:
+            final_text += ("\n" if final_text and _SPEAKER_LABEL.match(line) else " ") + line
     # Further cleanup: Replace multiple spaces with single space
-    final_text = re.sub(r'\s{2,}', ' ', final_text).strip()
+    final_text = re.sub(r'[^\S\n]{2,}', ' ', final_text).strip()
     return final_text
 
+def read_text_file(file_path: str) -> str:
+    """
+    The text of a .txt file (UTF-8, else the default system encoding) or the dialogue of
+    an .srt file, without touching the UI. Raises OSError or UnicodeDecodeError.
+    """
+    if file_path.lower().endswith(".srt"):
+        return _parse_srt(file_path)
+    try:
+        # Try UTF-8 encoding first (more common)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # If UTF-8 fails, try default system encoding (less reliable)
+        log.warning("UTF-8 decoding failed for %s. Trying default system encoding.", os.path.basename(file_path))
+        # Python 3: encoding=None uses default locale encoding
+        with open(file_path, 'r', encoding=None) as f:
+            return f.read()
+
+
 def load_text_from_file(ui:'EdgeTTSUi', file_path: str) -> str:
     """Opens a dialog to select a text (.txt or .srt) file and loads its content."""
     if not file_path:
         ui.update_status("File selection cancelled.");
         return None # User cancelled
 
+    filename = os.path.basename(file_path)
+    log.info("Loading file content from: %s", file_path)
     try:
-        content = ""
-        filename = os.path.basename(file_path)
-        print(f"INFO: Loading file content from: {file_path}")
-
-        if filename.lower().endswith(".srt"):
-            # Parse SRT file
-            content = _parse_srt(file_path)
-            ui.update_status(f"✅ Loaded dialogue from {filename}" if content else f"⚠️ No dialogue found in SRT: {filename}")
-            return content
-        else:
-            # Read plain text file
-            try:
-                # Try UTF-8 encoding first (more common)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    ui.update_status(f"✅ Loaded text from {file_path}")
-                    return content
-            except UnicodeDecodeError:
-                # If UTF-8 fails, try default system encoding (less reliable)
-                print(f"WARN: UTF-8 decoding failed for {filename}. Trying default system encoding.")
-                try:
-                    # Python 3: encoding=None uses default locale encoding
-                    with open(file_path, 'r', encoding=None) as f:
-                        content = f.read()
-                        ui.update_status(f"✅ Loaded text from {file_path}")
-                        return content
-                except UnicodeDecodeError as e_enc:
-                    # Handle specific encoding errors on second attempt
-                    print(f"ERROR: Failed to read {filename} with default encoding: {e_enc}")
-                    ui.update_status(f"❌ Error reading file (encoding issue)"); return
-                except Exception as e_read_alt:
-                     print(f"ERROR: Failed to read {filename} with default encoding: {e_read_alt}")
-                     ui.update_status(f"❌ Error reading file"); return
-            except Exception as e_read_main:
-                 # Catch other file reading errors (e.g., permission)
-                 print(f"ERROR: Failed to read file {filename}: {e_read_main}")
-                 ui.update_status(f"❌ Error reading file"); return
-
-
-
+        content = read_text_file(file_path)
     except FileNotFoundError:
-        print(f"ERROR: File not found: {file_path}")
+        log.error("File not found: %s", file_path)
         ui.update_status("❌ Error: File not found.")
+        return None
+    except UnicodeDecodeError as e_enc:
+        # Handle specific encoding errors on second attempt
+        log.error("Failed to read %s with default encoding: %s", filename, e_enc)
+        ui.update_status(f"❌ Error reading file (encoding issue)"); return None
     except Exception as e:
-        # Catch other errors during loading/parsing
-        print(f"ERROR: Exception loading/processing file {file_path}: {e}")
-        ui.update_status(f"❌ Error loading file.")
-    return None
\ No newline at end of file
+        # Catch other file reading errors (e.g., permission)
+        log.error("Failed to read file %s: %s", filename, e)
+        ui.update_status(f"❌ Error reading file"); return None
+
+    if filename.lower().endswith(".srt"):
+        ui.update_status(f"✅ Loaded dialogue from {filename}" if content else f"⚠️ No dialogue found in SRT: {filename}")
+    else:
+        ui.update_status(f"✅ Loaded text from {file_path}")
+    return content
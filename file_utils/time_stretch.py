@@ -0,0 +1,215 @@
+import argparse
+import logging
+import time
+
+from config.consts import TIME_STRETCH_FRAME_MS, TIME_STRETCH_SEARCH_MS, TIME_STRETCH_SEARCH_DECIMATION
+
+log = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class TimeStretcher:
+    """
+    Streaming WSOLA (waveform similarity overlap-add) time stretcher: changes the tempo
+    of PCM audio by `speed` without changing its pitch. Feed it blocks of samples
+    (float32, shape (n, channels)) and it returns the output that is final so far, so
+    a long chunk can be stretched block by block while it plays.
+
+    Output frames of `frame_ms` are taken from the input every frame/2 * speed samples,
+    each shifted by up to `search_ms` to the position whose waveform best continues the
+    previous frame, and cross-faded with a Hann window. The search runs on a decimated
+    mono mix (vectorized over all candidate shifts) and is refined at full resolution.
+    """
+    def __init__(self, speed: float, sample_rate: int, channels: int = 1, frame_ms: float = TIME_STRETCH_FRAME_MS,
+                 search_ms: float = TIME_STRETCH_SEARCH_MS, decimation: int = TIME_STRETCH_SEARCH_DECIMATION):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Time stretching needs numpy (pip install numpy)")
+        self.speed = speed
+        self.channels = channels
+        self.decimation = max(1, decimation)
+        frame = int(sample_rate * frame_ms / 1000)
+        self.frame = frame - frame % (2 * self.decimation) # Even, and a multiple of the decimation
+        self.hop_out = self.frame // 2
+        self.hop_in = self.hop_out * speed
+        self.search = int(sample_rate * search_ms / 1000)
+        # Periodic Hann: overlapping by half, the windows add up to exactly 1
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame) / self.frame)).astype(np.float32)[:, None]
+        self._input = np.zeros((0, channels), dtype=np.float32)
+        self._input_start = 0 # Absolute input position of self._input[0]
+        self._next_frame = 0
+        self._previous: int | None = None # Input position of the last frame taken
+        self._tail = np.zeros((self.frame - self.hop_out, channels), dtype=np.float32)
+        self._flushed = False
+        self._emitted = 0
+
+    def feed(self, samples: 'np.ndarray') -> 'np.ndarray':
+        """Adds input samples and returns the output that is complete so far."""
+        self._input = np.concatenate((self._input, samples.astype(np.float32, copy=False).reshape(-1, self.channels)))
+        return self._process()
+
+    def flush(self) -> 'np.ndarray':
+        """Returns the remaining output after the last input block."""
+        if self._flushed:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        self._flushed = True
+        end = self._input_start + len(self._input)
+        emitted = self._emitted
+        # Frames starting inside the input still have output to give, pad their reach with silence
+        self._input = np.concatenate((self._input, np.zeros((self.frame + 2 * self.search + self.hop_out, self.channels),
+                                                            dtype=np.float32)))
+        output = np.concatenate((self._process(end), self._tail))
+        # Trim the padding: the output is exactly as long as the input at the new tempo
+        output = output[:max(0, round(end / self.speed) - emitted)]
+        self._emitted = emitted + len(output)
+        return output
+
+    def _process(self, last_start: int | None = None) -> 'np.ndarray':
+        blocks = []
+        input_end = self._input_start + len(self._input)
+        while True:
+            nominal = round(self._next_frame * self.hop_in)
+            if last_start is not None and nominal >= last_start:
+                break
+            low = max(0, nominal - self.search)
+            high = nominal + self.search
+            if self._previous is None:
+                needed = nominal + self.frame
+            else:
+                needed = max(high, self._previous + self.hop_out) + self.frame
+            if needed > input_end:
+                break
+            position = nominal if self._previous is None else self._best_position(low, high)
+            frame = self._input[position - self._input_start:position - self._input_start + self.frame] * self.window
+            blocks.append(self._tail + frame[:self.hop_out])
+            self._tail = frame[self.hop_out:]
+            self._previous = position
+            self._next_frame += 1
+        # Input before the earliest position the next frame (or its template) can use is not needed anymore
+        if self._previous is not None:
+            keep_from = min(round(self._next_frame * self.hop_in) - self.search, self._previous + self.hop_out)
+            drop = max(0, keep_from - self._input_start)
+            if drop:
+                self._input = self._input[drop:]
+                self._input_start += drop
+        if not blocks:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        self._emitted += len(blocks) * self.hop_out
+        return np.concatenate(blocks)
+
+    def _best_position(self, low: int, high: int) -> int:
+        """The shift in [low, high] whose frame correlates best with the natural continuation of the last frame."""
+        offset = self._input_start
+        template_start = self._previous + self.hop_out - offset
+        mono = self._input.mean(axis=1) if self.channels > 1 else self._input[:, 0]
+        template = mono[template_start:template_start + self.frame]
+        step = self.decimation
+        coarse = self._correlate(mono[low - offset:high - offset + self.frame:step], template[::step])
+        best = low + int(np.argmax(coarse)) * step
+        # Refine around the coarse maximum at full resolution
+        fine_low = max(low, best - step + 1)
+        fine_high = min(high, best + step - 1)
+        fine = self._correlate(mono[fine_low - offset:fine_high - offset + self.frame], template)
+        return fine_low + int(np.argmax(fine))
+
+    @staticmethod
+    def _correlate(signal: 'np.ndarray', template: 'np.ndarray') -> 'np.ndarray':
+        """Normalized cross-correlation of template with every window of signal."""
+        windows = sliding_window_view(signal, len(template))
+        energy = np.einsum("ij,ij->i", windows, windows)
+        return (windows @ template) / np.sqrt(energy + 1e-9)
+
+
+def stretch(samples: 'np.ndarray', speed: float, sample_rate: int, block_size: int = 1 << 15) -> 'np.ndarray':
+    """Time-stretches a whole signal (shape (n,) or (n, channels)) block by block."""
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    stretcher = TimeStretcher(speed, sample_rate, channels)
+    blocks = [stretcher.feed(samples[i:i + block_size]) for i in range(0, len(samples), block_size)]
+    blocks.append(stretcher.flush())
+    output = np.concatenate(blocks)
+    return output[:, 0] if samples.ndim == 1 else output
+
+
+def pcm16_to_float(data: bytes, channels: int) -> 'np.ndarray':
+    return (np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0).reshape(-1, channels)
+
+
+def float_to_pcm16(samples: 'np.ndarray') -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+
+
+# --- Benchmark ---
+def _speech_like_signal(seconds: float, sample_rate: int) -> 'np.ndarray':
+    """Voiced segments (harmonics of a gliding pitch, syllable-rate envelope) separated by short pauses."""
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    return (0.3 * voiced * envelope + 0.003 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def _log_spectrogram(samples: 'np.ndarray', frame: int = 1024, hop: int = 256, floor_db: float = -60) -> 'np.ndarray':
+    frames = sliding_window_view(samples, frame)[::hop] * np.hanning(frame)
+    magnitude = np.abs(np.fft.rfft(frames, axis=1))
+    # Bins more than floor_db below the loudest count as silence, so noise in pauses does not dominate
+    return np.log10(np.maximum(magnitude, magnitude.max() * 10 ** (floor_db / 20)))
+
+
+def _spectral_distance(original: 'np.ndarray', stretched: 'np.ndarray', speed: float) -> float:
+    """
+    Log-spectral distance (dB) between the stretched signal and the original, with the
+    original's frames taken at the stretched time positions. Pitch or timbre changes and
+    phasing artifacts raise it; a perfect tempo change scores close to 0.
+    """
+    reference = _log_spectrogram(original)
+    result = _log_spectrogram(stretched)
+    positions = np.minimum((np.arange(len(result)) * speed).round().astype(int), len(reference) - 1)
+    difference = 20 * (result - reference[positions])
+    return float(np.mean(np.sqrt(np.mean(difference ** 2, axis=1))))
+
+
+def _overlap_add(samples: 'np.ndarray', speed: float, frame: int) -> 'np.ndarray':
+    """Plain overlap-add without the similarity search, as the quality baseline."""
+    hop_out = frame // 2
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)
+    count = int((len(samples) - frame) / (hop_out * speed))
+    output = np.zeros(count * hop_out + frame, dtype=np.float32)
+    for k in range(count):
+        start = round(k * hop_out * speed)
+        output[k * hop_out:k * hop_out + frame] += samples[start:start + frame] * window
+    return output
+
+
+def _benchmark(seconds: float = 60.0, sample_rate: int = 24_000):
+    signal = _speech_like_signal(seconds, sample_rate)
+    frame = TimeStretcher(1.0, sample_rate).frame
+    print(f"{seconds:.0f}s of speech-like audio at {sample_rate} Hz, {frame} sample frames")
+    print(f"{'speed':>6} {'time':>9} {'x realtime':>11} {'length error':>13} {'LSD WSOLA':>10} {'LSD plain OLA':>14}")
+    for speed in (0.5, 0.75, 1.25, 1.5, 2.0):
+        started = time.perf_counter()
+        output = stretch(signal, speed, sample_rate)
+        elapsed = time.perf_counter() - started
+        expected = len(signal) / speed
+        print(f"{speed:>5.2f}x {elapsed * 1000:>7.0f}ms {seconds / elapsed:>10.0f}x "
+              f"{(len(output) - expected) / sample_rate * 1000:>+11.0f}ms "
+              f"{_spectral_distance(signal, output, speed):>8.2f}dB "
+              f"{_spectral_distance(signal, _overlap_add(signal, speed, frame), speed):>12.2f}dB")
+    started = time.perf_counter()
+    stretcher = TimeStretcher(1.5, sample_rate)
+    stretcher.feed(signal[:sample_rate // 2])
+    print(f"Time to the first 0.5s block at 1.5x: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and quality benchmark of the WSOLA time stretcher")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of the test signal (default: 60)")
+    args = parser.parse_args()
+    _benchmark(args.seconds)
@@ -0,0 +1,202 @@
+import array
+import bisect
+import logging
+import os
+import re
+import sys
+
+log = logging.getLogger(__name__)
+
+# edge-tts reports audio offsets and durations in 100 ns ticks
+TICKS_PER_SECOND = 10_000_000
+
+
+# --- Word Boundary Index (read-along highlighting / click-to-seek) ---
+class WordBoundaryIndex:
+    """
+    Compact, array-backed index of the WordBoundary events of one audio chunk.
+    Text offsets are character offsets into the generated text, audio offsets and
+    durations are in edge-tts ticks. Events arrive in order, so every column stays
+    sorted and lookups are a binary search.
+    """
+    FILE_SUFFIX = ".wbi"
+    _MAGIC = b"WBI1"
+
+    def __init__(self):
+        self.text_offsets = array.array('q')
+        self.lengths = array.array('q')
+        self.audio_offsets = array.array('q')
+        self.durations = array.array('q')
+
+    def __len__(self) -> int:
+        return len(self.audio_offsets)
+
+    def append(self, text_offset: int, length: int, audio_offset: int, duration: int):
+        """Adds one word. Words must be appended in playback order."""
+        if self.audio_offsets and (audio_offset < self.audio_offsets[-1] or text_offset < self.text_offsets[-1]):
+            raise ValueError("Word boundaries must be appended in order.")
+        self.text_offsets.append(text_offset)
+        self.lengths.append(length)
+        self.audio_offsets.append(audio_offset)
+        self.durations.append(duration)
+
+    def relocated(self, text: str, locator: 'WordLocator') -> 'WordBoundaryIndex':
+        """
+        Same audio timings with the words resolved again from the locator's position in text,
+        for a repeated chunk that plays this chunk's audio. Words that are not found are left out.
+        """
+        index = WordBoundaryIndex()
+        for i in range(len(self)):
+            word = text[self.text_offsets[i]:self.text_offsets[i] + self.lengths[i]]
+            text_offset = locator.locate(word)
+            if text_offset is not None:
+                index.append(text_offset, len(word), self.audio_offsets[i], self.durations[i])
+        return index
+
+    def shifted(self, seconds: float) -> 'WordBoundaryIndex':
+        """Same words with the audio timeline moved by seconds (clamped at 0), for trimmed or padded audio."""
+        index = WordBoundaryIndex()
+        ticks = int(seconds * TICKS_PER_SECOND)
+        index.text_offsets = array.array('q', self.text_offsets)
+        index.lengths = array.array('q', self.lengths)
+        index.audio_offsets = array.array('q', (max(0, offset + ticks) for offset in self.audio_offsets))
+        index.durations = array.array('q', self.durations)
+        return index
+
+    def first_text_offset(self) -> int | None:
+        return self.text_offsets[0] if self.text_offsets else None
+
+    def find_word_at_time(self, seconds: float) -> int | None:
+        """Returns the index of the word spoken at the given chunk time (last started word)."""
+        i = bisect.bisect_right(self.audio_offsets, int(seconds * TICKS_PER_SECOND)) - 1
+        return i if i >= 0 else None
+
+    def find_word_at_text_offset(self, offset: int) -> int | None:
+        """Returns the index of the word covering the given text offset, if any."""
+        i = bisect.bisect_right(self.text_offsets, offset) - 1
+        if i >= 0 and offset < self.text_offsets[i] + self.lengths[i]:
+            return i
+        return None
+
+    def time_of(self, i: int) -> float:
+        """Start time of word i in seconds, relative to the chunk."""
+        return self.audio_offsets[i] / TICKS_PER_SECOND
+
+    def text_span(self, i: int) -> tuple[int, int]:
+        """(start, end) character offsets of word i."""
+        return self.text_offsets[i], self.text_offsets[i] + self.lengths[i]
+
+    @staticmethod
+    def sidecar_path(audio_path: str) -> str:
+        """Path of the index file stored next to an audio chunk."""
+        return audio_path + WordBoundaryIndex.FILE_SUFFIX
+
+    def save(self, path: str):
+        """Writes the index as a small binary file (little endian int64 columns)."""
+        columns = [self.text_offsets, self.lengths, self.audio_offsets, self.durations]
+        with open(path, 'wb') as f:
+            f.write(self._MAGIC)
+            f.write(len(self).to_bytes(8, 'little'))
+            for column in columns:
+                if sys.byteorder == 'big':
+                    column = array.array('q', column)
+                    column.byteswap()
+                f.write(column.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'WordBoundaryIndex':
+        """Reads an index written by save()."""
+        index = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(cls._MAGIC)) != cls._MAGIC:
+                raise ValueError(f"Not a word boundary index: {path}")
+            count = int.from_bytes(f.read(8), 'little')
+            for column in (index.text_offsets, index.lengths, index.audio_offsets, index.durations):
+                column.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    column.byteswap()
+        return index
+
+    @classmethod
+    def load_for_audio(cls, audio_path: str) -> 'WordBoundaryIndex':
+        """Loads the sidecar index of an audio chunk, or returns an empty index."""
+        path = cls.sidecar_path(audio_path)
+        if os.path.exists(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError, EOFError) as e:
+                log.warning("Could not load word boundary index %s: %s", path, e)
+        return cls()
+
+
+class WordLocator:
+    """
+    Resolves the words reported by edge-tts back to character offsets in the source text.
+    Keeps a cursor so every lookup only scans forward a short distance.
+    """
+    SEARCH_WINDOW = 200 # Max characters skipped between two spoken words
+
+    def __init__(self, text: str, start: int = 0):
+        self.text = text
+        self.cursor = start
+
+    def locate(self, word: str) -> int | None:
+        if not word:
+            return None
+        pos = self.text.find(word, self.cursor, self.cursor + self.SEARCH_WINDOW + len(word))
+        if pos == -1:
+            return None
+        self.cursor = pos + len(word)
+        return pos
+
+
+def chunk_start_offsets(text: str, chunks: list[str]) -> list[int]:
+    """
+    Character offset in text where each chunk begins. Chunks are consecutive runs of the
+    whitespace separated words of text, so each start is found by counting words, which
+    lets every chunk resolve its word boundaries independently of the others.
+    """
+    word_starts = [match.start() for match in re.finditer(r'\S+', text)]
+    starts = []
+    word = 0
+    for chunk in chunks:
+        starts.append(word_starts[word] if word < len(word_starts) else len(text))
+        word += len(chunk.split())
+    return starts
+
+
+class LineOffsetMap:
+    """
+    Maps between absolute character offsets and Tk "line.column" indices in O(log n),
+    avoiding Tk's "1.0 + N chars" arithmetic which walks the whole buffer.
+    Tcl 8.6 counts characters outside the Basic Multilingual Plane (most emoji) as two
+    index positions (a UTF-16 surrogate pair), Python as one. With utf16_columns the
+    columns are converted accordingly, so words after an emoji are still found.
+    """
+    _WIDE_CHAR = re.compile("[\U00010000-\U0010FFFF]")
+
+    def __init__(self, text: str, utf16_columns: bool = False):
+        self.line_starts = array.array('q', [0])
+        pos = text.find("\n")
+        while pos != -1:
+            self.line_starts.append(pos + 1)
+            pos = text.find("\n", pos + 1)
+        # Offsets of the characters Tk counts twice
+        self.wide_chars = array.array('q', (m.start() for m in self._WIDE_CHAR.finditer(text)) if utf16_columns else ())
+
+    def to_index(self, offset: int) -> str:
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        line_start = self.line_starts[line]
+        wide = bisect.bisect_left(self.wide_chars, offset) - bisect.bisect_left(self.wide_chars, line_start)
+        return f"{line + 1}.{offset - line_start + wide}"
+
+    def to_offset(self, line: int, column: int) -> int:
+        line = min(max(line, 1), len(self.line_starts))
+        line_start = self.line_starts[line - 1]
+        offset = line_start + column
+        # Every wide character before the column took two of its positions
+        for k, i in enumerate(range(bisect.bisect_left(self.wide_chars, line_start), len(self.wide_chars))):
+            if self.wide_chars[i] - line_start + k >= column:
+                break
+            offset -= 1
+        return offset
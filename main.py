@@ -1,41 +1,132 @@
 # --- START OF FILE final.py ---
 
 # --- Imports ---
-import customtkinter as ctk
+import argparse
+import logging
+
+from config.consts import SERVE_DEFAULT_HOST, SERVE_DEFAULT_PORT, WATCH_DEFAULT_VOICE, WATCH_PARALLEL, \
+    SERVE_CHUNK_MIN_WORDS
+from diagnostics.logs import setup_logging
+from diagnostics.profiling import profile_session, PROFILE_MODES
+from tts.backend import use_fake_backend, set_connection_pooling
+
+
+log = logging.getLogger(__name__)
+
+
+def pyglet_available() -> bool:
+    """Probes the audio backend, only the GUI plays audio so headless modes never import pyglet."""
+    try:
+        from pyglet.media import Player  # noqa: F401
+        return True
+    except ImportError:
+        log.error("Required library 'pyglet' not found. Please install it: pip install pyglet")
+    except Exception as e:
+        # Catch other potential errors during pyglet import/initialization
+        log.error("Failed to import or initialize pyglet: %s", e)
+    return False
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Edge TTS Text-to-Speech GUI")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Minimum level of log messages (default: INFO)")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="Profile the session with cProfile (cpu) or tracemalloc (mem), reports are written on exit")
+    parser.add_argument("--profile-out", default="edge_tts_profile",
+                        help="File name prefix of the profile reports (default: edge_tts_profile)")
+    parser.add_argument("--no-connection-pool", action="store_true",
+                        help="Open a new service connection for every chunk instead of reusing warm ones")
+    parser.add_argument("--fake-backend", action="store_true",
+                        help="Synthesize with a local fake service (silent audio, simulated throttling) instead of Edge TTS")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run a local HTTP synthesis service instead of the GUI")
+    parser.add_argument("--host", default=SERVE_DEFAULT_HOST,
+                        help=f"Address the service listens on with --serve (default: {SERVE_DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=SERVE_DEFAULT_PORT,
+                        help=f"Port of the service with --serve (default: {SERVE_DEFAULT_PORT})")
+    parser.add_argument("--ui-lag-report", metavar="FILE",
+                        help="Where the Tk main loop lag report (JSON) is written on exit (default: in the app data folder)")
+    parser.add_argument("--watch", metavar="DIR",
+                        help="Convert every .txt/.srt file dropped into DIR to MP3 instead of running the GUI")
+    parser.add_argument("--output", metavar="DIR",
+                        help="Folder the MP3 files of --watch are written to (default: DIR/audio)")
+    parser.add_argument("--voice", default=WATCH_DEFAULT_VOICE,
+                        help=f"Voice of --watch (default: {WATCH_DEFAULT_VOICE})")
+    parser.add_argument("--rate", default="+0%", help="Rate of --watch, e.g. +10%% (default: +0%%)")
+    parser.add_argument("--pitch", default="+0Hz", help="Pitch of --watch, e.g. -5Hz (default: +0Hz)")
+    parser.add_argument("--min-words", type=int, default=SERVE_CHUNK_MIN_WORDS,
+                        help=f"Minimum words per chunk with --watch (default: {SERVE_CHUNK_MIN_WORDS})")
+    parser.add_argument("--parallel", type=int, default=WATCH_PARALLEL,
+                        help=f"Files of --watch synthesized at the same time (default: {WATCH_PARALLEL})")
+    return parser.parse_args()
+
 
-from app import EdgeTTSApp
-from config.consts import PYGLET_AVAILABLE
 # --- Execution Entry Point ---
 if __name__ == "__main__":
-    # Check if just_playback is available before starting the main GUI
-    if not PYGLET_AVAILABLE:
-        # Display a simple error window if the library is missing
-        error_root = ctk.CTk()
-        # Set mode for the error window too
-        ctk.set_appearance_mode("System")
-        error_root.title("Dependency Error")
-        error_root.geometry("450x120")
-        error_label = ctk.CTkLabel(
-            error_root,
-            text="Required library 'just_playback' is missing or failed to load.\n"
-                 "Please install it using:\n"
-                 "pip install just_playback",
-            font=ctk.CTkFont(size=13)
-        )
-        error_label.pack(pady=20, padx=20)
-        # Automatically close the error window after a few seconds
-        error_root.after(7000, error_root.destroy)
-        error_root.mainloop()
+    args = parse_args()
+    setup_logging(args.log_level)
+    set_connection_pooling(not args.no_connection_pool)
+    if args.fake_backend:
+        use_fake_backend()
+    if args.serve:
+        # Headless: no window and no audio playback needed
+        from config.settings import app_data_dir
+        from file_utils.temp_files import TempFileJanitor
+        from tts.server import serve
+        janitor = TempFileJanitor()
+        jobs_dir = app_data_dir("serve", "jobs")
+        janitor.sweep_orphans(jobs_dir)
+        with profile_session(args.profile, args.profile_out):
+            serve(args.host, args.port, jobs_dir, janitor)
+        janitor.shutdown()
+    elif args.watch:
+        # Headless as well, polls the folder until interrupted
+        import os
+        from config.settings import app_data_dir
+        from file_utils.temp_files import TempFileJanitor
+        from tts.watch_folder import watch
+        janitor = TempFileJanitor()
+        jobs_dir = app_data_dir("watch", "jobs")
+        janitor.sweep_orphans(jobs_dir)
+        with profile_session(args.profile, args.profile_out):
+            watch(args.watch, args.output or os.path.join(args.watch, "audio"), jobs_dir,
+                  args.voice, args.rate, args.pitch, janitor, min_words=max(1, args.min_words),
+                  parallel=max(1, args.parallel))
+        janitor.shutdown()
     else:
-        # --- Configuration ---
-        # Set initial mode to follow the system setting
-        ctk.set_appearance_mode("System")
-        ctk.set_default_color_theme("blue")  # Options: "blue", "green", "dark-blue"
-
-        # If the library is available, run the main application
-        app = EdgeTTSApp()
-        # Set the close window action to call our on_closing method
-        app.ui.protocol("WM_DELETE_WINDOW", app.on_closing)
-        app.ui.mainloop()
+        # Tk and the audio backend are only imported for the GUI
+        import customtkinter as ctk
+        if pyglet_available():
+            # --- Configuration ---
+            # Set initial mode to follow the system setting
+            ctk.set_appearance_mode("System")
+            ctk.set_default_color_theme("blue")  # Options: "blue", "green", "dark-blue"
+
+            # If the library is available, run the main application
+            from app import EdgeTTSApp # Imports the audio player, only needed for the GUI
+            with profile_session(args.profile, args.profile_out):
+                app = EdgeTTSApp(ui_lag_report=args.ui_lag_report)
+                # Set the close window action to call our on_closing method
+                app.ui.protocol("WM_DELETE_WINDOW", app.on_closing)
+                app.ui.mainloop()
+        else:
+            # Display a simple error window if the library is missing
+            error_root = ctk.CTk()
+            # Set mode for the error window too
+            ctk.set_appearance_mode("System")
+            error_root.title("Dependency Error")
+            error_root.geometry("450x120")
+            error_label = ctk.CTkLabel(
+                error_root,
+                text="Required library 'just_playback' is missing or failed to load.\n"
+                     "Please install it using:\n"
+                     "pip install just_playback",
+                font=ctk.CTkFont(size=13)
+            )
+            error_label.pack(pady=20, padx=20)
+            # Automatically close the error window after a few seconds
+            error_root.after(7000, error_root.destroy)
+            error_root.mainloop()
 
 # --- END OF FILE ---
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import weakref
+
+import edge_tts
+
+log = logging.getLogger(__name__)
+
+_fake_service = None
+_pooling_enabled = True
+_pools: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]' = weakref.WeakKeyDictionary()
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def use_fake_backend(service=None):
+    """Routes all synthesis requests of this process to a local FakeService instead of Edge TTS."""
+    global _fake_service
+    from tts.fake_backend import FakeService
+    _fake_service = service or FakeService()
+    log.warning("Using the fake TTS backend, generated audio is silence")
+
+
+def set_connection_pooling(enabled: bool):
+    """With pooling off every chunk opens its own websocket, like plain edge_tts.Communicate."""
+    global _pooling_enabled
+    _pooling_enabled = enabled
+
+
+def connection_pool():
+    """The ConnectionPool of the running event loop (aiohttp connections can not move between loops)."""
+    from tts.connection_pool import ConnectionPool
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = ConnectionPool()
+    return pool
+
+
+def create_communicate(text: str, voice: str, rate: str, pitch: str):
+    """An edge_tts.Communicate (or a pooled or fake equivalent) streaming audio with word boundaries."""
+    if _fake_service is not None:
+        return _fake_service.communicate(text, voice, rate, pitch, boundary="WordBoundary")
+    if _pooling_enabled:
+        from tts.connection_pool import EDGE_INTERNALS_AVAILABLE, PooledCommunicate
+        if EDGE_INTERNALS_AVAILABLE:
+            return PooledCommunicate(connection_pool(), text, voice, rate, pitch, boundary="WordBoundary")
+    return edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch, boundary="WordBoundary")
+
+
+async def list_voices() -> list[dict]:
+    if _fake_service is not None:
+        return _fake_service.voices()
+    return await edge_tts.list_voices()
+
+
+def _synthesis_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="synthesis-loop", daemon=True).start()
+        return _loop
+
+
+def submit_to_synthesis_loop(coro) -> concurrent.futures.Future:
+    """
+    Schedules coro on the long-lived synthesis event loop. Generations share this loop
+    so pooled connections stay warm from one to the next. Cancelling the returned
+    future cancels the coroutine.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _synthesis_loop())
+
+
+def run_in_synthesis_loop(coro):
+    """Runs coro on the synthesis event loop and blocks until it is done."""
+    return submit_to_synthesis_loop(coro).result()
+
+
+def shutdown(timeout: float = 2.0):
+    """Closes the pooled connections and stops the synthesis loop."""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    pool = _pools.get(loop)
+    if pool is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout)
+        except Exception as e:
+            log.debug("Error closing connection pool: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Callable
+
+from config.consts import CHAPTER_HEADING_REGEX, CHAPTER_EXPORT_PARALLEL
+from file_utils.audio_files import concat_audio, write_chaptered
+from tts.job_manifest import JobManifest
+from tts.synthesis import generate_job, chunk_text
+
+log = logging.getLogger(__name__)
+
+
+class Chapter:
+    """A chapter of a text: its title, its text (heading included, without Markdown markers) and where it starts."""
+    def __init__(self, title: str, text: str, start: int):
+        self.title = title
+        self.text = text
+        self.start = start
+
+
+def detect_chapters(text: str, heading_regex: str = CHAPTER_HEADING_REGEX) -> list[Chapter]:
+    """
+    Splits text at the lines matching heading_regex (case-insensitive, one heading per line).
+    A named group "title" picks the chapter title, otherwise it is the heading line without
+    Markdown "#" markers. Text before the first heading becomes its own chapter, and a text
+    without headings is a single chapter.
+    """
+    pattern = re.compile(heading_regex, re.MULTILINE | re.IGNORECASE)
+    headings = [match for match in pattern.finditer(text) if match.group().strip()]
+    if not headings:
+        return [Chapter(" ".join(text[:40].split()) or "Chapter 1", text.strip(), 0)]
+    chapters = []
+    if text[:headings[0].start()].strip():
+        chapters.append(Chapter("Preface", text[:headings[0].start()].strip(), 0))
+    for k, match in enumerate(headings):
+        end = headings[k + 1].start() if k + 1 < len(headings) else len(text)
+        heading = match.group().strip().lstrip("#").strip()
+        title = (match.groupdict().get("title") or heading).strip()
+        chapters.append(Chapter(title, f"{heading}\n{text[match.end():end].strip()}".strip(), match.start()))
+    return chapters
+
+
+def chapter_file_name(number: int, title: str, count: int) -> str:
+    """Numbered file name of a chapter, zero-padded so the files sort in chapter order."""
+    safe_title = " ".join(re.sub(r"[^\w\- ]", "", title).split())[:60] or f"Chapter {number}"
+    return f"{number:0{max(2, len(str(count)))}d} - {safe_title}.mp3"
+
+
+def write_playlist(path: str, entries: list[tuple[str, str, float]]):
+    """Writes an extended M3U playlist (UTF-8) of (file name, title, duration) entries."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for file_name, title, duration in entries:
+            f.write(f"#EXTINF:{round(duration)},{title}\n{file_name}\n")
+
+
+class ChapterExporter:
+    """
+    Exports a text as one MP3 per chapter. Chapters are independent generation jobs, each
+    with its own manifest, and up to `parallel` of them are synthesized at once on the
+    shared synthesis loop, so all their requests still go through the process-wide rate
+    controller. Chapters with the same text share one job. A chapter's file is written as
+    soon as its audio is complete, while later chapters are still being synthesized. Once
+    all chapters are done, an M3U playlist and a single MP3 with a chapter mark per chapter
+    are written next to them. The job files are only deleted after that, so an export that
+    failed or was interrupted resumes without synthesizing the finished chapters again.
+    """
+    def __init__(self, jobs_dir: str, janitor=None, parallel: int = CHAPTER_EXPORT_PARALLEL,
+                 on_progress: Callable[[str], None] | None = None):
+        self.jobs_dir = jobs_dir
+        self.janitor = janitor
+        self.parallel = parallel
+        self.on_progress = on_progress
+
+    async def export(self, chapters: list[Chapter], output_dir: str, name: str, voice: str, rate: str, pitch: str,
+                     split: bool, min_words: int, chunk_regex: str) -> str:
+        """Runs on the synthesis loop. Returns the path of the chapter-marked single file."""
+        semaphore = asyncio.Semaphore(self.parallel)
+        jobs: dict[str, asyncio.Task] = {} # Job id -> synthesis of its manifest, shared by chapters with the same text
+        written = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+        async def synthesize(chunks: list[str], text: str) -> JobManifest:
+            async with semaphore: # Waiting chapters queue up in chapter order
+                manifest = await asyncio.to_thread(JobManifest.open_or_create, self.jobs_dir, chunks, voice, rate,
+                                                   pitch, text)
+                await generate_job(manifest, chunks, text, voice, rate, pitch)
+            return manifest
+
+        async def export_chapter(number: int, chapter: Chapter) -> str:
+            nonlocal written
+            chunks = chunk_text(chapter.text, min_words, chunk_regex) if split else [chapter.text]
+            job_id = JobManifest.job_id_for(chunks, voice, rate, pitch)
+            if job_id not in jobs:
+                jobs[job_id] = asyncio.ensure_future(synthesize(chunks, chapter.text))
+            manifest = await jobs[job_id]
+            # Joined outside the semaphore, the next chapter is already being synthesized
+            path = os.path.join(output_dir, chapter_file_name(number, chapter.title, len(chapters)))
+            await asyncio.to_thread(concat_audio, [manifest.chunk_path(i) for i in range(len(chunks))], path)
+            written += 1
+            self._progress(f"Chapter {number}/{len(chapters)} written ({written} done): {os.path.basename(path)}")
+            return path
+
+        outcomes = await asyncio.gather(*(export_chapter(number, chapter) for number, chapter in enumerate(chapters, 1)),
+                                        return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException): # The job files are kept, the next export resumes from them
+                raise outcome
+        self._progress(f"Writing the chapter-marked file and playlist of {len(chapters)} chapters...")
+        combined_path = os.path.join(output_dir, f"{name}.mp3")
+        titles = [chapter.title for chapter in chapters]
+        durations = await asyncio.to_thread(write_chaptered, outcomes, titles, combined_path)
+        write_playlist(os.path.join(output_dir, f"{name}.m3u8"),
+                       [(os.path.basename(path), title, duration) for path, title, duration in zip(outcomes, titles, durations)])
+        if self.janitor is not None:
+            for job in jobs.values():
+                self.janitor.delete(job.result().all_paths())
+                self.janitor.delete([job.result().job_dir], delay=1.0) # After its files are gone
+        log.info("Exported %s chapters to %s", len(chapters), output_dir)
+        return combined_path
+
+    def _progress(self, message: str):
+        if self.on_progress:
+            self.on_progress(message)
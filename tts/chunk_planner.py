@@ -0,0 +1,168 @@
+import argparse
+import json
+import logging
+import math
+import os
+import re
+
+from config.consts import ADAPTIVE_FIRST_CHUNK_MIN_WORDS, ADAPTIVE_FIRST_CHUNK_MAX_WORDS, ADAPTIVE_GROWTH_MAX, \
+    ADAPTIVE_SAFETY_MARGIN, ADAPTIVE_DEFAULT_SECONDS_PER_WORD, ADAPTIVE_DEFAULT_REALTIME_FACTOR, \
+    ADAPTIVE_DEFAULT_OVERHEAD_S, ADAPTIVE_LEARNING_RATE
+from tts.metrics import SynthesisMetrics
+
+log = logging.getLogger(__name__)
+
+
+def _rate_factor(rate: str) -> float:
+    """Speech speed relative to +0% for an edge-tts rate string like "+20%"."""
+    try:
+        return max(0.1, 1.0 + int(rate.rstrip("%")) / 100)
+    except ValueError:
+        return 1.0
+
+
+class ChunkPlanner:
+    """
+    Plans chunk sizes for the lowest time to first audio: the first chunk is one short
+    sentence, each following one grows geometrically up to max_words (the "Minimum words
+    in chunk" setting), as fast as synthesis can stay ahead of playback. Chunks still end
+    at the chunk separator, like the fixed-size chunking.
+
+    Sizes come from measured timings of earlier generations (speech seconds per word,
+    request overhead and realtime factor, persisted as moving averages). The planner
+    tracks how much audio is buffered ahead of playback when a chunk is ready, assuming
+    one request at a time: the next chunk may only be as long as can be synthesized
+    within `margin` of that buffer, so playback never waits. Every finished chunk adds
+    its duration minus its synthesis time to the buffer, which is what lets sizes grow.
+    The measurements are rounded up to coarse steps so the plan (and with it the job
+    id) stays the same across small changes, which keeps pre-generated first chunks usable.
+    """
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.seconds_per_word = ADAPTIVE_DEFAULT_SECONDS_PER_WORD
+        self.realtime_factor = ADAPTIVE_DEFAULT_REALTIME_FACTOR
+        self.overhead = ADAPTIVE_DEFAULT_OVERHEAD_S
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.seconds_per_word = float(data.get("seconds_per_word", self.seconds_per_word))
+                self.realtime_factor = float(data.get("realtime_factor", self.realtime_factor))
+                self.overhead = float(data.get("overhead_s", self.overhead))
+            except (OSError, ValueError) as e:
+                log.warning("Could not load chunk planner measurements from %s: %s", path, e)
+
+    def _quantized(self) -> tuple[float, float, float]:
+        """(seconds per word, realtime factor, overhead), rounded in the safe direction."""
+        return (math.floor(self.seconds_per_word * 50) / 50 or 0.02, math.ceil(self.realtime_factor * 20) / 20 or 0.05,
+                math.ceil(self.overhead * 10) / 10)
+
+    def plan(self, text: str, max_words: int, chunk_separator_regex: str, rate: str = "+0%") -> list[str]:
+        """Splits text into chunks of growing size, see the class docstring."""
+        words = re.findall(r'\S+', text)
+        sep_pattern = re.compile(chunk_separator_regex) if chunk_separator_regex else None
+        seconds_per_word, realtime_factor, overhead = self._quantized()
+        seconds_per_word /= _rate_factor(rate)
+        max_words = max(1, max_words)
+        target = min(ADAPTIVE_FIRST_CHUNK_MIN_WORDS, max_words)
+        limit = max(target, min(ADAPTIVE_FIRST_CHUNK_MAX_WORDS, max_words))
+        chunks = []
+        buffered = 0.0 # Audio seconds not played yet when the last planned chunk is ready
+        i = 0
+        while i < len(words):
+            j = min(i + target, len(words))
+            if sep_pattern:
+                while j < len(words) and j - i < limit and not sep_pattern.fullmatch(words[j - 1]):
+                    j += 1
+            chunks.append(' '.join(words[i:j]))
+            size = j - i
+            duration = size * seconds_per_word
+            buffered = duration if not buffered else buffered - (overhead + realtime_factor * duration) + duration
+            # Longest next chunk synthesized within the margin of the buffer, but no more than growth_max times longer
+            allowed = (ADAPTIVE_SAFETY_MARGIN * buffered - overhead) / realtime_factor
+            target_seconds = min(allowed, ADAPTIVE_GROWTH_MAX * duration)
+            target = max(1, min(max_words, max(size, math.floor(target_seconds / seconds_per_word))))
+            limit = max(target, max_words)
+            i = j
+        return chunks
+
+    def learn(self, metrics: SynthesisMetrics, chunks: list[str], rate: str = "+0%"):
+        """Updates the moving averages from the chunks synthesized in a finished generation and saves them."""
+        measured = [c for c in metrics.chunk_snapshot() if c.ok and not c.cache_hit and c.duplicate_of is None
+                    and c.audio_duration > 0 and c.time_to_first_byte is not None and c.index < len(chunks)]
+        if not measured:
+            return
+        words = sum(len(chunks[c.index].split()) for c in measured)
+        audio = sum(c.audio_duration for c in measured)
+        streaming = sum(max(0.0, c.synthesis_time - c.time_to_first_byte) for c in measured)
+        overhead = sum(c.time_to_first_byte for c in measured) / len(measured)
+        alpha = ADAPTIVE_LEARNING_RATE
+        self.seconds_per_word += alpha * (audio * _rate_factor(rate) / words - self.seconds_per_word)
+        self.realtime_factor += alpha * (streaming / audio - self.realtime_factor)
+        self.overhead += alpha * (overhead - self.overhead)
+        log.debug("Chunk planner: %.3fs/word, realtime factor %.3f, overhead %.2fs",
+                  self.seconds_per_word, self.realtime_factor, self.overhead)
+        if self.path is not None:
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump({"seconds_per_word": self.seconds_per_word, "realtime_factor": self.realtime_factor,
+                               "overhead_s": self.overhead}, f)
+            except OSError as e:
+                log.warning("Could not save chunk planner measurements: %s", e)
+
+
+# --- Simulation ---
+def simulate(chunk_words: list[int], seconds_per_word: float, realtime_factor: float, overhead: float,
+             concurrency: int) -> dict:
+    """
+    Plays a plan against a service model: a chunk takes overhead + realtime factor * its
+    duration to synthesize, at most `concurrency` at a time in chunk order. Returns the
+    time to first audio, the number and total length of playback stalls, and the requests.
+    """
+    slots = [0.0] * concurrency
+    ready = []
+    for words in chunk_words:
+        start = min(slots)
+        done = start + overhead + realtime_factor * words * seconds_per_word
+        slots[slots.index(start)] = done
+        ready.append(done)
+    clock = ready[0]
+    stalls, stalled = 0, 0.0
+    for i, words in enumerate(chunk_words):
+        if ready[i] > clock:
+            stalls += 1
+            stalled += ready[i] - clock
+            clock = ready[i]
+        clock += words * seconds_per_word
+    return {"requests": len(chunk_words), "first_audio_s": ready[0], "stalls": stalls, "stalled_s": stalled}
+
+
+def _compare(words: int, min_words: int, concurrency: int, realtime_factor: float, overhead: float):
+    from tts.synthesis import chunk_text
+    sentence = "The quick brown fox jumps over the lazy dog near the quiet river bank."
+    text = " ".join([sentence] * (words // len(sentence.split()) + 1))
+    planner = ChunkPlanner()
+    planner.realtime_factor, planner.overhead = realtime_factor, overhead
+    regex = r".*(\.|\?|!|:).*"
+    print(f"{len(text.split())} words, {concurrency} concurrent requests, realtime factor {realtime_factor}, "
+          f"{overhead}s overhead per request")
+    print(f"{'plan':<28} {'requests':>8} {'first audio':>12} {'stalls':>7} {'stalled':>8}")
+    plans = [(f"fixed {size} words", chunk_text(text, size, regex)) for size in sorted({min_words, 50, 20})]
+    plans.append((f"adaptive (cap {min_words} words)", planner.plan(text, min_words, regex)))
+    for name, chunks in plans:
+        r = simulate([len(chunk.split()) for chunk in chunks], planner.seconds_per_word, realtime_factor, overhead,
+                     concurrency)
+        print(f"{name:<28} {r['requests']:>8} {r['first_audio_s']:>11.2f}s {r['stalls']:>7} {r['stalled_s']:>7.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares fixed and adaptive chunk plans in a simulated service")
+    parser.add_argument("--words", type=int, default=3000, help="Length of the text (default: 3000)")
+    parser.add_argument("--min-words", type=int, default=300, help="Fixed chunk size / adaptive cap (default: 300)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Parallel requests (default: 2)")
+    parser.add_argument("--realtime-factor", type=float, default=ADAPTIVE_DEFAULT_REALTIME_FACTOR,
+                        help=f"Synthesis time per audio second (default: {ADAPTIVE_DEFAULT_REALTIME_FACTOR})")
+    parser.add_argument("--overhead", type=float, default=ADAPTIVE_DEFAULT_OVERHEAD_S,
+                        help=f"Seconds to first byte per request (default: {ADAPTIVE_DEFAULT_OVERHEAD_S})")
+    args = parser.parse_args()
+    _compare(args.words, args.min_words, args.concurrency, args.realtime_factor, args.overhead)
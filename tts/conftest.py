@@ -0,0 +1,35 @@
+import pytest
+
+import tts.backend
+import tts.rate_control
+import tts.retry
+from tts.fake_backend import FakeService, FakeThrottledError
+
+
+class FlakyService(FakeService):
+    """FakeService whose requests for the texts in `failures` fail that many times (-1: always)."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failures: dict[str, int] = {}
+
+    def communicate(self, text: str, voice: str, rate: str = "+0%", pitch: str = "+0Hz",
+                    boundary: str = "WordBoundary"):
+        remaining = self.failures.get(text, 0)
+        if remaining:
+            self.failures[text] = remaining - 1 if remaining > 0 else remaining
+            with self._lock:
+                self.requests += 1
+                self.throttled += 1
+            raise FakeThrottledError("429 Too Many Requests")
+        return super().communicate(text, voice, rate, pitch, boundary)
+
+
+@pytest.fixture
+def fake_service(monkeypatch) -> FlakyService:
+    """Routes synthesis to a fast local fake service, without request pacing or retry backoff."""
+    service = FlakyService(base_latency=0.0, seconds_per_word=0.05, realtime_factor=0.0)
+    monkeypatch.setattr(tts.backend, "_fake_service", service)
+    monkeypatch.setattr(tts.rate_control, "_shared_controller", tts.rate_control.RateController(
+        bucket=tts.rate_control.TokenBucket(rate=1000.0, capacity=1000.0)))
+    monkeypatch.setattr(tts.retry, "backoff_delay", lambda attempt, base_delay=0.0, max_delay=0.0: 0.0)
+    return service
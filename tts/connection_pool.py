@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import ssl
+import time
+from xml.sax.saxutils import escape, unescape
+
+import aiohttp
+import certifi
+from edge_tts.exceptions import NoAudioReceived, WebSocketError
+
+from config.consts import POOL_MAX_IDLE_CONNECTIONS, POOL_IDLE_TIMEOUT_S, POOL_MAX_CONNECTION_AGE_S, \
+    POOL_HEARTBEAT_S, SYNTHESIS_CONNECT_TIMEOUT_S, SYNTHESIS_RECEIVE_TIMEOUT_S
+from file_utils.word_boundaries import TICKS_PER_SECOND
+
+log = logging.getLogger(__name__)
+
+try:
+    # Private helpers of edge_tts.Communicate, requirements.txt pins the releases they are known to work with
+    from edge_tts.communicate import connect_id, date_to_string, get_headers_and_data, mkssml, \
+        remove_incompatible_characters, split_text_by_byte_length, ssml_headers_plus_data
+    from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS, WSS_URL
+    from edge_tts.data_classes import TTSConfig
+    from edge_tts.drm import DRM
+    EDGE_INTERNALS_AVAILABLE = True
+except ImportError as e:
+    log.warning("This edge-tts release lacks helpers the connection pool needs (%s), "
+                "every chunk opens its own connection", e)
+    EDGE_INTERNALS_AVAILABLE = False
+
+_MAX_SSML_TEXT_BYTES = 4096 # Longer texts are sent as several turns, like edge_tts.Communicate does
+_MP3_BITS_PER_SECOND = 48_000
+_SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+
+def _edge_service_url() -> str:
+    return (f"{WSS_URL}&ConnectionId={connect_id()}&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+            f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}")
+
+
+def _speech_config_message(boundary: str) -> str:
+    word_boundary = "true" if boundary == "WordBoundary" else "false"
+    sentence_boundary = "false" if boundary == "WordBoundary" else "true"
+    return (f"X-Timestamp:{date_to_string()}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            "Path:speech.config\r\n\r\n"
+            '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+            f'"sentenceBoundaryEnabled":"{sentence_boundary}","wordBoundaryEnabled":"{word_boundary}"'
+            '},"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n')
+
+
+class PooledConnection:
+    """An open synthesis websocket (with its HTTP session), configured for one boundary type."""
+    def __init__(self, session: aiohttp.ClientSession, websocket: aiohttp.ClientWebSocketResponse):
+        self.session = session
+        self.websocket = websocket
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.turns = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.websocket.closed
+
+    def expired(self, now: float, idle_timeout: float, max_age: float) -> bool:
+        return self.closed or now - self.last_used > idle_timeout or now - self.created > max_age
+
+    async def close(self):
+        try:
+            await self.websocket.close()
+        finally:
+            await self.session.close()
+
+
+class ConnectionPool:
+    """
+    Keeps warm synthesis websockets open between chunks and generations, so the TLS and
+    websocket handshakes are paid once per connection instead of once per chunk.
+    Idle connections are health checked by websocket heartbeats and closed after
+    `idle_timeout`, connections are replaced after `max_age`. With reuse=False every
+    request gets a fresh connection (the behaviour of edge_tts.Communicate).
+    A pool belongs to the event loop it is used on.
+    """
+    def __init__(self, url: str | None = None, reuse: bool = True, max_idle: int = POOL_MAX_IDLE_CONNECTIONS,
+                 idle_timeout: float = POOL_IDLE_TIMEOUT_S, max_age: float = POOL_MAX_CONNECTION_AGE_S,
+                 heartbeat: float = POOL_HEARTBEAT_S, boundary: str = "WordBoundary"):
+        self.url = url # None means the Edge TTS service, anything else is a local stand-in
+        self.reuse = reuse
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.heartbeat = heartbeat
+        self.boundary = boundary
+        self.opened = 0
+        self.reused = 0
+        self._idle: list[PooledConnection] = []
+        self._reaper: asyncio.Task | None = None
+
+    async def acquire(self, fresh: bool = False) -> tuple[PooledConnection, bool]:
+        """Returns a connection and whether it was reused. The most recently used one is the warmest."""
+        now = time.monotonic()
+        while self._idle and not fresh:
+            connection = self._idle.pop()
+            if connection.expired(now, self.idle_timeout, self.max_age):
+                await self._discard(connection)
+                continue
+            self.reused += 1
+            return connection, True
+        return await self._open(), False
+
+    async def release(self, connection: PooledConnection, healthy: bool):
+        """Returns a connection after a turn. Connections in an unknown state (error, aborted turn) are closed."""
+        connection.last_used = time.monotonic()
+        if not healthy or not self.reuse or connection.closed or len(self._idle) >= self.max_idle:
+            await self._discard(connection)
+            return
+        connection.turns += 1
+        self._idle.append(connection)
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+    def stats(self) -> dict:
+        return {"opened": self.opened, "reused": self.reused, "idle": len(self._idle)}
+
+    async def _open(self) -> PooledConnection:
+        timeout = aiohttp.ClientTimeout(total=None, connect=None, sock_connect=SYNTHESIS_CONNECT_TIMEOUT_S,
+                                        sock_read=SYNTHESIS_RECEIVE_TIMEOUT_S)
+        session = aiohttp.ClientSession(trust_env=True, timeout=timeout)
+        try:
+            websocket = await self._connect(session)
+            await websocket.send_str(_speech_config_message(self.boundary))
+        except BaseException:
+            await session.close()
+            raise
+        self.opened += 1
+        return PooledConnection(session, websocket)
+
+    async def _connect(self, session: aiohttp.ClientSession) -> aiohttp.ClientWebSocketResponse:
+        if self.url is not None:
+            return await session.ws_connect(self.url, heartbeat=self.heartbeat)
+        # Newer edge-tts versions add a per-client cookie to the headers
+        headers_with_muid = getattr(DRM, "headers_with_muid", None)
+        headers = headers_with_muid(WSS_HEADERS) if headers_with_muid else WSS_HEADERS
+        try:
+            return await session.ws_connect(_edge_service_url(), compress=15, headers=headers, ssl=_SSL_CONTEXT,
+                                            heartbeat=self.heartbeat)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 403:
+                raise
+            # Token rejected because of clock skew: edge-tts corrects its clock from the response, try once more
+            DRM.handle_client_response_error(e)
+            return await session.ws_connect(_edge_service_url(), compress=15, headers=headers, ssl=_SSL_CONTEXT,
+                                            heartbeat=self.heartbeat)
+
+    async def _discard(self, connection: PooledConnection):
+        try:
+            await connection.close()
+        except Exception as e:
+            log.debug("Error closing synthesis connection: %s", e)
+
+    async def _reap(self):
+        """Closes idle connections once they time out or the heartbeat found them dead."""
+        while self._idle:
+            await asyncio.sleep(min(self.idle_timeout, self.heartbeat) / 2)
+            now = time.monotonic()
+            for connection in [c for c in self._idle if c.expired(now, self.idle_timeout, self.max_age)]:
+                self._idle.remove(connection)
+                await self._discard(connection)
+
+
+class PooledCommunicate:
+    """
+    Drop-in for edge_tts.Communicate(...).stream() that runs its synthesis turns on
+    connections from a ConnectionPool. A reused connection that turns out to be closed
+    by the service before answering is replaced by a fresh one, once.
+    """
+    def __init__(self, pool: ConnectionPool, text: str, voice: str, rate: str = "+0%", pitch: str = "+0Hz",
+                 boundary: str = "WordBoundary"):
+        self.pool = pool
+        self.config = TTSConfig(voice, rate, "+0%", pitch, boundary)
+        self.texts = list(split_text_by_byte_length(escape(remove_incompatible_characters(text)), _MAX_SSML_TEXT_BYTES))
+        self.connection_reused: bool | None = None # Of the first turn, for metrics
+
+    async def stream(self):
+        audio_bytes = 0
+        for text in self.texts:
+            # Offsets restart at 0 in every turn, shift them by the audio (constant bitrate) sent so far
+            offset_compensation = audio_bytes * 8 * TICKS_PER_SECOND // _MP3_BITS_PER_SECOND
+            async for message in self._turn(text):
+                if message["type"] == "audio":
+                    audio_bytes += len(message["data"])
+                else:
+                    message["offset"] += offset_compensation
+                yield message
+
+    async def _turn(self, escaped_text: bytes):
+        for attempt in range(2):
+            connection, reused = await self.pool.acquire(fresh=attempt > 0)
+            if self.connection_reused is None:
+                self.connection_reused = reused
+            healthy = answered = False
+            try:
+                await connection.websocket.send_str(
+                    ssml_headers_plus_data(connect_id(), date_to_string(), mkssml(self.config, escaped_text)))
+                audio_received = False
+                async for received in connection.websocket:
+                    answered = True
+                    if received.type == aiohttp.WSMsgType.TEXT:
+                        encoded = received.data.encode("utf-8")
+                        headers, data = get_headers_and_data(encoded, encoded.find(b"\r\n\r\n"))
+                        path = headers.get(b"Path")
+                        if path == b"audio.metadata":
+                            for meta in json.loads(data)["Metadata"]:
+                                if meta["Type"] in ("WordBoundary", "SentenceBoundary"):
+                                    yield {"type": meta["Type"], "offset": meta["Data"]["Offset"],
+                                           "duration": meta["Data"]["Duration"],
+                                           "text": unescape(meta["Data"]["text"]["Text"])}
+                        elif path == b"turn.end":
+                            healthy = True
+                            break
+                    elif received.type == aiohttp.WSMsgType.BINARY:
+                        header_length = int.from_bytes(received.data[:2], "big")
+                        headers, data = get_headers_and_data(received.data, header_length)
+                        if headers.get(b"Path") == b"audio" and headers.get(b"Content-Type") == b"audio/mpeg" and data:
+                            audio_received = True
+                            yield {"type": "audio", "data": data}
+                    elif received.type == aiohttp.WSMsgType.ERROR:
+                        raise WebSocketError(str(received.data) if received.data else "Unknown error")
+                if not healthy:
+                    raise WebSocketError("Connection closed before the end of the turn")
+                if not audio_received:
+                    raise NoAudioReceived("No audio was received. Please verify that your parameters are correct.")
+                return
+            except (aiohttp.ClientError, ConnectionError, WebSocketError) as e:
+                if not reused or answered:
+                    raise
+                log.debug("Pooled connection went stale (%s), retrying on a new one", e)
+            finally:
+                await self.pool.release(connection, healthy)
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import bisect
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Callable
+
+from config.consts import SPEAKER_LABEL_REGEX
+from file_utils.mp3_frames import split_mp3
+from file_utils.word_boundaries import WordBoundaryIndex, TICKS_PER_SECOND
+from tts.job_manifest import JobManifest, PART_SUFFIX
+from tts.metrics import SynthesisMetrics
+from tts.synthesis import generate_job
+
+log = logging.getLogger(__name__)
+
+SPEAKER_LABEL = re.compile(SPEAKER_LABEL_REGEX, re.MULTILINE)
+SEGMENT_SEPARATOR = "\n\n" # Between the turns of one voice in its script, read as a pause
+
+
+class Segment:
+    """One turn of a dialogue: who speaks it, with which voice, its text and where that text starts in the script."""
+    def __init__(self, speaker: str | None, voice: str, text: str, start: int):
+        self.speaker = speaker
+        self.voice = voice
+        self.text = text
+        self.start = start
+
+
+def parse_speaker_voices(spec: str) -> dict[str, str]:
+    """Parses "NARRATOR=en-US-GuyNeural, Alice=en-US-AriaNeural" into {speaker (upper case): voice}. Raises ValueError."""
+    voices = {}
+    for entry in re.split(r"[,;\n]", spec):
+        if not entry.strip():
+            continue
+        speaker, sep, voice = entry.partition("=")
+        if not sep or not speaker.strip() or not voice.strip():
+            raise ValueError(f"Expected SPEAKER=voice, got '{entry.strip()}'")
+        voices[speaker.strip().upper()] = voice.strip()
+    return voices
+
+
+def parse_script(text: str, speaker_voices: dict[str, str], default_voice: str) -> list[Segment]:
+    """
+    Splits a script into turns at the lines starting with the label of a mapped speaker
+    ("ALICE: ..." or "[Alice] ..."). The label is not spoken. Lines without a label, or
+    with the label of a speaker that has no voice, continue the current turn; text before
+    the first label is read by the default voice.
+    """
+    bounds = [] # (label start, text start, speaker)
+    for match in SPEAKER_LABEL.finditer(text):
+        speaker = (match.group("bracket") or match.group("name")).strip().upper()
+        if speaker in speaker_voices:
+            bounds.append((match.start(), match.end(), speaker))
+    segments = []
+
+    def add(speaker: str | None, start: int, end: int):
+        raw = text[start:end]
+        if raw.strip():
+            voice = speaker_voices[speaker] if speaker is not None else default_voice
+            segments.append(Segment(speaker, voice, raw.strip(), start + len(raw) - len(raw.lstrip())))
+
+    add(None, 0, bounds[0][0] if bounds else len(text))
+    for k, (_, start, speaker) in enumerate(bounds):
+        add(speaker, start, bounds[k + 1][0] if k + 1 < len(bounds) else len(text))
+    return segments
+
+
+def is_dialogue(segments: list[Segment]) -> bool:
+    return any(segment.speaker is not None for segment in segments)
+
+
+class VoiceScript:
+    """
+    All turns of one voice, joined into one text in script order and cut into chunks of
+    whole turns, so a voice needs as many requests as a single-voice text of that length,
+    however often the speakers alternate.
+    """
+    def __init__(self, voice: str, segments: list[Segment], segment_ids: list[int], max_words: int):
+        self.voice = voice
+        self.segment_ids = segment_ids
+        self.text = SEGMENT_SEPARATOR.join(segments[i].text for i in segment_ids)
+        self.offsets = [] # Start of every turn in self.text
+        offset = 0
+        for i in segment_ids:
+            self.offsets.append(offset)
+            offset += len(segments[i].text) + len(SEGMENT_SEPARATOR)
+        self.chunks: list[str] = []
+        self.chunk_turns: list[list[int]] = [] # Positions in segment_ids of the turns of every chunk
+        turns, words = [], 0
+        for position, i in enumerate(segment_ids):
+            turns.append(position)
+            words += len(segments[i].text.split())
+            if words >= max_words or position == len(segment_ids) - 1:
+                self.chunks.append(SEGMENT_SEPARATOR.join(segments[segment_ids[p]].text for p in turns))
+                self.chunk_turns.append(turns)
+                turns, words = [], 0
+
+
+def plan_voice_scripts(segments: list[Segment], max_words: int) -> list[VoiceScript]:
+    """One VoiceScript per voice, in the order the voices first speak."""
+    by_voice: dict[str, list[int]] = {}
+    for i, segment in enumerate(segments):
+        by_voice.setdefault(segment.voice, []).append(i)
+    return [VoiceScript(voice, segments, ids, max(1, max_words)) for voice, ids in by_voice.items()]
+
+
+def split_turns(script: VoiceScript, chunk: int, path: str, word_index: WordBoundaryIndex,
+                segments: list[Segment]) -> list[tuple[int, str, WordBoundaryIndex]]:
+    """
+    Cuts the audio of a voice script chunk into its turns, in the middle of the pause
+    between the last word of a turn and the first word of the next. Returns
+    (segment id, audio path, word index with offsets into the dialogue script) per turn.
+    """
+    turns = script.chunk_turns[chunk]
+    boundaries = [bisect.bisect_left(word_index.text_offsets, script.offsets[p]) for p in turns]
+    cuts = []
+    for w in boundaries[1:]:
+        previous_end = word_index.audio_offsets[w - 1] + word_index.durations[w - 1] if w > 0 else 0
+        next_start = word_index.audio_offsets[w] if w < len(word_index) else previous_end
+        cuts.append((previous_end + next_start) / 2 / TICKS_PER_SECOND)
+    if len(turns) == 1:
+        paths, starts = [path], [0.0]
+    else:
+        paths = [f"{path}{PART_SUFFIX}{k:02d}.mp3" for k in range(len(turns))]
+        starts = split_mp3(path, cuts, paths)
+    parts = []
+    for k, p in enumerate(turns):
+        segment_id = script.segment_ids[p]
+        shift = script.offsets[p] - segments[segment_id].start
+        start_ticks = int(starts[k] * TICKS_PER_SECOND)
+        index = WordBoundaryIndex()
+        for w in range(boundaries[k], boundaries[k + 1] if k + 1 < len(turns) else len(word_index)):
+            index.append(word_index.text_offsets[w] - shift, word_index.lengths[w],
+                         max(0, word_index.audio_offsets[w] - start_ticks), word_index.durations[w])
+        parts.append((segment_id, paths[k], index))
+    return parts
+
+
+async def generate_dialogue(scripts: list[VoiceScript], manifests: list[JobManifest], segments: list[Segment],
+                            rate: str, pitch: str, metrics: SynthesisMetrics | None = None,
+                            on_segment_ready: Callable[[int, str, WordBoundaryIndex, int], None] | None = None,
+                            on_retry: Callable[[int, int, Exception, float], None] | None = None) -> int:
+    """
+    Generates every voice script as its own job (one manifest per voice, resumable), all
+    at once on the synthesis loop under the shared rate controller. Chunks are cut into
+    their turns on worker threads as they finish and on_segment_ready(segment id, path,
+    word index, text start) is called in script order. Returns the number of turns ready. Raises
+    ChunkSynthesisError for the first chunk that is out of retries, once all voices stopped.
+    """
+    results: dict[int, tuple[str, WordBoundaryIndex]] = {}
+    next_segment = 0
+    voice_metrics = [SynthesisMetrics() for _ in scripts]
+    splits: list[asyncio.Task] = [] # Chunks being cut into their turns on worker threads
+
+    async def split(script: VoiceScript, i: int, path: str, word_index: WordBoundaryIndex):
+        nonlocal next_segment
+        parts = await asyncio.to_thread(split_turns, script, i, path, word_index, segments)
+        for segment_id, part_path, part_index in parts:
+            results[segment_id] = (part_path, part_index)
+        while next_segment in results:
+            part_path, part_index = results.pop(next_segment)
+            if on_segment_ready:
+                on_segment_ready(next_segment, part_path, part_index, segments[next_segment].start)
+            next_segment += 1
+
+    def chunk_ready(script: VoiceScript):
+        def on_chunk_ready(i: int, path: str, word_index: WordBoundaryIndex, text_start: int):
+            splits.append(asyncio.ensure_future(split(script, i, path, word_index)))
+        return on_chunk_ready
+
+    if metrics is not None:
+        metrics.start_session()
+    try:
+        outcomes = await asyncio.gather(*(generate_job(manifest, script.chunks, script.text, script.voice, rate, pitch,
+                                                       job_metrics, chunk_ready(script), on_retry)
+                                          for script, manifest, job_metrics in zip(scripts, manifests, voice_metrics)),
+                                        return_exceptions=True)
+        await asyncio.gather(*splits)
+    except asyncio.CancelledError:
+        for task in splits:
+            task.cancel()
+        raise
+    finally:
+        if metrics is not None:
+            metrics.merge(voice_metrics)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return next_segment
+
+
+# --- Benchmark ---
+async def _benchmark(turns: int, words_per_turn: int, min_words: int):
+    from tts.backend import use_fake_backend
+    from tts.fake_backend import FakeService
+    from tts.synthesis import chunk_text
+
+    service = FakeService(capacity=4, throttle_above=8, base_latency=0.3, seconds_per_word=0.3, realtime_factor=0.05)
+    use_fake_backend(service)
+    # Distinct words, so no turn or chunk is a repeat that reuses earlier audio
+    script = "\n".join(f"{'ALICE' if t % 2 == 0 else 'BOB'}: " + " ".join(f"t{t}w{w}" for w in range(words_per_turn)) + "."
+                       for t in range(turns))
+    speakers = {"ALICE": "en-US-AriaNeural", "BOB": "en-GB-RyanNeural"}
+    segments = parse_script(script, speakers, "en-US-AriaNeural")
+    print(f"Two-voice script of {turns} turns, {turns * words_per_turn} words, chunks of at least {min_words} words")
+    print(f"{'plan':<30} {'requests':>8} {'seconds':>8}")
+    with tempfile.TemporaryDirectory(prefix="edge_tts_dialogue_") as jobs_dir:
+        async def run(name: str, job):
+            requests, started = service.requests, time.perf_counter()
+            await job
+            print(f"{name:<30} {service.requests - requests:>8} {time.perf_counter() - started:>7.2f}s")
+
+        text = " ".join(segment.text for segment in segments)
+        chunks = chunk_text(text, min_words, r".*\.")
+        manifest = JobManifest.open_or_create(os.path.join(jobs_dir, "single"), chunks, "en-US-AriaNeural", "+0%", "+0Hz", text)
+        await run("single voice", generate_job(manifest, chunks, text, "en-US-AriaNeural", "+0%", "+0Hz"))
+        for name, max_words in (("one request per turn", 1), ("batched per voice", min_words)):
+            scripts = plan_voice_scripts(segments, max_words)
+            manifests = [JobManifest.open_or_create(os.path.join(jobs_dir, name), s.chunks, s.voice, "+0%", "+0Hz", s.text)
+                         for s in scripts]
+            await run(name, generate_dialogue(scripts, manifests, segments, "+0%", "+0Hz"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares per-turn and per-voice batched dialogue synthesis "
+                                                 "against the local fake service")
+    parser.add_argument("--turns", type=int, default=60, help="Alternating turns of two speakers (default: 60)")
+    parser.add_argument("--words", type=int, default=12, help="Words per turn (default: 12)")
+    parser.add_argument("--min-words", type=int, default=100, help="Chunk size (default: 100)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_benchmark(args.turns, args.words, args.min_words))
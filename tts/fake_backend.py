@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import statistics
+import threading
+import time
+from xml.sax.saxutils import unescape
+
+from aiohttp import web, WSMsgType
+
+from file_utils.word_boundaries import TICKS_PER_SECOND
+
+log = logging.getLogger(__name__)
+
+# One silent MPEG-2 Layer III frame (24 kHz, 48 kbit/s, mono) like the real service sends: 144 bytes = 24 ms
+_SILENT_FRAME = b"\xff\xf3\x64\xc0" + b"\x00" * 140
+_FRAME_SECONDS = 0.024
+
+
+def _silent_word(seconds: float) -> tuple[bytes, int]:
+    """Silent audio for one word and its exact duration in ticks, so offsets match the audio like the real service."""
+    frames = max(1, round(seconds / _FRAME_SECONDS))
+    return _SILENT_FRAME * frames, int(frames * _FRAME_SECONDS * TICKS_PER_SECOND)
+
+
+class FakeThrottledError(Exception):
+    """Raised like a 429 / dropped websocket of the real service."""
+
+
+class FakeService:
+    """
+    Local stand-in for the Edge TTS service, for testing rate control and throughput
+    without network access. Latency grows once more than `capacity` requests are in flight,
+    and requests above `throttle_above` in flight (or at random with `error_rate`) fail.
+    """
+    def __init__(self, capacity: int = 4, throttle_above: int = 8, base_latency: float = 0.15,
+                 seconds_per_word: float = 0.3, realtime_factor: float = 0.05, error_rate: float = 0.0):
+        self.capacity = capacity
+        self.throttle_above = throttle_above
+        self.base_latency = base_latency
+        self.seconds_per_word = seconds_per_word # Audio duration produced per word
+        self.realtime_factor = realtime_factor # Synthesis time per second of audio
+        self.error_rate = error_rate
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _enter(self) -> int:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            if self.in_flight > self.throttle_above or random.random() < self.error_rate:
+                self.in_flight -= 1
+                self.throttled += 1
+                raise FakeThrottledError("429 Too Many Requests")
+            return self.in_flight
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def slowdown(self, in_flight: int) -> float:
+        return 1.0 + max(0, in_flight - self.capacity) * 0.75
+
+    @staticmethod
+    def voices() -> list[dict]:
+        return [{"ShortName": "en-US-FakeNeural", "FriendlyName": "Fake Voice", "Locale": "en-US", "Gender": "Female"}]
+
+    def communicate(self, text: str, voice: str, rate: str = "+0%", pitch: str = "+0Hz",
+                    boundary: str = "WordBoundary") -> 'FakeCommunicate':
+        return FakeCommunicate(self, text)
+
+
+class FakeCommunicate:
+    """Mimics edge_tts.Communicate.stream(): silent but playable MP3 audio plus WordBoundary events."""
+    def __init__(self, service: FakeService, text: str):
+        self.service = service
+        self.text = text
+
+    async def stream(self):
+        service = self.service
+        in_flight = service._enter()
+        try:
+            slowdown = service.slowdown(in_flight)
+            await asyncio.sleep(service.base_latency * slowdown)
+            offset = 0
+            word_audio, word_ticks = _silent_word(service.seconds_per_word)
+            for match in re.finditer(r'\S+', self.text):
+                yield {"type": "WordBoundary", "offset": offset, "duration": word_ticks, "text": match.group()}
+                yield {"type": "audio", "data": word_audio}
+                offset += word_ticks
+                await asyncio.sleep(service.seconds_per_word * service.realtime_factor * slowdown)
+        finally:
+            service._leave()
+
+
+class FakeWebSocketService:
+    """
+    Local websocket stand-in speaking the Edge TTS protocol (speech.config, ssml turns answered
+    with turn.start, audio.metadata, binary audio and turn.end). `handshake_delay` models the
+    TCP/TLS/websocket setup that a warm pooled connection saves.
+    """
+    def __init__(self, handshake_delay: float = 0.15, first_byte_delay: float = 0.05, seconds_per_word: float = 0.3,
+                 realtime_factor: float = 0.01):
+        self.handshake_delay = handshake_delay
+        self.first_byte_delay = first_byte_delay
+        self.seconds_per_word = seconds_per_word
+        self.realtime_factor = realtime_factor
+        self.connections = 0
+        self.turns = 0
+        self._runner: web.AppRunner | None = None
+
+    async def start(self) -> str:
+        """Starts listening on a free local port and returns the websocket URL."""
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"ws://{host}:{port}/"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        await asyncio.sleep(self.handshake_delay)
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.connections += 1
+        async for message in websocket:
+            if message.type != WSMsgType.TEXT:
+                continue
+            headers, _, body = message.data.partition("\r\n\r\n")
+            request_id = re.search(r"X-RequestId:(\w+)", headers)
+            if "Path:ssml" in headers and request_id:
+                await self._answer(websocket, request_id.group(1), unescape(re.sub(r"<[^>]+>", "", body)))
+        return websocket
+
+    async def _answer(self, websocket: web.WebSocketResponse, request_id: str, text: str):
+        self.turns += 1
+
+        def text_message(path: str, body: str) -> str:
+            return f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:{path}\r\n\r\n{body}"
+
+        audio_header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode("utf-8")
+        word_audio, word_ticks = _silent_word(self.seconds_per_word)
+        await websocket.send_str(text_message("turn.start", "{}"))
+        await asyncio.sleep(self.first_byte_delay)
+        for i, word in enumerate(re.findall(r"\S+", text)):
+            metadata = {"Metadata": [{"Type": "WordBoundary", "Data": {
+                "Offset": i * word_ticks, "Duration": word_ticks, "text": {"Text": word, "Length": len(word)}}}]}
+            await websocket.send_str(text_message("audio.metadata", json.dumps(metadata)))
+            await websocket.send_bytes(len(audio_header).to_bytes(2, "big") + audio_header + word_audio)
+            await asyncio.sleep(self.seconds_per_word * self.realtime_factor)
+        await websocket.send_str(text_message("turn.end", "{}"))
+
+
+async def _benchmark_pooling(chunks: int = 30, words_per_chunk: int = 20):
+    """Time to first byte per chunk with a fresh connection per chunk vs. pooled connections."""
+    from tts.connection_pool import EDGE_INTERNALS_AVAILABLE, ConnectionPool, PooledCommunicate
+
+    if not EDGE_INTERNALS_AVAILABLE:
+        print("The installed edge-tts release is not supported by the connection pool, nothing to compare")
+        return
+    service = FakeWebSocketService()
+    url = await service.start()
+    text = " ".join(["word"] * words_per_chunk)
+    try:
+        for reuse in (False, True):
+            pool = ConnectionPool(url=url, reuse=reuse)
+            ttfb = []
+            for _ in range(chunks):
+                started = time.perf_counter()
+                first_byte = None
+                async for message in PooledCommunicate(pool, text, "en-US-AriaNeural").stream():
+                    if message["type"] == "audio" and first_byte is None:
+                        first_byte = time.perf_counter() - started
+                ttfb.append(first_byte)
+            await pool.close()
+            ttfb.sort()
+            print(f"{'Pooled connections' if reuse else 'New connection per chunk'}: "
+                  f"TTFB p50 {statistics.median(ttfb) * 1000:.0f} ms, p95 {ttfb[int(0.95 * len(ttfb))] * 1000:.0f} ms, "
+                  f"{pool.opened} connections for {chunks} chunks")
+    finally:
+        await service.stop()
+
+
+async def _simulate(chunks: int = 60, words_per_chunk: int = 40):
+    """Runs a job through the shared rate control against the fake service and reports the outcome."""
+    from tts.rate_control import RateController
+    from tts.retry import retry_async
+
+    service = FakeService(capacity=3, throttle_above=5, error_rate=0.02)
+    controller = RateController()
+    text = " ".join(["word"] * words_per_chunk)
+
+    async def one_chunk():
+        async with controller.request() as slot:
+            async for message in service.communicate(text, "fake").stream():
+                if message["type"] == "audio":
+                    slot.first_byte()
+
+    started = time.perf_counter()
+    limits = []
+
+    async def sample_limit():
+        while True:
+            limits.append(controller.limiter.limit)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_limit())
+    await asyncio.gather(*(retry_async(one_chunk, base_delay=0.05) for _ in range(chunks)))
+    sampler.cancel()
+    elapsed = time.perf_counter() - started
+    print(f"{chunks} chunks in {elapsed:.2f}s ({chunks / elapsed:.1f} chunks/s), "
+          f"{service.requests} requests, {service.throttled} throttled")
+    print(f"Concurrency limit over time: {' '.join(f'{limit:.1f}' for limit in limits[::5])}")
+    print(f"Limiter: {controller.limiter.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulations against the local fake TTS service")
+    parser.add_argument("--pooling", action="store_true",
+                        help="Compare time to first byte with and without connection pooling (websocket stand-in)")
+    args = parser.parse_args()
+    asyncio.run(_benchmark_pooling() if args.pooling else _simulate())
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from config.consts import JOB_MANIFESTS_KEPT
+
+log = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+PART_SUFFIX = ".part" # Turns cut out of a chunk of a dialogue voice (tts.dialogue): chunk_00001.mp3.part01.mp3
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class JobManifest:
+    """
+    Persistent record of one generation job: its parameters, one entry per chunk
+    (hash, status, output file, text offsets) and the source text. Chunk audio lives
+    in the job directory, so a run that failed or was killed can resume from the
+    first chunk that is not done.
+    A chunk identical to an earlier one (same text, voice, rate and pitch) is stored
+    as a reference to it ("same_as") and shares its audio file and status.
+    """
+    FILE_NAME = "manifest.json"
+    SOURCE_FILE_NAME = "source.txt"
+
+    def __init__(self, job_dir: str, data: dict):
+        self.job_dir = job_dir
+        self.data = data
+
+    # --- Creation / lookup ---
+    @staticmethod
+    def job_id_for(chunks: list[str], voice: str, rate: str, pitch: str) -> str:
+        digest = hashlib.sha256(f"{voice}|{rate}|{pitch}".encode("utf-8"))
+        for chunk in chunks:
+            digest.update(b"\0" + chunk.encode("utf-8"))
+        return digest.hexdigest()[:20]
+
+    @classmethod
+    def open_or_create(cls, jobs_dir: str, chunks: list[str], voice: str, rate: str, pitch: str,
+                       source_text: str, speculative: bool = False) -> 'JobManifest':
+        """
+        Returns the existing manifest for these exact chunks and settings, or a new one.
+        `speculative` only applies to a new manifest (see the speculative property).
+        """
+        job_id = cls.job_id_for(chunks, voice, rate, pitch)
+        job_dir = os.path.join(jobs_dir, job_id)
+        existing = cls.load(job_dir)
+        if existing is not None:
+            log.info("Resuming job %s: %s/%s chunks already done", job_id, existing.done_count(), len(existing.chunks))
+            return existing
+        os.makedirs(job_dir, exist_ok=True)
+        with open(os.path.join(job_dir, cls.SOURCE_FILE_NAME), "w", encoding="utf-8") as f:
+            f.write(source_text)
+        entries = []
+        first_of_unit: dict[str, int] = {}
+        for i, chunk in enumerate(chunks):
+            chunk_hash = _text_hash(chunk)
+            canonical = first_of_unit.setdefault(chunk_hash, i)
+            entry = {"hash": chunk_hash, "status": STATUS_PENDING, "file": f"chunk_{canonical:05d}.mp3",
+                     "text_start": None, "text_end": None, "words": len(chunk.split())}
+            if canonical != i:
+                entry["same_as"] = canonical
+            entries.append(entry)
+        manifest = cls(job_dir, {
+            "job_id": job_id,
+            "voice": voice,
+            "rate": rate,
+            "pitch": pitch,
+            "created": time.time(),
+            "updated": time.time(),
+            "chunks": entries,
+            "speculative": speculative,
+        })
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def load(cls, job_dir: str) -> 'JobManifest | None':
+        path = os.path.join(job_dir, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = cls(job_dir, json.load(f))
+            manifest._verify_outputs()
+            return manifest
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("Ignoring unreadable job manifest %s: %s", path, e)
+            return None
+
+    @classmethod
+    def latest_incomplete(cls, jobs_dir: str) -> 'JobManifest | None':
+        """The most recently updated job that still has pending chunks."""
+        manifests = [m for m in cls._all(jobs_dir) if not m.is_complete() and not m.speculative]
+        return max(manifests, key=lambda m: m.data.get("updated", 0), default=None)
+
+    @classmethod
+    def find_resumable(cls, jobs_dir: str, source_text: str, voice: str, rate: str, pitch: str) -> 'JobManifest | None':
+        """
+        The most recent unfinished job for this text and these settings, whatever its chunk
+        sizes. Lets an adaptively planned job resume although the plan for the same text
+        changed since (the planner's measurements moved on).
+        """
+        candidates = [m for m in cls._all(jobs_dir) if not m.is_complete() and not m.speculative
+                      and (m.data["voice"], m.data["rate"], m.data["pitch"]) == (voice, rate, pitch)
+                      and all("words" in chunk for chunk in m.chunks)]
+        for manifest in sorted(candidates, key=lambda m: m.data.get("updated", 0), reverse=True):
+            try:
+                if manifest.source_text() == source_text:
+                    return manifest
+            except OSError:
+                continue
+        return None
+
+    @classmethod
+    def stale_paths(cls, jobs_dir: str, keep: int = JOB_MANIFESTS_KEPT,
+                    protected: set[str] = frozenset()) -> tuple[list[str], list[str]]:
+        """
+        Files and directories of all but the `keep` most recent jobs, for the janitor to delete.
+        Leftover speculative jobs (never claimed by a generation) are always stale. Jobs in
+        `protected` (ids, e.g. the audio of a stored session) are never stale.
+        """
+        manifests = sorted((m for m in cls._all(jobs_dir) if m.job_id not in protected),
+                           key=lambda m: m.data.get("updated", 0), reverse=True)
+        kept = [m for m in manifests if not m.speculative]
+        files, dirs = [], []
+        for manifest in kept[keep:] + [m for m in manifests if m.speculative]:
+            files += manifest.all_paths()
+            dirs.append(manifest.job_dir)
+        return files, dirs
+
+    @classmethod
+    def _all(cls, jobs_dir: str) -> list['JobManifest']:
+        if not os.path.isdir(jobs_dir):
+            return []
+        manifests = []
+        for name in os.listdir(jobs_dir):
+            manifest = cls.load(os.path.join(jobs_dir, name))
+            if manifest is not None:
+                manifests.append(manifest)
+        return manifests
+
+    # --- State ---
+    @property
+    def job_id(self) -> str:
+        return self.data["job_id"]
+
+    @property
+    def speculative(self) -> bool:
+        """Created by speculative pre-synthesis and not (yet) used by a generation."""
+        return self.data.get("speculative", False)
+
+    def set_speculative(self, speculative: bool):
+        if self.speculative != speculative:
+            self.data["speculative"] = speculative
+            self.save()
+
+    @property
+    def chunks(self) -> list[dict]:
+        return self.data["chunks"]
+
+    def chunk_path(self, i: int) -> str:
+        return os.path.join(self.job_dir, self.chunks[i]["file"])
+
+    def canonical(self, i: int) -> int:
+        """The chunk that is actually synthesized for chunk i (i itself unless it is a duplicate)."""
+        return self.chunks[i].get("same_as", i)
+
+    def duplicates(self) -> dict[int, list[int]]:
+        """Canonical chunk -> the later chunks that reuse its audio."""
+        duplicates: dict[int, list[int]] = {}
+        for i in range(len(self.chunks)):
+            if self.canonical(i) != i:
+                duplicates.setdefault(self.canonical(i), []).append(i)
+        return duplicates
+
+    def unique_count(self) -> int:
+        return sum(1 for i in range(len(self.chunks)) if self.canonical(i) == i)
+
+    def is_done(self, i: int) -> bool:
+        return self.chunks[self.canonical(i)]["status"] == STATUS_DONE
+
+    def done_count(self) -> int:
+        return sum(1 for i in range(len(self.chunks)) if self.is_done(i))
+
+    def first_incomplete(self) -> int | None:
+        return next((i for i in range(len(self.chunks)) if not self.is_done(i)), None)
+
+    def is_complete(self) -> bool:
+        return self.first_incomplete() is None
+
+    def mark_done(self, i: int, text_start: int, text_end: int):
+        """Records a finished chunk and persists the manifest."""
+        self.chunks[i].update(status=STATUS_DONE, text_start=text_start, text_end=text_end)
+        self.save()
+
+    def source_text(self) -> str:
+        with open(os.path.join(self.job_dir, self.SOURCE_FILE_NAME), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def planned_chunks(self) -> list[str]:
+        """The chunk texts, rebuilt from the source text and the word count of every chunk."""
+        words = re.findall(r'\S+', self.source_text())
+        chunks, i = [], 0
+        for chunk in self.chunks:
+            chunks.append(' '.join(words[i:i + chunk["words"]]))
+            i += chunk["words"]
+        return chunks
+
+    def all_paths(self) -> list[str]:
+        """Every file that belongs to this job (chunk audio, their sidecars, parts and polished versions, source and manifest)."""
+        try:
+            parts = [name for name in os.listdir(self.job_dir) if PART_SUFFIX in name]
+        except OSError:
+            parts = []
+        paths = []
+        for i in range(len(self.chunks)):
+            if self.canonical(i) == i:
+                paths += [self.chunk_path(i), self.chunk_path(i) + ".wbi", self.chunk_path(i) + ".polished.wav",
+                          self.chunk_path(i) + ".peaks", self.chunk_path(i) + ".polished.wav.peaks"]
+                paths += [os.path.join(self.job_dir, name) for name in parts if name.startswith(self.chunks[i]["file"] + PART_SUFFIX)]
+        return paths + [os.path.join(self.job_dir, self.SOURCE_FILE_NAME), os.path.join(self.job_dir, self.FILE_NAME)]
+
+    def save(self):
+        """Writes the manifest atomically so a crash never leaves a half-written file."""
+        self.data["updated"] = time.time()
+        path = os.path.join(self.job_dir, self.FILE_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, path)
+
+    def _verify_outputs(self):
+        """Chunks marked done whose audio is gone are treated as pending again."""
+        for i, chunk in enumerate(self.chunks):
+            if chunk["status"] == STATUS_DONE and self.canonical(i) == i:
+                path = self.chunk_path(i)
+                if not os.path.exists(path) or os.path.getsize(path) == 0:
+                    chunk["status"] = STATUS_PENDING
@@ -0,0 +1,334 @@
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable
+
+from config.consts import JOB_QUEUE_WORKERS, JOB_QUEUE_PRIORITIES
+from file_utils.audio_files import concat_audio
+from tts.backend import submit_to_synthesis_loop
+from tts.job_manifest import JobManifest
+from tts.synthesis import generate_job, chunk_text, ChunkSynthesisError
+
+log = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class QueuedJob:
+    """One entry of the job queue: a text snapshot plus the settings to synthesize it with."""
+    FIELDS = ("job_id", "title", "priority", "voice", "rate", "pitch", "split", "min_words", "chunk_regex",
+              "output_path", "status", "done", "total", "error", "added", "manifest_id")
+
+    def __init__(self, **data):
+        self.job_id: str = data["job_id"]
+        self.title: str = data["title"]
+        self.priority: str = data.get("priority", "normal")
+        self.voice: str = data["voice"]
+        self.rate: str = data.get("rate", "+0%")
+        self.pitch: str = data.get("pitch", "+0Hz")
+        self.split: bool = data.get("split", False)
+        self.min_words: int = data.get("min_words", 300)
+        self.chunk_regex: str = data.get("chunk_regex", "")
+        self.output_path: str = data["output_path"]
+        self.status: str = data.get("status", STATUS_QUEUED)
+        self.done: int = data.get("done", 0)
+        self.total: int = data.get("total", 0)
+        self.error: str | None = data.get("error")
+        self.added: float = data.get("added", time.time())
+        self.manifest_id: str | None = data.get("manifest_id") # Job manifest, once the job has started
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+
+class JobQueue:
+    """
+    Persistent, prioritized queue of generation jobs processed by background workers.
+    The queue is one ordered list (saved to queue.json): new jobs go behind the last job
+    of the same or a higher priority, and the user can reorder it freely. Each worker
+    takes the first queued job, synthesizes it on the shared synthesis loop (so all
+    workers share the rate controller and warm connections) and exports one MP3.
+    Jobs that were running when the app closed are queued again on the next start and
+    resume from their job manifest. Jobs with the same text and settings share a manifest,
+    so they run one after the other and the later ones reuse the audio of the first.
+    jobs_dir belongs to the queue alone, nothing else writes or cleans up its manifests.
+    on_change() is called from worker threads.
+    """
+    FILE_NAME = "queue.json"
+
+    def __init__(self, queue_dir: str, jobs_dir: str, output_dir: str, workers: int = JOB_QUEUE_WORKERS,
+                 janitor=None, on_change: Callable[[], None] | None = None):
+        self.queue_dir = queue_dir
+        self.jobs_dir = jobs_dir
+        self.output_dir = output_dir
+        self.janitor = janitor
+        self.on_change = on_change
+        self._workers = workers
+        self._jobs: list[QueuedJob] = []
+        self._running: dict[str, object] = {} # job_id -> future on the synthesis loop
+        self._active_manifests: set[str] = set() # Manifests a worker is synthesizing into
+        self._manifest_users: collections.Counter[str] = collections.Counter() # Running and waiting jobs per manifest
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        os.makedirs(os.path.join(queue_dir, "texts"), exist_ok=True)
+        self._load()
+
+    # --- Queue operations (any thread) ---
+    def jobs(self) -> list[QueuedJob]:
+        with self._condition:
+            return list(self._jobs)
+
+    def manifest_ids(self) -> set[str]:
+        """Manifests of the unfinished jobs that already ran, to keep them from the cleanup of old jobs."""
+        with self._condition:
+            return {job.manifest_id for job in self._jobs if job.manifest_id and job.status != STATUS_DONE}
+
+    def add(self, text: str, title: str, voice: str, rate: str, pitch: str, split: bool, min_words: int,
+            chunk_regex: str, priority: str = "normal") -> QueuedJob:
+        """Queues a job. Raises ValueError for chunks of fewer than one word."""
+        if min_words < 1:
+            raise ValueError(f"min_words must be at least 1, got {min_words}")
+        job_id = uuid.uuid4().hex[:12]
+        with open(self._text_path(job_id), "w", encoding="utf-8") as f:
+            f.write(text)
+        safe_title = re.sub(r"[^\w\- ]", "", title).strip().replace(" ", "_")[:40] or "speech"
+        job = QueuedJob(job_id=job_id, title=title, priority=priority, voice=voice, rate=rate, pitch=pitch,
+                        split=split, min_words=min_words, chunk_regex=chunk_regex,
+                        output_path=os.path.join(self.output_dir, f"{safe_title}_{job_id[:6]}.mp3"))
+        with self._condition:
+            rank = JOB_QUEUE_PRIORITIES.index(priority)
+            position = len(self._jobs)
+            while position > 0 and JOB_QUEUE_PRIORITIES.index(self._jobs[position - 1].priority) > rank \
+                    and self._jobs[position - 1].status == STATUS_QUEUED:
+                position -= 1
+            self._jobs.insert(position, job)
+            self._save()
+            self._condition.notify_all()
+        self._changed()
+        return job
+
+    def move(self, job_id: str, delta: int):
+        """Moves a job up (delta < 0) or down in the queue."""
+        with self._condition:
+            index = self._index(job_id)
+            if index is None or not 0 <= index + delta < len(self._jobs):
+                return
+            self._jobs.insert(index + delta, self._jobs.pop(index))
+            self._save()
+        self._changed()
+
+    def set_priority(self, job_id: str, priority: str):
+        with self._condition:
+            index = self._index(job_id)
+            if index is None:
+                return
+            job = self._jobs.pop(index)
+            job.priority = priority
+            # Re-insert behind the last queued job of the same or a higher priority
+            rank = JOB_QUEUE_PRIORITIES.index(priority)
+            position = next((i for i, other in enumerate(self._jobs) if other.status == STATUS_QUEUED
+                             and JOB_QUEUE_PRIORITIES.index(other.priority) > rank), len(self._jobs))
+            self._jobs.insert(position, job)
+            self._save()
+        self._changed()
+
+    def remove(self, job_id: str):
+        """Removes a job; a running job is cancelled (its chunks are left to the startup cleanup of old jobs)."""
+        with self._condition:
+            index = self._index(job_id)
+            if index is None:
+                return
+            job = self._jobs.pop(index)
+            future = self._running.get(job_id)
+            self._save()
+            self._condition.notify_all() # Also wakes the job if it waits for a shared manifest
+        if future is not None:
+            future.cancel()
+        self._delete_text(job)
+        self._changed()
+
+    def retry(self, job_id: str):
+        with self._condition:
+            index = self._index(job_id)
+            if index is None or self._jobs[index].status != STATUS_FAILED:
+                return
+            self._jobs[index].status, self._jobs[index].error = STATUS_QUEUED, None
+            self._save()
+            self._condition.notify_all()
+        self._changed()
+
+    def clear_finished(self):
+        with self._condition:
+            finished = [job for job in self._jobs if job.status == STATUS_DONE]
+            self._jobs = [job for job in self._jobs if job.status != STATUS_DONE]
+            self._save()
+        for job in finished:
+            self._delete_text(job)
+        self._changed()
+
+    # --- Workers ---
+    def start(self):
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._work, name=f"job-queue-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self, timeout: float = 2.0):
+        """Stops the workers. Running jobs are cancelled and stay queued, to resume on the next start."""
+        with self._condition:
+            self._stopping = True
+            futures = list(self._running.values())
+            self._condition.notify_all()
+        for future in futures:
+            future.cancel()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._condition.wait()
+                    job = self._next_job()
+                if self._stopping:
+                    return
+                job.status = STATUS_RUNNING
+                self._save()
+            self._changed()
+            self._run(job)
+
+    def _next_job(self) -> QueuedJob | None:
+        return next((job for job in self._jobs if job.status == STATUS_QUEUED), None)
+
+    def _run(self, job: QueuedJob):
+        manifest_id, acquired = None, False
+        try:
+            with open(self._text_path(job.job_id), "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            chunks = chunk_text(text, job.min_words, job.chunk_regex) if job.split else [text]
+            manifest_id = JobManifest.job_id_for(chunks, job.voice, job.rate, job.pitch)
+            job.manifest_id = manifest_id
+            acquired = self._acquire_manifest(manifest_id, job)
+            manifest = JobManifest.open_or_create(self.jobs_dir, chunks, job.voice, job.rate, job.pitch, text)
+            job.total, job.done = len(chunks), 0
+            self._changed()
+
+            def on_chunk_ready(i, path, word_index, text_start):
+                job.done = i + 1
+                self._changed()
+
+            future = submit_to_synthesis_loop(
+                generate_job(manifest, chunks, text, job.voice, job.rate, job.pitch, on_chunk_ready=on_chunk_ready))
+            with self._condition:
+                self._running[job.job_id] = future
+                if self._stopping:
+                    future.cancel()
+            try:
+                future.result()
+            finally:
+                with self._condition:
+                    self._running.pop(job.job_id, None)
+            os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+            concat_audio([manifest.chunk_path(i) for i in range(len(chunks))], job.output_path)
+            self._finish(job, STATUS_DONE)
+            log.info("Queued job '%s' exported to %s", job.title, job.output_path)
+            with self._condition:
+                shared = self._manifest_users[manifest_id] > 1 # Another job waits to export the same audio
+            if self.janitor is not None and not shared:
+                self.janitor.delete(manifest.all_paths())
+                self.janitor.delete([manifest.job_dir], delay=1.0) # After its files are gone
+        except concurrent.futures.CancelledError:
+            # Shutdown or removal: a stopped job goes back to the queue, its manifest keeps the finished chunks
+            self._finish(job, STATUS_QUEUED)
+        except Exception as e:
+            if not isinstance(e, ChunkSynthesisError): # Chunk failures are logged by generate_job
+                log.error("Queued job '%s' failed: %s", job.title, e)
+            self._finish(job, STATUS_FAILED, str(e))
+        finally:
+            if manifest_id is not None:
+                self._release_manifest(manifest_id, acquired)
+
+    def _acquire_manifest(self, manifest_id: str, job: QueuedJob) -> bool:
+        """
+        Waits until no other worker synthesizes into the manifest, then claims it. Raises
+        CancelledError if the queue stops or the job is removed while waiting.
+        """
+        with self._condition:
+            self._manifest_users[manifest_id] += 1
+            self._condition.wait_for(lambda: manifest_id not in self._active_manifests or self._stopping
+                                     or self._index(job.job_id) is None)
+            if self._stopping or self._index(job.job_id) is None:
+                raise concurrent.futures.CancelledError()
+            self._active_manifests.add(manifest_id)
+            return True
+
+    def _release_manifest(self, manifest_id: str, acquired: bool):
+        with self._condition:
+            if acquired:
+                self._active_manifests.discard(manifest_id)
+            self._manifest_users[manifest_id] -= 1
+            if self._manifest_users[manifest_id] <= 0:
+                del self._manifest_users[manifest_id]
+            self._condition.notify_all()
+
+    def _finish(self, job: QueuedJob, status: str, error: str | None = None):
+        with self._condition:
+            job.status, job.error = status, error
+            self._save()
+        self._changed()
+
+    # --- Persistence ---
+    def _index(self, job_id: str) -> int | None:
+        return next((i for i, job in enumerate(self._jobs) if job.job_id == job_id), None)
+
+    def _text_path(self, job_id: str) -> str:
+        return os.path.join(self.queue_dir, "texts", f"{job_id}.txt")
+
+    def _delete_text(self, job: QueuedJob):
+        if self.janitor is not None:
+            self.janitor.delete([self._text_path(job.job_id)])
+
+    def _load(self):
+        path = os.path.join(self.queue_dir, self.FILE_NAME)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._jobs = [QueuedJob(**entry) for entry in json.load(f)["jobs"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("Ignoring unreadable job queue %s: %s", path, e)
+            return
+        for job in self._jobs:
+            if job.status == STATUS_RUNNING:
+                job.status = STATUS_QUEUED # Interrupted by the last shutdown, resumes from its manifest
+
+    def _save(self):
+        """Writes the queue atomically. Called with the lock held."""
+        path = os.path.join(self.queue_dir, self.FILE_NAME)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"jobs": [job.to_dict() for job in self._jobs]}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.error("Could not save the job queue: %s", e)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
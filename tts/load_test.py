@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from tts.metrics import _percentile
+
+log = logging.getLogger(__name__)
+
+
+async def _start_local_service(jobs_dir: str) -> tuple[web.AppRunner, str]:
+    """The synthesis service on a free local port, synthesizing with the fake backend."""
+    from tts.backend import use_fake_backend
+    from tts.fake_backend import FakeService
+    from tts.server import SynthesisService
+
+    use_fake_backend(FakeService(capacity=4, throttle_above=8, base_latency=0.1, seconds_per_word=0.3))
+    runner = web.AppRunner(SynthesisService(jobs_dir).app(), handler_cancellation=True)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def run_load_test(url: str, requests: int, concurrency: int, distinct: int, words: int,
+                        voice: str, min_words: int) -> dict:
+    """Sends `requests` synthesize requests, `concurrency` at a time, drawn from `distinct` different texts."""
+    texts = [" ".join(f"text{t} word{w}." if w % 10 == 9 else f"text{t}" for w in range(words)) for t in range(distinct)]
+    latencies, first_bytes, errors = [], [], []
+    pending = list(range(requests))
+
+    async def client(session: aiohttp.ClientSession):
+        while pending:
+            pending.pop()
+            body = {"text": random.choice(texts), "voice": voice, "min_words": min_words}
+            started = time.perf_counter()
+            first_byte = None
+            try:
+                async with session.post(f"{url}/synthesize", json=body) as response:
+                    if response.status != 200:
+                        errors.append(f"HTTP {response.status}")
+                        continue
+                    async for _ in response.content.iter_any():
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+            except aiohttp.ClientError as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - started)
+            first_bytes.append(first_byte)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        async with session.get(f"{url}/stats") as response:
+            stats = await response.json()
+    first_bytes = [value for value in first_bytes if value is not None]
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50_s": _percentile(latencies, 0.5),
+        "latency_p99_s": _percentile(latencies, 0.99),
+        "ttfb_p50_s": _percentile(first_bytes, 0.5),
+        "ttfb_p99_s": _percentile(first_bytes, 0.99),
+        "server": stats,
+    }
+
+
+async def _main(args: argparse.Namespace):
+    runner = None
+    url = args.url
+    with tempfile.TemporaryDirectory(prefix="edge_tts_load_test_") as jobs_dir:
+        if url is None:
+            runner, url = await _start_local_service(jobs_dir)
+        try:
+            result = await run_load_test(url, args.requests, args.concurrency, args.distinct, args.words,
+                                         args.voice, args.min_words)
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f} ms"
+    server = result["server"]
+    print(f"{result['ok']}/{result['requests']} requests ok ({result['errors']} errors) in {result['seconds']:.2f}s: "
+          f"{result['requests_per_s']:.1f} requests/s")
+    print(f"Latency p50 {ms(result['latency_p50_s'])}, p99 {ms(result['latency_p99_s'])}; "
+          f"time to first byte p50 {ms(result['ttfb_p50_s'])}, p99 {ms(result['ttfb_p99_s'])}")
+    print(f"Server: {server['generations']} generations, {server['coalesced']} coalesced, "
+          f"{server['cache_hits']} cache hits, {server['failures']} failures; rate limit {server['rate_limit']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the synthesis service (main.py --serve)")
+    parser.add_argument("--url", help="Service to test, e.g. http://127.0.0.1:8765 "
+                                      "(default: an in-process service with the fake backend)")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of requests (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once (default: 20)")
+    parser.add_argument("--distinct", type=int, default=10,
+                        help="Number of different texts, repeats are coalesced or cached (default: 10)")
+    parser.add_argument("--words", type=int, default=120, help="Words per text (default: 120)")
+    parser.add_argument("--min-words", type=int, default=40, help="Chunk size of the requests (default: 40)")
+    parser.add_argument("--voice", default="en-US-AriaNeural", help="Voice of the requests (default: en-US-AriaNeural)")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+
+from config.consts import EDGE_TTS_BYTES_PER_SECOND
+
+
+class ChunkMetrics:
+    """Timings and sizes of one synthesized chunk. All times in seconds."""
+    def __init__(self, index: int, queued_at: float):
+        self.index = index
+        self.queued_at = queued_at
+        self.started_at: float | None = None # First attempt got a request slot
+        self.attempt_started_at: float | None = None # Latest attempt got a request slot
+        self.first_byte_at: float | None = None
+        self.finished_at: float | None = None
+        self.bytes = 0
+        self.retries = 0
+        self.cache_hit = False
+        self.duplicate_of: int | None = None # Earlier identical chunk whose audio this one plays
+        self.connection_reused: bool | None = None # None when not synthesized over a pooled connection
+        self.ok = False
+
+    def start(self):
+        """
+        Marks the start of a synthesis attempt. queue_wait is the wait for the first slot, while
+        time to first byte and synthesis time only cover the last attempt, without failed
+        attempts and retry backoff.
+        """
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now
+        self.attempt_started_at = now
+
+    def add_audio(self, size: int):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+        self.bytes += size
+
+    def finish(self, ok: bool = True):
+        self.finished_at = time.perf_counter()
+        self.ok = ok
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or self.queued_at) - self.queued_at
+
+    @property
+    def time_to_first_byte(self) -> float | None:
+        if self.first_byte_at is None or self.attempt_started_at is None:
+            return None
+        return self.first_byte_at - self.attempt_started_at
+
+    @property
+    def synthesis_time(self) -> float:
+        if self.attempt_started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.attempt_started_at
+
+    @property
+    def audio_duration(self) -> float:
+        """Estimated from the constant bitrate of the edge-tts MP3 output."""
+        return self.bytes / EDGE_TTS_BYTES_PER_SECOND
+
+    @property
+    def realtime_factor(self) -> float | None:
+        """Synthesis time per second of audio, < 1 means faster than realtime."""
+        duration = self.audio_duration
+        return self.synthesis_time / duration if duration else None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "ok": self.ok,
+            "queue_wait_s": round(self.queue_wait, 4),
+            "time_to_first_byte_s": None if self.time_to_first_byte is None else round(self.time_to_first_byte, 4),
+            "synthesis_time_s": round(self.synthesis_time, 4),
+            "bytes": self.bytes,
+            "audio_duration_s": round(self.audio_duration, 3),
+            "realtime_factor": None if self.realtime_factor is None else round(self.realtime_factor, 4),
+            "retries": self.retries,
+            "cache_hit": self.cache_hit,
+            "duplicate_of": self.duplicate_of,
+            "connection_reused": self.connection_reused,
+        }
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class SynthesisMetrics:
+    """
+    Per-chunk metrics of the current generation session. Written by the generation
+    thread, read by the UI thread, so every access goes through a lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chunks: list[ChunkMetrics] = []
+        self.session_started: float | None = None
+        self.session_finished: float | None = None
+
+    def start_session(self):
+        with self._lock:
+            self.chunks = []
+            self.session_started = time.perf_counter()
+            self.session_finished = None
+
+    def finish_session(self):
+        with self._lock:
+            self.session_finished = time.perf_counter()
+
+    def new_chunk(self, index: int) -> ChunkMetrics:
+        """Creates the metrics of a chunk that is planned now (its queue wait starts counting)."""
+        metrics = ChunkMetrics(index, time.perf_counter())
+        with self._lock:
+            self.chunks.append(metrics)
+        return metrics
+
+    def chunk_snapshot(self) -> list[ChunkMetrics]:
+        """A copy of the chunk list, safe to iterate while the generation adds chunks."""
+        with self._lock:
+            return list(self.chunks)
+
+    def merge(self, sessions: list['SynthesisMetrics']):
+        """Takes over the chunks of sessions that ran side by side (the voices of a dialogue) and finishes this one."""
+        chunks = [chunk for session in sessions for chunk in session.chunk_snapshot()]
+        with self._lock:
+            self.chunks = chunks
+            self.session_finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        with self._lock:
+            chunks = list(self.chunks)
+            started, finished = self.session_started, self.session_finished
+        done = [c for c in chunks if c.ok]
+        ttfb = [c.time_to_first_byte for c in done if c.time_to_first_byte is not None]
+        synthesized = [c for c in done if not c.cache_hit and c.duplicate_of is None]
+        synth = [c.synthesis_time for c in synthesized]
+        audio = sum(c.audio_duration for c in done)
+        end = finished if finished is not None else time.perf_counter()
+        wall = end - started if started is not None else 0.0
+        return {
+            "chunks_total": len(chunks),
+            "chunks_ok": len(done),
+            "chunks_failed": sum(1 for c in chunks if c.finished_at is not None and not c.ok),
+            "cache_hits": sum(1 for c in done if c.cache_hit),
+            "duplicates": sum(1 for c in done if c.duplicate_of is not None),
+            "synthesis_calls": len(synthesized),
+            "connections_reused": sum(1 for c in done if c.connection_reused),
+            "retries": sum(c.retries for c in chunks),
+            "bytes": sum(c.bytes for c in done),
+            "audio_seconds": round(audio, 3),
+            "wall_seconds": round(wall, 3),
+            "realtime_factor": round(wall / audio, 4) if audio else None,
+            "ttfb_p50_s": _percentile(ttfb, 0.5),
+            "ttfb_p95_s": _percentile(ttfb, 0.95),
+            "synthesis_p50_s": _percentile(synth, 0.5),
+            "synthesis_p95_s": _percentile(synth, 0.95),
+            "queue_wait_max_s": max((c.queue_wait for c in chunks), default=None),
+        }
+
+    def summary_text(self) -> str:
+        """Short multi-line summary for the stats panel."""
+        s = self.summary()
+        def fmt(value, unit="s"):
+            return "-" if value is None else f"{value:.2f}{unit}"
+        return (f"Chunks: {s['chunks_ok']}/{s['chunks_total']} ok, {s['chunks_failed']} failed, "
+                f"{s['retries']} retries, {s['cache_hits']} cache hits, {s['duplicates']} repeats\n"
+                f"Audio: {fmt(s['audio_seconds'])} in {fmt(s['wall_seconds'])} wall "
+                f"(realtime factor {fmt(s['realtime_factor'], 'x')}), {s['bytes'] / 1024:.0f} KiB\n"
+                f"TTFB p50/p95: {fmt(s['ttfb_p50_s'])} / {fmt(s['ttfb_p95_s'])} ({s['connections_reused']} warm)   "
+                f"Synthesis p50/p95: {fmt(s['synthesis_p50_s'])} / {fmt(s['synthesis_p95_s'])}")
+
+    def to_json(self) -> str:
+        chunks = [c.to_dict() for c in self.chunk_snapshot()]
+        return json.dumps({"summary": self.summary(), "chunks": chunks}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Session metrics in the Prometheus text exposition format."""
+        s = self.summary()
+        chunks = self.chunk_snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]):
+            lines.append(f"# HELP edge_tts_{name} {help_text}")
+            lines.append(f"# TYPE edge_tts_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"edge_tts_{name}{labels} {value}")
+
+        metric("chunks_total", "counter", "Synthesized chunks by result.",
+               [('{result="ok"}', s["chunks_ok"]), ('{result="failed"}', s["chunks_failed"])])
+        metric("cache_hits_total", "counter", "Chunks served from the synthesis cache.", [("", s["cache_hits"])])
+        metric("duplicate_chunks_total", "counter", "Repeated chunks that reused the audio of an earlier chunk.",
+               [("", s["duplicates"])])
+        metric("retries_total", "counter", "Synthesis retries.", [("", s["retries"])])
+        metric("connections_reused_total", "counter", "Chunks synthesized over a warm pooled connection.",
+               [("", s["connections_reused"])])
+        metric("audio_bytes_total", "counter", "Bytes of audio received.", [("", s["bytes"])])
+        metric("audio_seconds_total", "counter", "Seconds of audio generated.", [("", s["audio_seconds"])])
+        metric("session_wall_seconds", "gauge", "Wall time of the generation session.", [("", s["wall_seconds"])])
+        for name, help_text, values in (
+                ("time_to_first_byte_seconds", "Time from request to first audio byte.",
+                 [c.time_to_first_byte for c in chunks if c.ok and c.time_to_first_byte is not None]),
+                ("synthesis_seconds", "Total synthesis time per chunk.",
+                 [c.synthesis_time for c in chunks if c.ok and not c.cache_hit and c.duplicate_of is None]),
+                ("queue_wait_seconds", "Time a chunk waited before synthesis started.",
+                 [c.queue_wait for c in chunks])):
+            samples = [(f'{{quantile="{q}"}}', _percentile(values, q)) for q in (0.5, 0.9, 0.99) if values]
+            samples += [("_sum", round(sum(values), 6)), ("_count", len(values))]
+            metric(name, "summary", help_text, samples)
+        return "\n".join(lines) + "\n"
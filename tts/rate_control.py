@@ -0,0 +1,184 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import threading
+import time
+
+from config.consts import RATE_LIMIT_INITIAL_CONCURRENCY, RATE_LIMIT_MIN_CONCURRENCY, RATE_LIMIT_MAX_CONCURRENCY, \
+    RATE_LIMIT_LATENCY_TOLERANCE, RATE_LIMIT_DECREASE_FACTOR, RATE_LIMIT_DECREASE_COOLDOWN_S, \
+    TOKEN_BUCKET_RATE_PER_S, TOKEN_BUCKET_BURST
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Process-wide request rate cap. Thread-safe and usable from any event loop: a caller
+    reserves a token under a lock and sleeps (asynchronously) for as long as the bucket is in debt.
+    """
+    def __init__(self, rate: float = TOKEN_BUCKET_RATE_PER_S, capacity: float = TOKEN_BUCKET_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token and returns how many seconds the caller has to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit shared by all generation threads. Every healthy request grows
+    the limit by 1/limit (about +1 per round of requests); an error or a time-to-first-byte
+    spike (above `latency_tolerance` x the observed baseline) multiplies it by
+    `decrease_factor`, at most once per cooldown so one congestion event only counts once.
+    Waiters from different event loops are woken with call_soon_threadsafe.
+    """
+    def __init__(self, initial: int = RATE_LIMIT_INITIAL_CONCURRENCY, minimum: int = RATE_LIMIT_MIN_CONCURRENCY,
+                 maximum: int = RATE_LIMIT_MAX_CONCURRENCY, latency_tolerance: float = RATE_LIMIT_LATENCY_TOLERANCE,
+                 decrease_factor: float = RATE_LIMIT_DECREASE_FACTOR, cooldown: float = RATE_LIMIT_DECREASE_COOLDOWN_S):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.baseline_latency: float | None = None
+        self.errors = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._waiters: collections.deque = collections.deque() # (loop, future)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter) # Never got a slot
+                elif not waiter[1].cancelled():
+                    self._return_slot() # Slot was granted just before the cancellation
+            raise
+
+    def release(self, latency: float | None, ok: bool | None):
+        """Frees a slot. ok=None means the request was cancelled and says nothing about the service."""
+        with self._lock:
+            if ok is not None:
+                self._adjust(latency, ok)
+            self._return_slot()
+
+    def _return_slot(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future):
+        if future.done():
+            with self._lock:
+                self._return_slot() # Waiter was cancelled in the meantime
+        else:
+            future.set_result(True)
+
+    def _adjust(self, latency: float | None, ok: bool):
+        spike = (ok and latency is not None and self.baseline_latency is not None
+                 and latency > self.baseline_latency * self.latency_tolerance)
+        if ok and latency is not None:
+            # Baseline follows the best recent latency: drops immediately, rises slowly
+            if self.baseline_latency is None or latency < self.baseline_latency:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency += (latency - self.baseline_latency) * 0.05
+        if not ok:
+            self.errors += 1
+        if not ok or spike:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.decreases += 1
+                self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+                log.info("Backing off: concurrency limit now %.2f (%s)", self.limit,
+                         'error' if not ok else 'latency spike')
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._wake_waiters()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "waiting": len(self._waiters),
+                    "baseline_latency_s": self.baseline_latency, "errors": self.errors, "decreases": self.decreases}
+
+
+class RequestSlot:
+    """Handed to the caller of RateController.request(); call first_byte() when the response starts."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.time_to_first_byte: float | None = None
+
+    def first_byte(self):
+        if self.time_to_first_byte is None:
+            self.time_to_first_byte = time.perf_counter() - self.started
+
+
+class RateController:
+    """Token bucket (request rate) plus adaptive limiter (concurrency) around synthesis requests."""
+    def __init__(self, limiter: AdaptiveLimiter | None = None, bucket: TokenBucket | None = None):
+        self.limiter = limiter or AdaptiveLimiter()
+        self.bucket = bucket or TokenBucket()
+
+    @contextlib.asynccontextmanager
+    async def request(self):
+        await self.limiter.acquire()
+        ok = None
+        slot = None
+        try:
+            await self.bucket.acquire()
+            slot = RequestSlot()
+            yield slot
+            ok = True
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self.limiter.release(slot.time_to_first_byte if ok and slot else None, ok)
+
+
+_shared_controller: RateController | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_rate_controller() -> RateController:
+    """The one controller shared by every job in this process."""
+    global _shared_controller
+    with _shared_lock:
+        if _shared_controller is None:
+            _shared_controller = RateController()
+        return _shared_controller
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from config.consts import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_S, RETRY_MAX_DELAY_S
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def backoff_delay(attempt: int, base_delay: float = RETRY_BASE_DELAY_S, max_delay: float = RETRY_MAX_DELAY_S) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(max_delay, base_delay * 2^attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def retry_async(operation: Callable[[], Awaitable[T]],
+                      attempts: int = RETRY_MAX_ATTEMPTS,
+                      base_delay: float = RETRY_BASE_DELAY_S,
+                      max_delay: float = RETRY_MAX_DELAY_S,
+                      on_retry: Callable[[int, Exception, float], None] | None = None,
+                      give_up_on: tuple[type[Exception], ...] = (ValueError, TypeError)) -> T:
+    """
+    Awaits operation() until it succeeds or `attempts` tries are used up, sleeping with
+    jittered exponential backoff in between. Exceptions in give_up_on (bad input, not a
+    transient failure) are raised immediately. on_retry(attempt, error, delay) is called
+    before each sleep.
+    """
+    for attempt in range(attempts):
+        try:
+            return await operation()
+        except give_up_on:
+            raise
+        except Exception as e:
+            if attempt + 1 >= attempts:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            log.warning("Attempt %s/%s failed: %s. Retrying in %.2fs", attempt + 1, attempts, e, delay)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            await asyncio.sleep(delay)
+    raise RuntimeError("retry_async called with attempts < 1")
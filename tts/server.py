@@ -0,0 +1,303 @@
+import asyncio
+import collections
+import logging
+import os
+import re
+import time
+
+from aiohttp import web
+
+from config.consts import SERVE_MAX_TEXT_CHARS, SERVE_CHUNK_MIN_WORDS, SERVE_CHUNK_REGEX, \
+    SERVE_COMPLETED_JOBS_CACHED, SERVE_JOBS_KEPT
+from tts.backend import list_voices, connection_pool
+from tts.job_manifest import JobManifest
+from tts.metrics import SynthesisMetrics
+from tts.rate_control import shared_rate_controller
+from tts.synthesis import generate_job, chunk_text
+
+log = logging.getLogger(__name__)
+
+_RATE_PATTERN = re.compile(r"[+-]\d{1,3}%")
+_PITCH_PATTERN = re.compile(r"[+-]\d{1,3}Hz")
+_JOB_ID_PATTERN = re.compile(r"[0-9a-f]{20}")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class _Generation:
+    """
+    One synthesis in flight. Every request for the same job (same chunks, voice, rate
+    and pitch) subscribes to it instead of starting its own; chunks become readable
+    in order as `ready` grows.
+    """
+    def __init__(self, job_id: str, chunks: list[str], text: str, voice: str, rate: str, pitch: str):
+        self.job_id = job_id
+        self.chunks = chunks
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.pitch = pitch
+        self.manifest: JobManifest | None = None
+        self.metrics = SynthesisMetrics()
+        self.ready = 0
+        self.finished = False
+        self.error: str | None = None
+        self.subscribers = 0
+        self.started = time.time()
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    async def run(self, jobs_dir: str):
+        try:
+            self.manifest = await asyncio.to_thread(JobManifest.open_or_create, jobs_dir, self.chunks, self.voice,
+                                                    self.rate, self.pitch, self.text)
+            await generate_job(self.manifest, self.chunks, self.text, self.voice, self.rate, self.pitch,
+                               metrics=self.metrics, on_chunk_ready=self._chunk_ready)
+        except asyncio.CancelledError:
+            self.error = "cancelled"
+            raise
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.finished = True
+            self._notify()
+
+    async def wait_for(self, count: int):
+        """Waits until `count` chunks are ready or the generation ended."""
+        while self.ready < count and not self.finished:
+            await self._changed.wait()
+
+    def chunk_path(self, i: int) -> str:
+        return self.manifest.chunk_path(i)
+
+    def _chunk_ready(self, i: int, path: str, word_index, text_start: int):
+        self.ready = i + 1
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class SynthesisService:
+    """
+    HTTP front end of the synthesis code for other tools (`main.py --serve`).
+
+    POST /synthesize (JSON) or GET /synthesize (query) with text, voice and optional rate,
+    pitch, split, min_words and chunk_regex streams the MP3 chunk by chunk as it is
+    generated. Identical concurrent requests are coalesced into one generation, finished
+    jobs are served from the job directories (the same resumable cache the GUI uses),
+    and all generations share the process-wide rate controller and warm connections.
+    GET /voices lists the voices (fetched once), GET /jobs/{id} reports the progress of a
+    job (its id is sent in the X-Job-Id header) and GET /stats the service counters.
+    """
+    def __init__(self, jobs_dir: str, completed_cached: int = SERVE_COMPLETED_JOBS_CACHED):
+        self.jobs_dir = jobs_dir
+        self.completed_cached = completed_cached
+        self._generations: dict[str, _Generation] = {}
+        self._completed: collections.OrderedDict[str, JobManifest] = collections.OrderedDict()
+        self._voices: list[dict] | None = None
+        self._voices_task: asyncio.Task | None = None
+        self.requests = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.generations = 0
+        self.failures = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/synthesize", self.handle_synthesize)
+        app.router.add_get("/synthesize", self.handle_synthesize)
+        app.router.add_get("/voices", self.handle_voices)
+        app.router.add_get("/jobs/{job_id}", self.handle_job)
+        app.router.add_get("/stats", self.handle_stats)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    def prune_cache(self, janitor, keep: int = SERVE_JOBS_KEPT):
+        """Hands all but the `keep` most recent job directories to the janitor."""
+        stale_files, stale_dirs = JobManifest.stale_paths(self.jobs_dir, keep)
+        janitor.delete(stale_files)
+        janitor.delete(stale_dirs, delay=1.0) # After their files are gone
+
+    # --- Handlers ---
+    async def handle_synthesize(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if request.method == "POST":
+            try:
+                params = await request.json()
+            except ValueError:
+                raise web.HTTPBadRequest(text="Request body must be JSON")
+            if not isinstance(params, dict):
+                raise web.HTTPBadRequest(text="Request body must be a JSON object")
+        else:
+            params = dict(request.query)
+        text, voice, rate, pitch, chunks = self._parse_synthesis_params(params)
+        job_id = JobManifest.job_id_for(chunks, voice, rate, pitch)
+
+        manifest = self._completed.get(job_id)
+        if manifest is not None and manifest.is_complete():
+            self._completed.move_to_end(job_id)
+            self.cache_hits += 1
+            return await self._stream_files(request, job_id, [manifest.chunk_path(i) for i in range(len(chunks))])
+
+        generation = self._generations.get(job_id)
+        if generation is None:
+            generation = self._start_generation(job_id, chunks, text, voice, rate, pitch)
+        else:
+            self.coalesced += 1
+            log.debug("Coalesced request into running job %s", job_id)
+        return await self._stream_generation(request, generation)
+
+    async def handle_voices(self, request: web.Request) -> web.Response:
+        if self._voices is None:
+            # Concurrent requests share one fetch
+            if self._voices_task is None or self._voices_task.done():
+                self._voices_task = asyncio.get_running_loop().create_task(list_voices())
+            try:
+                self._voices = await asyncio.shield(self._voices_task)
+            except Exception as e:
+                log.error("Could not fetch voices: %s", e)
+                raise web.HTTPBadGateway(text=f"Could not fetch voices: {e}")
+        return web.json_response(self._voices)
+
+    async def handle_job(self, request: web.Request) -> web.Response:
+        job_id = request.match_info["job_id"]
+        if not _JOB_ID_PATTERN.fullmatch(job_id):
+            raise web.HTTPNotFound(text="Unknown job")
+        generation = self._generations.get(job_id)
+        if generation is not None:
+            return web.json_response({
+                "job_id": job_id, "state": "running", "chunks_ready": generation.ready,
+                "chunks_total": len(generation.chunks), "subscribers": generation.subscribers,
+                "started": generation.started, "metrics": generation.metrics.summary(),
+            })
+        manifest = self._completed.get(job_id)
+        if manifest is None:
+            manifest = await asyncio.to_thread(JobManifest.load, os.path.join(self.jobs_dir, job_id))
+        if manifest is None:
+            raise web.HTTPNotFound(text="Unknown job")
+        return web.json_response({
+            "job_id": job_id, "state": "done" if manifest.is_complete() else "incomplete",
+            "chunks_ready": manifest.done_count(), "chunks_total": len(manifest.chunks),
+        })
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "generations": self.generations,
+            "failures": self.failures,
+            "running": len(self._generations),
+            "rate_limit": shared_rate_controller().limiter.snapshot(),
+            "connections": connection_pool().stats(),
+        })
+
+    # --- Internals ---
+    @staticmethod
+    def _parse_synthesis_params(params: dict) -> tuple[str, str, str, str, list[str]]:
+        text = str(params.get("text", "")).strip()
+        voice = str(params.get("voice", "")).strip()
+        rate = str(params.get("rate", "+0%"))
+        pitch = str(params.get("pitch", "+0Hz"))
+        if not text:
+            raise web.HTTPBadRequest(text="'text' is required")
+        if len(text) > SERVE_MAX_TEXT_CHARS:
+            raise web.HTTPRequestEntityTooLarge(SERVE_MAX_TEXT_CHARS, len(text))
+        if not voice:
+            raise web.HTTPBadRequest(text="'voice' is required")
+        if not _RATE_PATTERN.fullmatch(rate) or not _PITCH_PATTERN.fullmatch(pitch):
+            raise web.HTTPBadRequest(text="'rate' must look like +10% and 'pitch' like -5Hz")
+        split = str(params.get("split", "true")).lower() not in ("0", "false", "no")
+        try:
+            min_words = max(1, int(params.get("min_words", SERVE_CHUNK_MIN_WORDS)))
+            chunk_regex = str(params.get("chunk_regex", SERVE_CHUNK_REGEX))
+            chunks = chunk_text(text, min_words, chunk_regex) if split else [text]
+        except (ValueError, re.error) as e:
+            raise web.HTTPBadRequest(text=f"Invalid chunking parameters: {e}")
+        return text, voice, rate, pitch, chunks
+
+    def _start_generation(self, job_id: str, chunks: list[str], text: str, voice: str, rate: str,
+                          pitch: str) -> _Generation:
+        generation = _Generation(job_id, chunks, text, voice, rate, pitch)
+        self._generations[job_id] = generation
+        self.generations += 1
+        generation.task = asyncio.get_running_loop().create_task(generation.run(self.jobs_dir))
+        generation.task.add_done_callback(lambda task: self._generation_done(generation))
+        log.info("Job %s: generating %s chunks with %s", job_id, len(chunks), voice)
+        return generation
+
+    def _generation_done(self, generation: _Generation):
+        self._generations.pop(generation.job_id, None)
+        if generation.error is None and generation.manifest is not None:
+            self._completed[generation.job_id] = generation.manifest
+            while len(self._completed) > self.completed_cached:
+                self._completed.popitem(last=False)
+        elif generation.error != "cancelled":
+            self.failures += 1
+            log.error("Job %s failed: %s", generation.job_id, generation.error)
+
+    async def _stream_generation(self, request: web.Request, generation: _Generation) -> web.StreamResponse:
+        """Streams the chunks of a (possibly shared) generation as they become ready."""
+        generation.subscribers += 1
+        response = None
+        try:
+            for i in range(len(generation.chunks)):
+                await generation.wait_for(i + 1)
+                if generation.ready <= i:
+                    # The generation failed. Before the first byte that is a clean error response,
+                    # afterwards the connection is dropped so the client does not take the audio as complete.
+                    if response is None:
+                        raise web.HTTPBadGateway(text=f"Synthesis failed: {generation.error}")
+                    log.warning("Job %s failed after %s chunks, aborting the response", generation.job_id, i)
+                    request.transport.close()
+                    return response
+                if response is None:
+                    response = await self._prepare_audio_response(request, generation.job_id)
+                await response.write(await asyncio.to_thread(_read_file, generation.chunk_path(i)))
+            await response.write_eof()
+            return response
+        except ConnectionResetError:
+            log.debug("Client of job %s disconnected", generation.job_id)
+            return response
+        finally:
+            generation.subscribers -= 1
+            if generation.subscribers == 0 and not generation.finished:
+                # Nobody is listening anymore. The chunks done so far stay in the job directory for the next request.
+                log.info("Job %s: all clients left, stopping the generation", generation.job_id)
+                if self._generations.get(generation.job_id) is generation:
+                    del self._generations[generation.job_id] # Later requests start over instead of joining it
+                generation.task.cancel()
+
+    async def _stream_files(self, request: web.Request, job_id: str, paths: list[str]) -> web.StreamResponse:
+        response = await self._prepare_audio_response(request, job_id)
+        for path in paths:
+            await response.write(await asyncio.to_thread(_read_file, path))
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def _prepare_audio_response(request: web.Request, job_id: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "audio/mpeg", "X-Job-Id": job_id})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        return response
+
+    async def _on_cleanup(self, app: web.Application):
+        for generation in list(self._generations.values()):
+            generation.task.cancel()
+        await connection_pool().close()
+
+
+def serve(host: str, port: int, jobs_dir: str, janitor=None):
+    """Runs the synthesis service until interrupted."""
+    service = SynthesisService(jobs_dir)
+    if janitor is not None:
+        service.prune_cache(janitor)
+    log.info("Serving synthesis on http://%s:%s (job cache: %s)", host, port, jobs_dir)
+    # Cancel handlers of clients that disconnect, so nobody waits on a generation for them
+    web.run_app(service.app(), host=host, port=port, print=None, handler_cancellation=True)
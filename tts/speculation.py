@@ -0,0 +1,251 @@
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable
+
+from config.consts import SPECULATION_DEBOUNCE_MS, SPECULATION_MAX_PER_MINUTE, SPECULATION_MAX_CHARS
+from tts.backend import submit_to_synthesis_loop
+from tts.job_manifest import JobManifest
+from tts.metrics import SynthesisMetrics
+from tts.synthesis import generate_job
+
+log = logging.getLogger(__name__)
+
+# (source text, voice, rate, pitch, chunking options) of the current inputs, None when there is nothing to speculate on
+InputSnapshot = tuple[str, str, str, str, tuple]
+# Chunks of a text with a rate and chunking options; called on the synthesis loop's worker threads
+ChunkPlan = Callable[[str, str, tuple], list[str]]
+
+
+class Speculation:
+    """The first chunk of one set of inputs, being planned and synthesized (or done) into its job directory."""
+    def __init__(self, inputs: InputSnapshot):
+        self.inputs = inputs
+        self.manifest: JobManifest | None = None # Set on the synthesis loop once the chunks are planned
+        self.future: concurrent.futures.Future | None = None
+        # Under Speculator._jobs_lock: the job is held from planning until the speculation is both discarded and finished
+        self.held_job_id: str | None = None
+        self.discarded = False # The inputs changed
+        self.finished = False # The coroutine ended (its future may be cancelled earlier)
+
+    @property
+    def job_id(self) -> str | None:
+        return self.manifest.job_id if self.manifest is not None else None
+
+    @property
+    def succeeded(self) -> bool:
+        """The first chunk was synthesized (not skipped, cancelled or failed)."""
+        return (self.future.done() and not self.future.cancelled() and self.future.exception() is None
+                and self.future.result())
+
+
+class Speculator:
+    """
+    Opt-in speculative pre-synthesis. Once the inputs have been idle for `debounce_ms`,
+    the first chunk of the current text is synthesized in the background into the job
+    directory Generate would use, so playback can start right away. The Tk thread only
+    takes a snapshot of the inputs; chunk planning and the job directory are handled on
+    the synthesis loop. Speculations for inputs that changed since are cancelled, and their
+    job is deleted as soon as they stopped, unless a generation took it over or another
+    speculation uses it (leftovers of a crash are removed with the stale jobs on the next
+    start). Speculative requests go through the shared rate controller and are capped at
+    `max_per_minute`; first chunks longer than `max_chars` are skipped. The public methods
+    run on the Tk thread.
+    """
+    def __init__(self, widget, jobs_dir: str, snapshot: Callable[[], InputSnapshot | None], plan: ChunkPlan,
+                 janitor=None, debounce_ms: int = SPECULATION_DEBOUNCE_MS,
+                 max_per_minute: int = SPECULATION_MAX_PER_MINUTE, max_chars: int = SPECULATION_MAX_CHARS):
+        self.widget = widget
+        self.jobs_dir = jobs_dir
+        self.snapshot = snapshot
+        self.plan = plan
+        self.janitor = janitor
+        self.debounce_ms = debounce_ms
+        self.max_per_minute = max_per_minute
+        self.max_chars = max_chars
+        self.enabled = False
+        self._after_id: str | None = None
+        self._current: Speculation | None = None
+        self._jobs_lock = threading.Lock() # Taken on the Tk thread and the synthesis loop
+        self._job_holders: collections.Counter[str] = collections.Counter() # Job id -> speculations holding it
+        self._claimed_jobs: set[str] = set() # Jobs a generation took over, never deleted
+        self._started: collections.deque[float] = collections.deque() # Start times within the last minute, loop thread only
+        self.started = 0
+        self.hits = 0 # Generate found the first chunk done
+        self.late_hits = 0 # Generate found it still in flight and waited for it
+        self.misses = 0
+        self.discarded = 0
+        self.skipped = 0 # Over the request budget or the size limit
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+        if enabled:
+            self.inputs_changed()
+        else:
+            self._cancel_timer()
+            self._discard()
+
+    def inputs_changed(self):
+        """Restarts the idle timer. Call on every change of the text, voice, sliders or chunking options."""
+        self._cancel_timer()
+        if self.enabled:
+            self._after_id = self.widget.after(self.debounce_ms, self._speculate)
+
+    def claim(self, job_id: str) -> Speculation | None:
+        """
+        Called by Generate: the speculation for these exact inputs, if there is one. The
+        generation then uses its manifest and waits for its future before starting.
+        """
+        self._cancel_timer()
+        with self._jobs_lock:
+            self._claimed_jobs.add(job_id)
+        speculation, self._current = self._current, None
+        if speculation is not None and speculation.job_id != job_id:
+            self._discard(speculation)
+            speculation = None
+        if not self.enabled:
+            return speculation
+        if speculation is None or (speculation.future.done() and not speculation.succeeded):
+            self.misses += 1
+            log.info("Speculation miss (%s)", self.hit_rate_text())
+            return None
+        if speculation.future.done():
+            self.hits += 1
+        else:
+            self.late_hits += 1
+        log.info("Speculation hit for job %s (%s)", job_id, self.hit_rate_text())
+        return speculation
+
+    def shutdown(self):
+        """Cancels the running speculation. Its job is deleted once it stopped, unless a generation uses it."""
+        self._cancel_timer()
+        self._discard()
+
+    def stats(self) -> dict:
+        claimed = self.hits + self.late_hits + self.misses
+        return {"started": self.started, "hits": self.hits, "late_hits": self.late_hits, "misses": self.misses,
+                "discarded": self.discarded, "skipped": self.skipped,
+                "hit_rate": (self.hits + self.late_hits) / claimed if claimed else None}
+
+    def hit_rate_text(self) -> str:
+        s = self.stats()
+        rate = "-" if s["hit_rate"] is None else f"{s['hit_rate']:.0%}"
+        return (f"hit rate {rate}: {s['hits']} ready, {s['late_hits']} in flight, {s['misses']} missed; "
+                f"{s['started']} started, {s['discarded']} discarded, {s['skipped']} skipped")
+
+    def _speculate(self):
+        self._after_id = None
+        inputs = self.snapshot()
+        if inputs is None:
+            return
+        if self._current is not None and self._current.inputs == inputs:
+            return # Nothing changed since the last speculation
+        self._discard()
+        speculation = Speculation(inputs)
+        speculation.future = submit_to_synthesis_loop(self._run(speculation))
+        self._current = speculation
+
+    async def _run(self, speculation: Speculation) -> bool:
+        """Plans the chunks and synthesizes the first one. False if it was skipped or already done."""
+        text, voice, rate, pitch, options = speculation.inputs
+        try:
+            chunks = await asyncio.to_thread(self.plan, text, rate, options)
+        except (ValueError, re.error):
+            return False # Chunking options are being edited
+        if not chunks:
+            return False
+        if len(chunks[0]) > self.max_chars:
+            self.skipped += 1
+            return False
+        now = time.monotonic()
+        while self._started and now - self._started[0] > 60:
+            self._started.popleft()
+        if len(self._started) >= self.max_per_minute:
+            self.skipped += 1
+            log.debug("Speculation skipped, request budget used up")
+            return False
+
+        job_id = JobManifest.job_id_for(chunks, voice, rate, pitch)
+        with self._jobs_lock:
+            speculation.held_job_id = job_id
+            self._job_holders[job_id] += 1
+        opening = asyncio.ensure_future(asyncio.to_thread(JobManifest.open_or_create, self.jobs_dir, chunks, voice,
+                                                          rate, pitch, text, speculative=True))
+        try:
+            try:
+                manifest = await asyncio.shield(opening)
+            except OSError as e:
+                log.warning("Could not create speculative job: %s", e)
+                return False
+            speculation.manifest = manifest
+            if manifest.is_done(0):
+                return False # Cached by an earlier generation, nothing to do
+            self._started.append(now)
+            self.started += 1
+            log.debug("Speculatively synthesizing the first chunk of job %s", manifest.job_id)
+            await generate_job(manifest, chunks, text, voice, rate, pitch, SynthesisMetrics(), max_chunks=1)
+            return True
+        finally:
+            if not opening.done():
+                await asyncio.wait([opening]) # Cancelled while the job was being created, let that finish first
+            with self._jobs_lock:
+                speculation.finished = True
+                if speculation.discarded:
+                    self._release_job(speculation)
+
+    def _discard(self, speculation: Speculation | None = None):
+        """Cancels a speculation for inputs that are gone and deletes what it produced."""
+        if speculation is None:
+            speculation, self._current = self._current, None
+        if speculation is None:
+            return
+        self.discarded += 1
+        with self._jobs_lock:
+            speculation.discarded = True
+            if speculation.finished:
+                self._release_job(speculation)
+            # Otherwise the speculation releases its job when it stops
+        speculation.future.cancel()
+
+    def _release_job(self, speculation: Speculation):
+        """
+        Drops the hold of a discarded, finished speculation on its job and deletes the job once
+        no speculation holds it and no generation claimed it. Called with _jobs_lock held. The
+        few files go right away, so whoever opens the same job next never finds it half deleted.
+        """
+        job_id, speculation.held_job_id = speculation.held_job_id, None
+        if job_id is None:
+            return # Never got to plan a job
+        self._job_holders[job_id] -= 1
+        if self._job_holders[job_id] > 0:
+            return
+        del self._job_holders[job_id]
+        if job_id in self._claimed_jobs:
+            return
+        manifest = JobManifest.load(os.path.join(self.jobs_dir, job_id))
+        if manifest is None or not manifest.speculative:
+            return
+        leftovers = []
+        for path in manifest.all_paths():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                leftovers.append(path)
+        if self.janitor is not None:
+            self.janitor.delete(leftovers)
+            self.janitor.delete([manifest.job_dir], delay=1.0 if leftovers else 0.0)
+        elif not leftovers:
+            os.rmdir(manifest.job_dir)
+        log.debug("Deleted unused speculative job %s", job_id)
+
+    def _cancel_timer(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
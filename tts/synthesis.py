@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Callable
+
+from file_utils.word_boundaries import WordBoundaryIndex, WordLocator, chunk_start_offsets
+from tts.backend import create_communicate
+from tts.job_manifest import JobManifest
+from tts.metrics import SynthesisMetrics, ChunkMetrics
+from tts.rate_control import shared_rate_controller, RequestSlot
+from tts.retry import retry_async
+
+log = logging.getLogger(__name__)
+
+
+class ChunkSynthesisError(Exception):
+    """A chunk still failed after all retries. Everything finished so far stays done in the manifest."""
+    def __init__(self, index: int, total: int, cause: BaseException):
+        super().__init__(f"chunk {index + 1}/{total}: {cause}")
+        self.index = index
+        self.total = total
+        self.cause = cause
+
+
+def chunk_text(text: str, min_words: int, chunk_separator_regex: str) -> list[str]:
+    words = re.findall(r'\S+', text)
+    chunks = []
+    i = 0
+    n = len(words)
+    sep_pattern = re.compile(chunk_separator_regex) if chunk_separator_regex else None
+
+    while i < n:
+        start = i
+        end = min(i + min_words, n)
+        # If no separator regex, just take min_words at a time
+        if not sep_pattern:
+            chunks.append(' '.join(words[start:end]))
+            i = end
+        else:
+            # Always take at least min_words, then continue until separator is found or end
+            j = end
+            while j < n and not sep_pattern.fullmatch(words[j]):
+                j += 1
+            # If found, include the separator word
+            if j < n:
+                j += 1
+            chunks.append(' '.join(words[start:j]))
+            i = j
+    return [chunk for chunk in chunks if chunk]
+
+
+async def generate_job(manifest: JobManifest, chunks: list[str], source_text: str, voice: str, rate: str, pitch: str,
+                       metrics: SynthesisMetrics | None = None,
+                       on_chunk_ready: Callable[[int, str, WordBoundaryIndex, int], None] | None = None,
+                       on_retry: Callable[[int, int, Exception, float], None] | None = None,
+                       max_chunks: int | None = None) -> int:
+    """
+    Generates the audio of a job into its job directory, one file per chunk, and returns the
+    number of chunks ready. Chunks are synthesized concurrently, as many at a time as the
+    shared rate controller allows; on_chunk_ready(index, path, word index, text start) is
+    called in chunk order. Chunks already done in the manifest are reused, failing chunks
+    are retried with backoff (on_retry(index, attempt, error, delay)) and repeated chunks
+    are synthesized once and share a file. With max_chunks only the first chunks are generated.
+    Raises ChunkSynthesisError for the first chunk that is out of retries.
+    """
+    metrics = metrics or SynthesisMetrics()
+    text_starts = chunk_start_offsets(source_text, chunks)
+    metrics.start_session()
+    chunk_metrics = [metrics.new_chunk(i) for i in range(len(chunks))]
+    results: dict[int, WordBoundaryIndex] = {}
+    next_chunk = 0
+    duplicates = manifest.duplicates()
+    unique_chunks = [i for i in range(len(chunks)) if manifest.canonical(i) == i]
+    if max_chunks is not None:
+        unique_chunks = [i for i in unique_chunks if i < max_chunks]
+    if len(unique_chunks) < len(chunks):
+        log.info("%s repeated chunks reuse the audio of an earlier one", len(chunks) - len(unique_chunks))
+
+    def emit_ready_chunks():
+        # Playback and export are sequential, so a chunk is only reported once all before it are
+        nonlocal next_chunk
+        while next_chunk in results:
+            if on_chunk_ready:
+                on_chunk_ready(next_chunk, manifest.chunk_path(next_chunk), results[next_chunk], text_starts[next_chunk])
+            del results[next_chunk]
+            next_chunk += 1
+
+    async def generate_chunk(i: int, text: str):
+        chunk = chunk_metrics[i]
+        path = manifest.chunk_path(i)
+        if manifest.is_done(i):
+            # Finished in an earlier (interrupted) run, no need to synthesize again
+            chunk.start()
+            word_index = WordBoundaryIndex.load_for_audio(path)
+            chunk.cache_hit = True
+        else:
+            log.debug("Chunk %s/%s: Generating audio for text: %s...",
+                      i + 1, len(chunks), text[:50])  # Log first 50 chars
+            def retrying(attempt, error, delay):
+                chunk.retries += 1
+                if on_retry:
+                    on_retry(i, attempt, error, delay)
+            locator = WordLocator(source_text, text_starts[i])
+            try:
+                word_index = await retry_async(
+                    lambda: synthesize_chunk(text, voice, rate, pitch, path, locator, chunk),
+                    on_retry=retrying)
+            except Exception:
+                chunk.finish(ok=False)
+                raise
+            word_index.save(WordBoundaryIndex.sidecar_path(path)) # Persist the index next to the audio
+            manifest.mark_done(i, text_starts[i], locator.cursor)
+            log.info("Audio saved to file: %s", path)
+        chunk.finish()
+        results[i] = word_index
+        for j in duplicates.get(i, []):
+            # Same file, only the word positions in the text differ
+            duplicate = chunk_metrics[j]
+            duplicate.start()
+            duplicate.duplicate_of = i
+            duplicate.bytes = chunk.bytes
+            results[j] = word_index.relocated(source_text, WordLocator(source_text, text_starts[j]))
+            duplicate.finish()
+        emit_ready_chunks()
+
+    try:
+        outcomes = await asyncio.gather(*(generate_chunk(i, chunks[i]) for i in unique_chunks), return_exceptions=True)
+    finally:
+        metrics.finish_session()
+    for i, outcome in zip(unique_chunks, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, BaseException):
+            log.error("Exception during audio generation of chunk %s: %s", i + 1, outcome)
+            raise ChunkSynthesisError(i, len(chunks), outcome)
+    return next_chunk
+
+
+async def synthesize_chunk(text: str, voice: str, rate: str, pitch: str, path: str, locator: WordLocator,
+                           metrics: ChunkMetrics) -> WordBoundaryIndex:
+    """
+    One synthesis attempt of a chunk into path, under the process-wide rate controller.
+    Leaves locator and metrics untouched on failure.
+    """
+    cursor = locator.cursor
+    async with shared_rate_controller().request() as slot:
+        metrics.start()
+        metrics.bytes, metrics.first_byte_at = 0, None
+        try:
+            communicate = create_communicate(text, voice, rate, pitch)
+            # Stream the audio to the file and keep the word boundaries edge-tts sends with it
+            word_index = await stream_to_file(communicate, path, locator, metrics, slot)
+            # Verify that the file was created and is not empty
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                raise IOError(f"Audio file missing or empty after generation: {path}")
+            return word_index
+        except Exception:
+            locator.cursor = cursor
+            raise
+
+
+async def stream_to_file(communicate, path: str, locator: WordLocator, metrics: ChunkMetrics | None = None,
+                         slot: RequestSlot | None = None) -> WordBoundaryIndex:
+    """Writes the audio stream of communicate to path and returns the chunk's word boundary index."""
+    word_index = WordBoundaryIndex()
+    with open(path, "wb") as audio_file:
+        async for message in communicate.stream():
+            if message["type"] == "audio":
+                audio_file.write(message["data"])
+                if slot:
+                    slot.first_byte()
+                if metrics:
+                    metrics.add_audio(len(message["data"]))
+            elif message["type"] == "WordBoundary":
+                word = message["text"]
+                text_offset = locator.locate(word)
+                if text_offset is not None:
+                    word_index.append(text_offset, len(word), message["offset"], message["duration"])
+    if metrics:
+        metrics.connection_reused = getattr(communicate, "connection_reused", None)
+    return word_index
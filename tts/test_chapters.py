@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+import tts.chapters
+from tts.chapters import ChapterExporter, chapter_file_name, detect_chapters
+from tts.synthesis import ChunkSynthesisError
+
+BOOK = ("A short foreword.\n\n"
+        "# The Start\nFirst words.\n\n"
+        "Chapter 2: Middle\nRepeated words.\n\n"
+        "## End\nLast words.\n")
+
+
+def test_detect_chapters_at_headings():
+    chapters = detect_chapters(BOOK)
+    assert [chapter.title for chapter in chapters] == ["Preface", "The Start", "Chapter 2: Middle", "End"]
+    assert chapters[1].text == "The Start\nFirst words."
+    assert [chapter.start for chapter in chapters] == [0, BOOK.index("# The"), BOOK.index("Chapter 2"), BOOK.index("## End")]
+
+
+def test_text_without_headings_is_one_chapter():
+    chapters = detect_chapters("Just some text\nwithout any heading.")
+    assert len(chapters) == 1
+    assert chapters[0].title == "Just some text without any heading."
+
+
+def test_title_group_of_a_custom_heading_regex():
+    chapters = detect_chapters("PART I: Dawn\nText.\nPART II: Dusk\nMore.", r"^PART [IVX]+: (?P<title>.+)$")
+    assert [chapter.title for chapter in chapters] == ["Dawn", "Dusk"]
+
+
+def test_chapter_file_names_sort_in_chapter_order():
+    assert chapter_file_name(3, "The: End?", 9) == "03 - The End.mp3"
+    assert chapter_file_name(7, "Title", 120) == "007 - Title.mp3"
+    assert chapter_file_name(1, "???", 2) == "01 - Chapter 1.mp3"
+
+
+@pytest.fixture
+def exporter(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(tts.chapters, "concat_audio", lambda paths, output_path: written.append(output_path))
+    monkeypatch.setattr(tts.chapters, "write_chaptered", lambda paths, titles, output_path: [1.0] * len(paths))
+    exporter = ChapterExporter(str(tmp_path / "jobs"), parallel=2)
+    exporter.written = written
+    return exporter
+
+
+def _export(exporter: ChapterExporter, tmp_path, text: str) -> str:
+    return asyncio.run(exporter.export(detect_chapters(text), str(tmp_path / "out"), "book", "voice", "+0%", "+0Hz",
+                                       split=False, min_words=300, chunk_regex=""))
+
+
+def test_identical_chapters_share_one_job(tmp_path, exporter, fake_service):
+    text = "# One\nSame words.\n# One\nSame words.\n# Two\nOther words.\n# Three\nMore words.\n"
+    combined = _export(exporter, tmp_path, text)
+    assert fake_service.requests == 3
+    assert sorted(os.path.basename(path) for path in exporter.written) == [
+        "01 - One.mp3", "02 - One.mp3", "03 - Two.mp3", "04 - Three.mp3"]
+    assert combined == str(tmp_path / "out" / "book.mp3")
+    with open(tmp_path / "out" / "book.m3u8", encoding="utf-8") as f:
+        assert f.read().count("#EXTINF:1,") == 4
+
+
+def test_failed_export_resumes_without_synthesizing_again(tmp_path, exporter, fake_service):
+    fake_service.failures["End\nLast words."] = -1
+    with pytest.raises(ChunkSynthesisError):
+        _export(exporter, tmp_path, BOOK)
+    assert len(exporter.written) == 3 # The finished chapters are still written
+    requests = fake_service.requests
+
+    del fake_service.failures["End\nLast words."]
+    _export(exporter, tmp_path, BOOK)
+    assert fake_service.requests == requests + 1 # Only the failed chapter
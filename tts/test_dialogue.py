@@ -0,0 +1,62 @@
+import asyncio
+
+from tts.dialogue import generate_dialogue, parse_script, plan_voice_scripts
+from tts.job_manifest import JobManifest
+
+VOICES = {"ALICE": "alice-voice", "BOB": "bob-voice"}
+SCRIPT = ("Once upon a time.\n"
+          "ALICE: Hello Bob, how are you?\n"
+          "[Bob] Fine thanks.\n"
+          "Still fine.\n"
+          "CAROL: Not a mapped speaker.\n"
+          "ALICE: Good to hear.\n")
+
+
+def test_parse_script_splits_turns_at_mapped_speakers():
+    segments = parse_script(SCRIPT, VOICES, "narrator-voice")
+    assert [(s.speaker, s.voice) for s in segments] == [
+        (None, "narrator-voice"), ("ALICE", "alice-voice"), ("BOB", "bob-voice"), ("ALICE", "alice-voice")]
+    assert segments[2].text == "Fine thanks.\nStill fine.\nCAROL: Not a mapped speaker."
+    for segment in segments:
+        assert SCRIPT[segment.start:segment.start + len(segment.text)] == segment.text
+
+
+def test_voice_scripts_group_the_turns_of_each_voice():
+    segments = parse_script(SCRIPT, VOICES, "narrator-voice")
+    scripts = plan_voice_scripts(segments, max_words=100)
+    assert [(script.voice, script.segment_ids) for script in scripts] == [
+        ("narrator-voice", [0]), ("alice-voice", [1, 3]), ("bob-voice", [2])]
+    assert scripts[1].chunks == ["Hello Bob, how are you?\n\nGood to hear."]
+
+
+def _generate(tmp_path, max_words: int):
+    segments = parse_script(SCRIPT, VOICES, "narrator-voice")
+    scripts = plan_voice_scripts(segments, max_words)
+    manifests = [JobManifest.open_or_create(str(tmp_path), script.chunks, script.voice, "+0%", "+0Hz", script.text)
+                 for script in scripts]
+    ready = []
+    asyncio.run(generate_dialogue(scripts, manifests, segments, "+0%", "+0Hz",
+                                  on_segment_ready=lambda *args: ready.append(args)))
+    return segments, ready
+
+
+def test_turns_are_ready_in_script_order_with_script_offsets(tmp_path, fake_service):
+    segments, ready = _generate(tmp_path, max_words=1)
+    assert [segment_id for segment_id, *_ in ready] == [0, 1, 2, 3]
+    for segment_id, path, word_index, text_start in ready:
+        segment = segments[segment_id]
+        assert text_start == segment.start
+        assert word_index.first_text_offset() == segment.start
+        start, end = word_index.text_span(len(word_index) - 1)
+        assert SCRIPT[start:end] == segment.text.split()[-1]
+
+
+def test_chunk_of_several_turns_is_cut_per_turn(tmp_path, fake_service):
+    segments, ready = _generate(tmp_path, max_words=100)
+    assert [segment_id for segment_id, *_ in ready] == [0, 1, 2, 3]
+    alice_turns = [entry for entry in ready if segments[entry[0]].speaker == "ALICE"]
+    assert alice_turns[0][1] != alice_turns[1][1]
+    # Each part starts with its own first word
+    assert [word_index.first_text_offset() for _, _, word_index, _ in alice_turns] == [
+        segments[1].start, segments[3].start]
+    assert alice_turns[1][2].time_of(0) < 1.0
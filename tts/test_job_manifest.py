@@ -0,0 +1,77 @@
+import json
+import os
+
+from tts.job_manifest import JobManifest
+
+
+def _finish_chunk(manifest: JobManifest, i: int):
+    with open(manifest.chunk_path(i), "wb") as f:
+        f.write(b"audio")
+    manifest.mark_done(i, 0, 0)
+
+
+def test_open_or_create_resumes_the_same_job(tmp_path):
+    chunks = ["One two.", "Three four."]
+    manifest = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", "One two. Three four.")
+    _finish_chunk(manifest, 0)
+
+    resumed = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", "One two. Three four.")
+    assert resumed.job_id == manifest.job_id
+    assert resumed.done_count() == 1
+    assert resumed.first_incomplete() == 1
+
+
+def test_settings_are_part_of_the_job_id():
+    chunks = ["One two."]
+    assert JobManifest.job_id_for(chunks, "voice", "+0%", "+0Hz") != JobManifest.job_id_for(chunks, "voice", "+10%", "+0Hz")
+    assert JobManifest.job_id_for(chunks, "voice", "+0%", "+0Hz") != JobManifest.job_id_for(["One", "two."], "voice", "+0%", "+0Hz")
+
+
+def test_chunk_with_missing_audio_is_pending_again(tmp_path):
+    chunks = ["One two.", "Three four."]
+    manifest = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", "One two. Three four.")
+    _finish_chunk(manifest, 0)
+    _finish_chunk(manifest, 1)
+    os.remove(manifest.chunk_path(1))
+
+    reloaded = JobManifest.load(manifest.job_dir)
+    assert reloaded.is_done(0)
+    assert not reloaded.is_done(1)
+
+
+def test_repeated_chunks_share_the_audio_of_the_first(tmp_path):
+    chunks = ["Hello there.", "Something else.", "Hello there."]
+    manifest = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", " ".join(chunks))
+    assert manifest.canonical(2) == 0
+    assert manifest.chunk_path(2) == manifest.chunk_path(0)
+    assert manifest.duplicates() == {0: [2]}
+    assert manifest.unique_count() == 2
+
+    _finish_chunk(manifest, 0)
+    assert manifest.is_done(2)
+
+
+def test_speculative_flag_only_applies_to_new_jobs(tmp_path):
+    chunks = ["One two."]
+    manifest = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", "One two.", speculative=True)
+    assert JobManifest.load(manifest.job_dir).speculative
+
+    manifest.set_speculative(False)
+    reopened = JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", "One two.", speculative=True)
+    assert not reopened.speculative
+
+
+def test_stale_paths_keep_recent_and_protected_jobs(tmp_path):
+    manifests = []
+    for i in range(4):
+        manifest = JobManifest.open_or_create(str(tmp_path), [f"Text {i}."], "voice", "+0%", "+0Hz", f"Text {i}.")
+        manifest.set_speculative(i == 3)
+        manifests.append(manifest)
+    # Order by recency without relying on the clock resolution
+    for i, manifest in enumerate(manifests):
+        with open(os.path.join(manifest.job_dir, JobManifest.FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(dict(manifest.data, updated=i), f)
+
+    _, dirs = JobManifest.stale_paths(str(tmp_path), keep=1, protected={manifests[0].job_id})
+    # Newest finished job is kept, the protected one too, the speculative leftover never is
+    assert sorted(dirs) == sorted([manifests[1].job_dir, manifests[3].job_dir])
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+import pytest
+
+import tts.job_queue
+from tts.job_queue import STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, JobQueue
+
+
+class RecordingJanitor:
+    def __init__(self):
+        self.deleted: list[str] = []
+
+    def delete(self, paths, delay: float = 0.0):
+        self.deleted += paths
+
+
+def _queue(tmp_path, **kwargs) -> JobQueue:
+    return JobQueue(str(tmp_path / "queue"), str(tmp_path / "jobs"), str(tmp_path / "out"), **kwargs)
+
+
+def _add(queue: JobQueue, title: str, priority: str = "normal", text: str | None = None):
+    return queue.add(text or f"Text of {title}.", title, "voice", "+0%", "+0Hz", False, 300, "", priority)
+
+
+def _titles(queue: JobQueue) -> list[str]:
+    return [job.title for job in queue.jobs()]
+
+
+def test_new_jobs_go_behind_their_priority(tmp_path):
+    queue = _queue(tmp_path)
+    _add(queue, "normal 1")
+    _add(queue, "low 1", "low")
+    _add(queue, "normal 2")
+    _add(queue, "high 1", "high")
+    _add(queue, "low 2", "low")
+    assert _titles(queue) == ["high 1", "normal 1", "normal 2", "low 1", "low 2"]
+
+
+def test_chunks_need_at_least_one_word(tmp_path):
+    queue = _queue(tmp_path)
+    with pytest.raises(ValueError):
+        queue.add("Some text.", "empty chunks", "voice", "+0%", "+0Hz", True, 0, "", "normal")
+    assert queue.jobs() == []
+
+
+def test_running_jobs_are_not_overtaken(tmp_path):
+    queue = _queue(tmp_path)
+    low = _add(queue, "low", "low")
+    low.status = STATUS_RUNNING
+    _add(queue, "high", "high")
+    assert _titles(queue) == ["low", "high"]
+
+
+def test_move_and_set_priority_reorder_the_queue(tmp_path):
+    queue = _queue(tmp_path)
+    first, second, third = (_add(queue, title) for title in ("first", "second", "third"))
+    queue.move(third.job_id, -1)
+    assert _titles(queue) == ["first", "third", "second"]
+    queue.move(first.job_id, -1) # Already at the top
+    assert _titles(queue) == ["first", "third", "second"]
+
+    queue.set_priority(second.job_id, "high")
+    assert _titles(queue) == ["second", "first", "third"]
+    queue.set_priority(second.job_id, "low")
+    assert _titles(queue) == ["first", "third", "second"]
+
+
+def test_interrupted_jobs_are_queued_again_on_load(tmp_path):
+    queue = _queue(tmp_path)
+    job = _add(queue, "interrupted")
+    _add(queue, "waiting", "low")
+    job.status = STATUS_RUNNING
+    with queue._condition:
+        queue._save()
+
+    reloaded = _queue(tmp_path)
+    assert _titles(reloaded) == ["interrupted", "waiting"]
+    assert [job.status for job in reloaded.jobs()] == [STATUS_QUEUED, STATUS_QUEUED]
+    with open(tmp_path / "queue" / JobQueue.FILE_NAME, encoding="utf-8") as f:
+        assert json.load(f)["jobs"][0]["status"] == STATUS_RUNNING # Only reset in memory until the next save
+
+
+def test_identical_jobs_share_one_synthesis(tmp_path, monkeypatch, fake_service):
+    exported = []
+    monkeypatch.setattr(tts.job_queue, "concat_audio", lambda paths, output_path: exported.append(output_path))
+    finished = threading.Event()
+    janitor = RecordingJanitor()
+    queue = _queue(tmp_path, workers=2, janitor=janitor, on_change=lambda: all(
+        job.status == STATUS_DONE for job in queue.jobs()) and finished.set())
+    text = "One two three four five six seven eight nine."
+    for title in ("first", "second"):
+        queue.add(text, title, "voice", "+0%", "+0Hz", True, 3, "", "normal")
+    queue.start()
+    try:
+        assert finished.wait(10)
+    finally:
+        queue.shutdown() # Also waits for the workers to hand the finished job to the janitor
+    assert len(exported) == 2
+    assert [job.status for job in queue.jobs()] == [STATUS_DONE, STATUS_DONE]
+    assert fake_service.requests == 3 # Three chunks, synthesized once for both jobs
+    assert sum(path.endswith(".json") for path in janitor.deleted) == 1 # Shared manifest deleted once
+
+
+def test_failed_job_keeps_its_manifest_protected(tmp_path, monkeypatch, fake_service):
+    monkeypatch.setattr(tts.job_queue, "concat_audio", lambda paths, output_path: None)
+    finished = threading.Event()
+    queue = _queue(tmp_path, workers=1, on_change=lambda: all(
+        job.status == STATUS_FAILED for job in queue.jobs()) and finished.set())
+    job = _add(queue, "failing", text="Never synthesized.")
+    fake_service.failures["Never synthesized."] = -1
+    queue.start()
+    try:
+        assert finished.wait(10)
+    finally:
+        queue.shutdown()
+    assert job.manifest_id is not None
+    assert _queue(tmp_path).manifest_ids() == {job.manifest_id}
+    assert os.path.isdir(tmp_path / "jobs" / job.manifest_id)
@@ -0,0 +1,77 @@
+import asyncio
+
+from tts.rate_control import AdaptiveLimiter
+
+
+def _limiter(**kwargs) -> AdaptiveLimiter:
+    kwargs = {"initial": 2, "minimum": 1, "maximum": 8, "latency_tolerance": 2.5, "decrease_factor": 0.5,
+              "cooldown": 60.0, **kwargs}
+    return AdaptiveLimiter(**kwargs)
+
+
+async def _request(limiter: AdaptiveLimiter, latency: float | None, ok: bool | None):
+    await limiter.acquire()
+    limiter.release(latency, ok)
+
+
+def test_healthy_requests_grow_the_limit_additively():
+    limiter = _limiter()
+    asyncio.run(_request(limiter, 0.1, True))
+    assert limiter.limit == 2.5
+
+
+def test_errors_halve_the_limit_once_per_cooldown():
+    limiter = _limiter(initial=8)
+
+    async def burst():
+        for _ in range(3):
+            await _request(limiter, None, False)
+    asyncio.run(burst())
+    assert limiter.limit == 4.0
+    assert limiter.errors == 3
+    assert limiter.decreases == 1
+
+
+def test_latency_spike_counts_as_congestion():
+    limiter = _limiter(initial=4)
+
+    async def requests():
+        await _request(limiter, 0.1, True)
+        await _request(limiter, 1.0, True)
+    asyncio.run(requests())
+    assert limiter.limit == 4.25 * 0.5
+    assert limiter.errors == 0
+
+
+def test_limit_stays_between_minimum_and_maximum():
+    limiter = _limiter(initial=1, cooldown=0.0)
+    asyncio.run(_request(limiter, None, False))
+    assert limiter.limit == 1.0
+
+    limiter = _limiter(initial=8)
+    asyncio.run(_request(limiter, 0.1, True))
+    assert limiter.limit == 8.0
+
+
+def test_cancelled_request_does_not_adjust_the_limit():
+    limiter = _limiter()
+    asyncio.run(_request(limiter, None, None))
+    assert limiter.limit == 2.0
+    assert limiter.snapshot()["in_flight"] == 0
+
+
+def test_waiter_gets_the_slot_of_a_released_request():
+    limiter = _limiter(initial=1, maximum=1)
+
+    async def contend():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert limiter.snapshot()["waiting"] == 1
+        limiter.release(0.1, True)
+        await asyncio.wait_for(waiter, 1.0)
+        assert limiter.in_flight == 1
+        limiter.release(0.1, True)
+    asyncio.run(contend())
+    assert limiter.in_flight == 0
@@ -0,0 +1,84 @@
+import os
+import time
+
+from tts.job_manifest import JobManifest
+from tts.speculation import Speculator
+
+
+class StubWidget:
+    def after(self, interval_ms, callback):
+        return "after#1"
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def _speculator(tmp_path, inputs: list):
+    speculator = Speculator(StubWidget(), str(tmp_path), lambda: inputs[0],
+                            lambda text, rate, options: [text], max_per_minute=100)
+    speculator.enabled = True
+    return speculator
+
+
+def _speculate(speculator: Speculator, inputs: list, text: str):
+    inputs[0] = (text, "voice", "+0%", "+0Hz", ())
+    speculator._speculate()
+    return speculator._current
+
+
+def _job_dir(tmp_path, text: str) -> str:
+    return os.path.join(str(tmp_path), JobManifest.job_id_for([text], "voice", "+0%", "+0Hz"))
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_unused_speculation_is_deleted_when_the_inputs_change(tmp_path, fake_service):
+    inputs = [None]
+    speculator = _speculator(tmp_path, inputs)
+    first = _speculate(speculator, inputs, "First text.")
+    assert first.future.result(5)
+    assert os.path.isdir(_job_dir(tmp_path, "First text."))
+
+    second = _speculate(speculator, inputs, "Second text.")
+    assert not os.path.exists(_job_dir(tmp_path, "First text."))
+    assert second.future.result(5)
+    speculator.shutdown()
+    assert not os.path.exists(_job_dir(tmp_path, "Second text."))
+
+
+def test_speculation_cancelled_mid_request_is_deleted_once_it_stops(tmp_path, fake_service):
+    fake_service.base_latency = 0.3
+    inputs = [None]
+    speculator = _speculator(tmp_path, inputs)
+    _speculate(speculator, inputs, "Slow text.")
+    assert _wait_for(lambda: os.path.isdir(_job_dir(tmp_path, "Slow text.")))
+    speculator.shutdown()
+    assert _wait_for(lambda: not os.path.exists(_job_dir(tmp_path, "Slow text.")))
+
+
+def test_claimed_and_reused_jobs_are_kept(tmp_path, fake_service):
+    inputs = [None]
+    speculator = _speculator(tmp_path, inputs)
+    claimed = _speculate(speculator, inputs, "Claimed text.")
+    claimed.future.result(5)
+    assert speculator.claim(claimed.job_id) is claimed
+    _speculate(speculator, inputs, "Other text.").future.result(5)
+
+    # The inputs change back while the first speculation of the same job still holds it
+    fake_service.base_latency = 0.3
+    _speculate(speculator, inputs, "Same text.")
+    _speculate(speculator, inputs, "Interlude.")
+    again = _speculate(speculator, inputs, "Same text.")
+    assert again.future.result(5) is not None
+    time.sleep(0.4) # The discarded speculation has stopped by now
+    assert os.path.isdir(_job_dir(tmp_path, "Same text."))
+    speculator.shutdown()
+    assert os.path.isdir(_job_dir(tmp_path, "Claimed text."))
+    assert not os.path.exists(_job_dir(tmp_path, "Other text."))
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import tts.retry
+from tts.job_manifest import JobManifest
+from tts.metrics import SynthesisMetrics
+from tts.synthesis import ChunkSynthesisError, generate_job
+
+
+def _run_job(jobs_dir: str, chunks: list[str], source_text: str, **kwargs):
+    manifest = JobManifest.open_or_create(jobs_dir, chunks, "voice", "+0%", "+0Hz", source_text)
+    ready = []
+    on_chunk_ready = lambda i, path, word_index, text_start: ready.append((i, path, word_index, text_start))
+    asyncio.run(generate_job(manifest, chunks, source_text, "voice", "+0%", "+0Hz", on_chunk_ready=on_chunk_ready, **kwargs))
+    return manifest, ready
+
+
+def test_transient_failure_is_retried(tmp_path, fake_service):
+    chunks = ["First chunk.", "Second chunk."]
+    fake_service.failures["Second chunk."] = 1
+    retries = []
+    manifest, ready = _run_job(str(tmp_path), chunks, " ".join(chunks),
+                               on_retry=lambda i, attempt, error, delay: retries.append(i))
+    assert retries == [1]
+    assert [i for i, *_ in ready] == [0, 1]
+    assert manifest.is_complete()
+
+
+def test_retried_chunk_is_timed_from_its_last_attempt(tmp_path, fake_service, monkeypatch):
+    monkeypatch.setattr(tts.retry, "backoff_delay", lambda attempt, base_delay=0.0, max_delay=0.0: 0.2)
+    fake_service.failures["Only chunk."] = 1
+    metrics = SynthesisMetrics()
+    _run_job(str(tmp_path), ["Only chunk."], "Only chunk.", metrics=metrics)
+    chunk = metrics.chunk_snapshot()[0]
+    assert chunk.retries == 1
+    assert chunk.synthesis_time < 0.2 # Without the failed attempt and the backoff
+    assert chunk.time_to_first_byte <= chunk.synthesis_time
+    assert chunk.attempt_started_at - chunk.started_at >= 0.2
+
+
+def test_failed_job_resumes_with_only_the_failed_chunk(tmp_path, fake_service):
+    chunks = ["First chunk.", "Second chunk.", "Third chunk."]
+    source_text = " ".join(chunks)
+    fake_service.failures["Second chunk."] = -1
+    with pytest.raises(ChunkSynthesisError) as error:
+        _run_job(str(tmp_path), chunks, source_text)
+    assert error.value.index == 1
+    manifest = JobManifest.load(JobManifest.open_or_create(str(tmp_path), chunks, "voice", "+0%", "+0Hz", source_text).job_dir)
+    assert manifest.is_done(0) and manifest.is_done(2)
+    assert not manifest.is_done(1)
+
+    del fake_service.failures["Second chunk."]
+    requests = fake_service.requests
+    manifest, ready = _run_job(str(tmp_path), chunks, source_text)
+    assert fake_service.requests == requests + 1
+    assert [i for i, *_ in ready] == [0, 1, 2]
+    assert manifest.is_complete()
+
+
+def test_repeated_chunk_is_synthesized_once_and_remapped(tmp_path, fake_service):
+    chunks = ["Hello world.", "Other words.", "Hello world."]
+    source_text = " ".join(chunks)
+    manifest, ready = _run_job(str(tmp_path), chunks, source_text)
+    assert fake_service.requests == 2
+    assert [i for i, *_ in ready] == [0, 1, 2]
+    assert ready[2][1] == ready[0][1]
+    # The shared audio highlights the words of the repeated occurrence
+    assert ready[0][2].first_text_offset() == 0
+    assert ready[2][2].first_text_offset() == source_text.rindex("Hello")
+    assert ready[2][3] == source_text.rindex("Hello")
+
+
+def test_max_chunks_only_generates_the_first_chunks(tmp_path, fake_service):
+    chunks = ["First chunk.", "Second chunk.", "Third chunk."]
+    manifest, ready = _run_job(str(tmp_path), chunks, " ".join(chunks), max_chunks=1)
+    assert [i for i, *_ in ready] == [0]
+    assert manifest.done_count() == 1
@@ -0,0 +1,124 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from config.consts import VOICE_PREVIEW_CACHE_BYTES, VOICE_PREVIEW_PREFETCH, VOICE_PREVIEW_SENTENCES
+from file_utils.word_boundaries import WordLocator
+from tts.backend import submit_to_synthesis_loop
+from tts.metrics import ChunkMetrics
+from tts.synthesis import synthesize_chunk
+
+log = logging.getLogger(__name__)
+
+
+def preview_sentence(voice: str) -> str:
+    """The sample sentence in the language of a voice ("de-DE-KatjaNeural" -> German)."""
+    return VOICE_PREVIEW_SENTENCES.get(voice.split("-")[0].lower(), VOICE_PREVIEW_SENTENCES["en"])
+
+
+class VoicePreviewCache:
+    """
+    Bounded on-disk cache of voice previews, one MP3 per voice and sample sentence.
+    Playing a preview marks it as used (its mtime); when the cache grows over
+    `max_bytes` the least recently used previews are deleted.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = VOICE_PREVIEW_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, voice: str) -> str:
+        key = hashlib.sha256(f"{voice}|{preview_sentence(voice)}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{voice}_{key}.mp3")
+
+    def get(self, voice: str) -> str | None:
+        """Path of the cached preview of voice, or None."""
+        path = self.path_for(voice)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def evict(self):
+        """Deletes the least recently used previews until the cache fits its budget."""
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".mp3")]
+                files = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries))
+            except OSError as e:
+                log.warning("Could not scan the voice preview cache: %s", e)
+                return
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as e:
+                    log.debug("Could not evict voice preview %s: %s", path, e)
+
+
+class VoicePreviewer:
+    """
+    Fetches voice previews into the cache on the shared synthesis loop (so they count
+    against the same rate limit as generations). Concurrent requests for one voice share
+    a fetch. on_ready(voice, path) is called on the synthesis loop when a fetch succeeds.
+    """
+    def __init__(self, cache: VoicePreviewCache, on_ready: Callable[[str, str], None] | None = None):
+        self.cache = cache
+        self.on_ready = on_ready
+        self._fetches: dict[str, concurrent.futures.Future] = {}
+        self.fetched = 0
+        self.hits = 0
+
+    def request(self, voice: str) -> str | None:
+        """The cached preview of voice, or None after starting (or joining) its fetch."""
+        path = self.cache.get(voice)
+        if path is not None:
+            self.hits += 1
+            return path
+        if voice not in self._fetches:
+            future = submit_to_synthesis_loop(self._fetch(voice))
+            self._fetches[voice] = future
+            future.add_done_callback(lambda _: self._fetches.pop(voice, None))
+        return None
+
+    def prefetch(self, voices: list[str], count: int = VOICE_PREVIEW_PREFETCH):
+        """Starts fetching the previews of the first `count` voices that are not cached yet."""
+        for voice in voices[:count]:
+            if self.cache.get(voice) is None:
+                self.request(voice)
+
+    def cancel(self):
+        for future in list(self._fetches.values()):
+            future.cancel()
+
+    async def _fetch(self, voice: str):
+        text = preview_sentence(voice)
+        path = self.cache.path_for(voice)
+        tmp_path = path + ".tmp"
+        try:
+            await synthesize_chunk(text, voice, "+0%", "+0Hz", tmp_path, WordLocator(text),
+                                   ChunkMetrics(0, time.perf_counter()))
+            os.replace(tmp_path, path)
+        except (Exception, asyncio.CancelledError) as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            log.warning("Could not fetch the preview of %s: %s", voice, e)
+            return
+        self.fetched += 1
+        log.debug("Voice preview of %s cached", voice)
+        self.cache.evict()
+        if self.on_ready:
+            self.on_ready(voice, path)
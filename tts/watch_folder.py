@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from config.consts import WATCH_POLL_SECONDS, WATCH_SETTLE_SECONDS, WATCH_PARALLEL, WATCH_EXTENSIONS, \
+    SERVE_CHUNK_MIN_WORDS, SERVE_CHUNK_REGEX
+from file_utils.audio_files import concat_audio
+from file_utils.text_files import read_text_file
+from tts.backend import connection_pool
+from tts.job_manifest import JobManifest
+from tts.synthesis import generate_job, chunk_text, ChunkSynthesisError
+
+log = logging.getLogger(__name__)
+
+
+def _file_hash(path: str, settings: str) -> str:
+    """Hash of a file's content and the synthesis settings, so changing either makes it new."""
+    digest = hashlib.sha256(settings.encode("utf-8"))
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class WatchFolder:
+    """
+    Headless watch-folder mode (`main.py --watch DIR`): every .txt/.srt file dropped into
+    (or changed in) the folder is read with the GUI's loader, chunked and synthesized into
+    an MP3 of the same name in the output folder.
+
+    The folder is polled with (mtime, size) snapshots. A file is only taken once its
+    snapshot stayed the same for `settle_seconds`, so files that are still being written
+    or copied are not read half-way. Up to `parallel` files are synthesized at once on the
+    shared synthesis loop, resuming from their job manifests. What was converted is kept
+    in a state file in the output folder (by hash of content and settings), so after a
+    restart, and for files that were only touched, nothing is synthesized twice.
+    """
+    STATE_FILE_NAME = ".watch_state.json"
+
+    def __init__(self, watch_dir: str, output_dir: str, jobs_dir: str, voice: str, rate: str = "+0%",
+                 pitch: str = "+0Hz", split: bool = True, min_words: int = SERVE_CHUNK_MIN_WORDS,
+                 chunk_regex: str = SERVE_CHUNK_REGEX, parallel: int = WATCH_PARALLEL,
+                 poll_seconds: float = WATCH_POLL_SECONDS, settle_seconds: float = WATCH_SETTLE_SECONDS, janitor=None):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.jobs_dir = jobs_dir
+        self.voice = voice
+        self.rate = rate
+        self.pitch = pitch
+        self.split = split
+        self.min_words = min_words
+        self.chunk_regex = chunk_regex
+        self.parallel = parallel
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.janitor = janitor
+        self.state_path = os.path.join(self.output_dir, self.STATE_FILE_NAME)
+        self._settings = f"{voice}|{rate}|{pitch}|{split}|{min_words}|{chunk_regex}"
+        self._state: dict[str, dict] = {} # File name -> {"hash", "mtime", "size", "output"} of its last conversion
+        self._pending: dict[str, tuple[tuple[int, int], float]] = {} # File name -> (snapshot, time it was first seen)
+        self._failed: dict[str, tuple[int, int]] = {} # File name -> snapshot that failed, retried once it changes
+        self._running: dict[str, asyncio.Task] = {}
+        self.converted = 0
+        self.skipped = 0
+        self.failures = 0
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load_state()
+
+    async def run(self):
+        """Polls the folder until cancelled. Conversions still running are cancelled and resume on the next start."""
+        semaphore = asyncio.Semaphore(self.parallel)
+        log.info("Watching %s for %s files, writing to %s",
+                 self.watch_dir, ', '.join(WATCH_EXTENSIONS), self.output_dir)
+        try:
+            while True:
+                for name, snapshot in (await asyncio.to_thread(self._scan)).items():
+                    if self._is_settled(name, snapshot):
+                        self._running[name] = asyncio.get_running_loop().create_task(
+                            self._convert(name, snapshot, semaphore))
+                        self._running[name].add_done_callback(lambda task, name=name: self._running.pop(name, None))
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            for task in list(self._running.values()):
+                task.cancel()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshots = {}
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            log.warning("Could not scan %s: %s", self.watch_dir, e)
+            return snapshots
+        for entry in entries:
+            if entry.name.lower().endswith(WATCH_EXTENSIONS) and not entry.name.startswith("."):
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshots[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    pass # Removed while scanning
+        for name in set(self._pending) - set(snapshots):
+            del self._pending[name]
+        return snapshots
+
+    def _is_settled(self, name: str, snapshot: tuple[int, int]) -> bool:
+        """Whether a new or changed file stopped changing and should be converted now."""
+        if name in self._running or self._failed.get(name) == snapshot:
+            return False
+        known = self._state.get(name)
+        if known is not None and (known["mtime"], known["size"]) == snapshot and os.path.exists(known["output"]):
+            return False
+        pending = self._pending.get(name)
+        now = time.monotonic()
+        if pending is None or pending[0] != snapshot:
+            self._pending[name] = (snapshot, now) # New or still being written, wait for it to settle
+            return False
+        if now - pending[1] < self.settle_seconds:
+            return False
+        del self._pending[name]
+        return True
+
+    async def _convert(self, name: str, snapshot: tuple[int, int], semaphore: asyncio.Semaphore):
+        path = os.path.join(self.watch_dir, name)
+        output_path = os.path.join(self.output_dir, os.path.splitext(name)[0] + ".mp3")
+        try:
+            content_hash = await asyncio.to_thread(_file_hash, path, self._settings)
+            known = self._state.get(name)
+            if known is not None and known["hash"] == content_hash and os.path.exists(known["output"]):
+                self.skipped += 1
+                log.info("%s is unchanged, skipped", name)
+                self._record(name, content_hash, snapshot, known["output"])
+                return
+            async with semaphore:
+                text = (await asyncio.to_thread(read_text_file, path)).strip()
+                if not text:
+                    log.warning("%s has no text to read, skipped", name)
+                    self._failed[name] = snapshot
+                    return
+                chunks = chunk_text(text, self.min_words, self.chunk_regex) if self.split else [text]
+                manifest = await asyncio.to_thread(JobManifest.open_or_create, self.jobs_dir, chunks, self.voice,
+                                                   self.rate, self.pitch, text)
+                log.info("%s: generating %s chunks with %s", name, len(chunks), self.voice)
+                await generate_job(manifest, chunks, text, self.voice, self.rate, self.pitch)
+            await asyncio.to_thread(concat_audio, [manifest.chunk_path(i) for i in range(len(chunks))], output_path)
+            if self.janitor is not None:
+                self.janitor.delete(manifest.all_paths())
+                self.janitor.delete([manifest.job_dir], delay=1.0) # After its files are gone
+            self.converted += 1
+            self._failed.pop(name, None)
+            self._record(name, content_hash, snapshot, output_path)
+            log.info("%s converted to %s", name, output_path)
+        except asyncio.CancelledError:
+            raise # Shutdown: the job manifest keeps the finished chunks
+        except Exception as e:
+            self.failures += 1
+            self._failed[name] = snapshot
+            if not isinstance(e, ChunkSynthesisError): # Chunk failures are logged by generate_job
+                log.error("Could not convert %s: %s", name, e)
+
+    # --- State ---
+    def _record(self, name: str, content_hash: str, snapshot: tuple[int, int], output_path: str):
+        self._state[name] = {"hash": content_hash, "mtime": snapshot[0], "size": snapshot[1], "output": output_path}
+        self._save_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("watch_dir") == self.watch_dir:
+                self._state = data["files"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("Ignoring unreadable watch state %s: %s", self.state_path, e)
+
+    def _save_state(self):
+        """Writes the state atomically so a crash never leaves a half-written file."""
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"watch_dir": self.watch_dir, "files": self._state}, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            log.error("Could not save the watch state: %s", e)
+
+
+def watch(watch_dir: str, output_dir: str, jobs_dir: str, voice: str, rate: str, pitch: str, janitor=None, **options):
+    """Runs the watch-folder mode until interrupted (Ctrl+C)."""
+    watcher = WatchFolder(watch_dir, output_dir, jobs_dir, voice, rate, pitch, janitor=janitor, **options)
+
+    async def run():
+        try:
+            await watcher.run()
+        finally:
+            await connection_pool().close()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    log.info("Stopped watching %s: %s converted, %s unchanged, %s failed",
+             watch_dir, watcher.converted, watcher.skipped, watcher.failures)
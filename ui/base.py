@@ -1,16 +1,24 @@
 
 
+import logging
 import customtkinter as ctk
 
 import pyglet
 import file_utils.text_files
+from ui.widget_state import WidgetStateCache
+from ui.text_tracker import TextChangeTracker
+from ui.waveform import WaveformOverview
 from config.settings import StoredUiState
 from config.consts import SEEK_INTERVAL_SECONDS, MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT, TEXTBOX_PLACEHOLDER_TEXT, \
-    TEXTBOX_PLACEHOLDER_COLOR
+    TEXTBOX_PLACEHOLDER_COLOR, WORD_HIGHLIGHT_TAG, WORD_HIGHLIGHT_COLOR, PLAYBACK_SPEEDS, VOICE_PREVIEW_HOVER_MS
+from file_utils.time_stretch import NUMPY_AVAILABLE
+from file_utils.chunk_polish import POLISH_AVAILABLE
 from tkinter import filedialog
 
 from enum import Enum
 
+log = logging.getLogger(__name__)
+
 class UIStatusUpdate(Enum):
     ONLY = 1
     GENERATOR = 2
@@ -27,12 +35,17 @@ class EdgeTTSUi(ctk.CTk):
         self.previous_generator_message = "" # Used to track last generator message for updates
         self.previous_player_message = "" # Used to track last player message for updates
 
+        # Widget state diffing / coalescing for set_ui_state
+        self._widget_states = WidgetStateCache()
+        self._pending_ui_state: str | None = None
+        self._ui_state_after_id: str | None = None
+
         # Placeholder state
         self.textbox_placeholder_active = False
         self.default_textbox_color = None # Will be fetched after widget creation
 
         # --- Theme is now initially System ---
-        print(f"INFO: Initial appearance mode requested: 'System'")
+        log.info("Initial appearance mode requested: 'System'")
 
         self.title("Edge TTS Text-to-Speech")
         self.resizable(True, True)
@@ -47,7 +60,7 @@ class EdgeTTSUi(ctk.CTk):
         # Set initial state of the theme switch based on the *actual* mode determined by "System"
         # Needs a slight delay for the system mode to be resolved and applied
         self.after(50, self._update_theme_switch_state)
-        print(f"INFO: Actual initial mode (after System resolution): '{ctk.get_appearance_mode()}'")
+        log.info("Actual initial mode (after System resolution): '%s'", ctk.get_appearance_mode())
 
     def _build_ui(self, app: 'EdgeTTSApp', ui_state: StoredUiState = StoredUiState()):
         """Creates all user interface elements (widgets)."""
@@ -63,6 +76,8 @@ class EdgeTTSUi(ctk.CTk):
         ctk.CTkLabel(input_header_frame, text="Input Text", font=ctk.CTkFont(size=14, weight="bold")).grid(row=0,
                                                                                                            column=0,
                                                                                                            sticky="w")
+        self.text_stats_label = ctk.CTkLabel(input_header_frame, text="", text_color="grey")
+        self.text_stats_label.grid(row=0, column=1, padx=(10, 5), sticky="e")
 
         # Theme Toggle Switch
         self.theme_switch = ctk.CTkSwitch(
@@ -72,7 +87,7 @@ class EdgeTTSUi(ctk.CTk):
             onvalue=1,  # Represents "Dark" mode ON
             offvalue=0  # Represents "Dark" mode OFF (i.e., Light mode)
         )
-        self.theme_switch.grid(row=0, column=1, padx=(10, 5), sticky="e")
+        self.theme_switch.grid(row=0, column=2, padx=(10, 5), sticky="e")
 
         if ui_state.dark:
             self.theme_switch.select()
@@ -83,7 +98,7 @@ class EdgeTTSUi(ctk.CTk):
 
         self.load_file_btn = ctk.CTkButton(input_header_frame, text="Load File...", width=100,
                                            command=self.load_text_from_file)
-        self.load_file_btn.grid(row=0, column=2, padx=(0, 5), sticky="e")
+        self.load_file_btn.grid(row=0, column=3, padx=(0, 5), sticky="e")
 
         input_frame = ctk.CTkFrame(self)
         input_frame.grid(row=1, column=0, padx=20, pady=5, sticky="nsew")
@@ -98,8 +113,17 @@ class EdgeTTSUi(ctk.CTk):
         self.textbox.bind("<FocusIn>", self._on_textbox_focus_in)
         self.textbox.bind("<FocusOut>", self._on_textbox_focus_out)
 
-        # Detect text changes
-        self.textbox.bind("<KeyRelease>", self._on_textbox_change)
+        # Detect text changes: the tracker keeps counts per insert/delete, <<Modified>> refreshes the UI
+        # (CTkTextbox has no public accessor for the wrapped tk.Text widget)
+        self.text_tracker = TextChangeTracker(self.textbox._textbox)
+        self.textbox.bind("<<Modified>>", self._on_textbox_change)
+
+        # Read-along: highlight of the spoken word, click on a word to seek there
+        self.textbox.tag_config(WORD_HIGHLIGHT_TAG, background=WORD_HIGHLIGHT_COLOR, foreground="black")
+        self._word_highlighted = False # The highlight spans the WORD_HIGHLIGHT_TAG marks, which follow edits
+        # Tcl 8.6 indexes emoji and other non-BMP characters as two positions, Tcl 9 as one
+        self.utf16_columns = self.tk.call("string", "length", "\U0001F600") == 2
+        self.textbox.bind("<ButtonRelease-1>", self._on_textbox_click)
 
         # --- Controls Area (Voice & Adjustments) ---
         # [Rest of the controls setup remains the same as before]
@@ -121,7 +145,15 @@ class EdgeTTSUi(ctk.CTk):
         self.voice_search_entry.bind("<KeyRelease>", self._on_voice_search)
         self.voice_dropdown = ctk.CTkComboBox(voice_select_frame, values=["Loading voices..."], state="disabled",
                                               command=self.voice_selected)
-        self.voice_dropdown.grid(row=2, column=0, padx=5, pady=(0, 5), sticky="ew")
+        self.voice_dropdown.grid(row=2, column=0, padx=(5, 0), pady=(0, 5), sticky="ew")
+        self.voice_preview_btn = ctk.CTkButton(voice_select_frame, text="🔊", width=32,
+                                               command=lambda: app.preview_voice(self.voice_dropdown.get()))
+        self.voice_preview_btn.grid(row=2, column=1, padx=5, pady=(0, 5))
+        self._preview_hover_id: str | None = None
+        # Hovering an entry of the open voice list plays its preview (the list is a tk Menu inside the combobox)
+        dropdown_menu = getattr(self.voice_dropdown, "_dropdown_menu", None)
+        if dropdown_menu is not None:
+            dropdown_menu.bind("<<MenuSelect>>", self._on_voice_hover)
         adj_frame = ctk.CTkFrame(controls_frame)
         adj_frame.grid(row=0, column=1, padx=(5, 0), pady=5, sticky="nsew")
         adj_frame.grid_columnconfigure(0, weight=1)
@@ -154,10 +186,18 @@ class EdgeTTSUi(ctk.CTk):
                                              command=lambda: self.reset_slider("pitch"))
         self.pitch_reset_btn.grid(row=0, column=3, padx=(0, 5), pady=5)
 
-        # --- Generate Button ---
-        self.generate_btn = ctk.CTkButton(self, text="Generate Speech", command=app.start_generate_speech_thread,
+        # --- Generate / Queue Buttons ---
+        generate_frame = ctk.CTkFrame(self, fg_color="transparent")
+        generate_frame.grid(row=4, column=0, padx=20, pady=5, sticky="ew")
+        generate_frame.grid_columnconfigure(0, weight=1)
+        self.generate_btn = ctk.CTkButton(generate_frame, text="Generate Speech", command=app.start_generate_speech_thread,
                                           height=40, font=ctk.CTkFont(size=14, weight="bold"), state="disabled")
-        self.generate_btn.grid(row=4, column=0, padx=20, pady=5, sticky="ew")
+        self.generate_btn.grid(row=0, column=0, sticky="ew")
+        self.queue_add_btn = ctk.CTkButton(generate_frame, text="Add to Queue", width=110, height=40,
+                                           command=app.add_snapshot_to_queue, state="disabled")
+        self.queue_add_btn.grid(row=0, column=1, padx=(5, 0))
+        self.queue_btn = ctk.CTkButton(generate_frame, text="Queue", width=90, height=40, command=app.open_queue_panel)
+        self.queue_btn.grid(row=0, column=2, padx=(5, 0))
 
         # --- Chunking Options Row ---
         self.chunk_options_frame = ctk.CTkFrame(self)
@@ -188,13 +228,44 @@ class EdgeTTSUi(ctk.CTk):
         self.chunk_sep_entry.grid(row=0, column=4, padx=(0, 0), sticky="w")
         self.chunk_sep_entry.insert(0, ui_state.chunk_regex)
 
+        self.speculate_checkbox = ctk.CTkCheckBox(self.chunk_options_frame, text="Pre-generate while idle",
+                                                  command=lambda: app.set_speculation(bool(self.speculate_checkbox.get())))
+        self.speculate_checkbox.grid(row=0, column=5, padx=(10, 0), sticky="e")
+        self.adaptive_chunks_checkbox = ctk.CTkCheckBox(self.chunk_options_frame, text="Adaptive chunk sizes (short first chunk, growing up to the word count)",
+                                                        command=app.on_inputs_changed)
+        self.adaptive_chunks_checkbox.grid(row=1, column=0, pady=(5, 0), sticky="w")
+        if ui_state.adaptive_chunks:
+            self.adaptive_chunks_checkbox.select()
+        if ui_state.speculate:
+            self.speculate_checkbox.select()
+        self.polish_checkbox = ctk.CTkCheckBox(self.chunk_options_frame, text="Trim & level chunks",
+                                               state=ctk.NORMAL if POLISH_AVAILABLE else ctk.DISABLED)
+        self.polish_checkbox.grid(row=0, column=6, padx=(10, 0), sticky="e")
+        ctk.CTkLabel(self.chunk_options_frame, text="regex Chapter heading:").grid(row=1, column=3, padx=(0, 5), pady=(5, 0), sticky="e")
+        self.chapter_regex_entry = ctk.CTkEntry(self.chunk_options_frame)
+        self.chapter_regex_entry.grid(row=1, column=4, columnspan=3, pady=(5, 0), sticky="ew")
+        self.chapter_regex_entry.insert(0, ui_state.chapter_regex)
+        # Lines starting with "SPEAKER:" or "[Speaker]" are read by the speaker's voice, the rest by the selected voice
+        ctk.CTkLabel(self.chunk_options_frame, text="Speaker voices:").grid(row=2, column=0, pady=(5, 0), sticky="w")
+        self.speaker_voices_entry = ctk.CTkEntry(self.chunk_options_frame,
+                                                 placeholder_text="NARRATOR=en-US-GuyNeural, ALICE=en-US-AriaNeural")
+        self.speaker_voices_entry.grid(row=2, column=1, columnspan=6, pady=(5, 0), sticky="ew")
+        if ui_state.speaker_voices:
+            self.speaker_voices_entry.insert(0, ui_state.speaker_voices)
+        if ui_state.polish and POLISH_AVAILABLE:
+            self.polish_checkbox.select()
+        # Changed chunking options invalidate a pre-generated first chunk
+        self.split_chunks_checkbox.configure(command=app.on_inputs_changed)
+        self.min_words_entry.bind("<KeyRelease>", lambda event: app.on_inputs_changed())
+        self.chunk_sep_entry.bind("<KeyRelease>", lambda event: app.on_inputs_changed())
+
         self.chunking_widgets = [
             self.split_chunks_checkbox,
             self.min_words_label,
             self.min_words_entry,
             self.chunk_sep_label,
             self.chunk_sep_entry,
-
+            self.adaptive_chunks_checkbox,
         ]
         # --- Player Controls ---
         # [Player controls setup remains the same as before]
@@ -228,15 +299,68 @@ class EdgeTTSUi(ctk.CTk):
             self.auto_play.deselect()
         self.auto_play.grid(row=0, column=5, padx=(10, 0), sticky="w")
 
-        # --- Save Button ---
-        self.save_btn = ctk.CTkButton(self, text="Save Audio as MP3", command=app.save_audio, height=40,
+        # Local tempo change of the generated audio, no re-synthesis
+        ctk.CTkLabel(self.player_frame, text="Speed:", font=ctk.CTkFont(size=11)).grid(row=0, column=6, padx=(15, 5))
+        self.speed_menu = ctk.CTkOptionMenu(self.player_frame, values=[f"{speed:g}x" for speed in PLAYBACK_SPEEDS], width=75,
+                                            command=lambda value: app.set_playback_speed(float(value.rstrip("x"))),
+                                            state=ctk.NORMAL if NUMPY_AVAILABLE else ctk.DISABLED)
+        self.speed_menu.set("1x")
+        self.speed_menu.grid(row=0, column=7, padx=(0, 10), pady=10)
+        # Drag to seek, wheel to zoom (needs numpy for the peaks)
+        self.waveform = WaveformOverview(self.player_frame, app)
+        if NUMPY_AVAILABLE:
+            self.waveform.grid(row=1, column=0, columnspan=8, padx=10, pady=(0, 10), sticky="ew")
+
+        # --- Save Buttons ---
+        save_frame = ctk.CTkFrame(self, fg_color="transparent")
+        save_frame.grid(row=7, column=0, padx=20, pady=5, sticky="ew")
+        save_frame.grid_columnconfigure(0, weight=1)
+        self.save_btn = ctk.CTkButton(save_frame, text="Save Audio as MP3", command=app.save_audio, height=40,
                                       font=ctk.CTkFont(size=14), state="disabled")
-        self.save_btn.grid(row=7, column=0, padx=20, pady=5, sticky="ew")
+        self.save_btn.grid(row=0, column=0, sticky="ew")
+        # Generates and exports the text chapter by chapter, independent of the audio in the player
+        self.export_chapters_btn = ctk.CTkButton(save_frame, text="Export Chapters...", command=app.export_chapters,
+                                                 width=150, height=40, font=ctk.CTkFont(size=14), state="disabled")
+        self.export_chapters_btn.grid(row=0, column=1, padx=(5, 0))
+        self.export_formats_btn = ctk.CTkButton(save_frame, text="Export Formats...", command=app.open_export_dialog,
+                                                width=150, height=40, font=ctk.CTkFont(size=14), state="disabled")
+        self.export_formats_btn.grid(row=0, column=2, padx=(5, 0))
 
         # --- Status Label ---
         self.status_label = ctk.CTkLabel(self, text="Status: Initializing...", height=25, anchor="w")
         self.status_label.grid(row=8, column=0, padx=20, pady=(5, 10), sticky="ew")
 
+        # --- Synthesis Stats (collapsible) ---
+        self.stats_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.stats_frame.grid(row=9, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.stats_frame.grid_columnconfigure(0, weight=1)
+        self.stats_toggle_btn = ctk.CTkButton(self.stats_frame, text="▸ Synthesis stats", width=140, anchor="w",
+                                              fg_color="transparent", text_color=("gray10", "gray90"),
+                                              command=self.toggle_stats_panel)
+        self.stats_toggle_btn.grid(row=0, column=0, sticky="w")
+        self.stats_export_btn = ctk.CTkButton(self.stats_frame, text="Export...", width=80, command=app.export_metrics)
+        self.stats_label = ctk.CTkLabel(self.stats_frame, text="No generation yet.", justify="left", anchor="w",
+                                        font=ctk.CTkFont(family="Courier", size=11))
+        self.stats_panel_visible = False
+
+    def toggle_stats_panel(self):
+        """Shows or hides the synthesis stats panel."""
+        self.stats_panel_visible = not self.stats_panel_visible
+        if self.stats_panel_visible:
+            self.stats_toggle_btn.configure(text="▾ Synthesis stats")
+            self.stats_export_btn.grid(row=0, column=1, sticky="e")
+            self.stats_label.grid(row=1, column=0, columnspan=2, sticky="ew")
+            self.update_stats_panel(self.app._stats_text())
+        else:
+            self.stats_toggle_btn.configure(text="▸ Synthesis stats")
+            self.stats_export_btn.grid_remove()
+            self.stats_label.grid_remove()
+
+    def update_stats_panel(self, text: str):
+        """Refreshes the stats text (skipped while the panel is collapsed)."""
+        if self.stats_panel_visible and self.stats_label.winfo_exists():
+            self.stats_label.configure(text=text)
+
     def toggle_play_pause(self):
         self.app.toggle_play_pause()  # Use app method to handle play/pause logic
         if not self.playback_end_watcher:
@@ -247,6 +371,8 @@ class EdgeTTSUi(ctk.CTk):
         if self.playback_end_watcher:
             pyglet.app.platform_event_loop.dispatch_posted_events()
             pyglet.clock.tick()
+            self.app.update_word_highlight()
+            self.waveform.update_playhead()
             if self.app.player.source:
                 self.after(50, self._trigger_pyglet_eventloop)
             else:
@@ -258,6 +384,28 @@ class EdgeTTSUi(ctk.CTk):
         self.app.stop_audio()
         self.playback_end_watcher = False  # unblock future watchers
 
+    def highlight_word(self, start_index: str, end_index: str):
+        """Moves the read-along highlight to the given textbox range and keeps it visible."""
+        if not hasattr(self, 'textbox') or not self.textbox.winfo_exists(): return
+        self.clear_word_highlight()
+        self.textbox.tag_add(WORD_HIGHLIGHT_TAG, start_index, end_index)
+        self.textbox.mark_set(f"{WORD_HIGHLIGHT_TAG}_start", start_index)
+        self.textbox.mark_set(f"{WORD_HIGHLIGHT_TAG}_end", end_index)
+        self._word_highlighted = True
+        self.textbox.see(end_index)
+
+    def clear_word_highlight(self):
+        """Removes the read-along highlight (only its range, not a scan of the whole document)."""
+        if self._word_highlighted and hasattr(self, 'textbox') and self.textbox.winfo_exists():
+            self.textbox.tag_remove(WORD_HIGHLIGHT_TAG, f"{WORD_HIGHLIGHT_TAG}_start", f"{WORD_HIGHLIGHT_TAG}_end")
+        self._word_highlighted = False
+
+    def _on_textbox_click(self, event=None):
+        """Seeks playback to the clicked word if audio for the text is loaded."""
+        if event is None or self.textbox_placeholder_active: return
+        line, column = map(int, self.textbox.index(f"@{event.x},{event.y}").split("."))
+        self.app.seek_to_text_position(line, column)
+
     def load_text_from_file(self):
         file_path = filedialog.askopenfilename(
             title="Select Text or Subtitle File",  # Dialog title
@@ -267,7 +415,10 @@ class EdgeTTSUi(ctk.CTk):
         content = file_utils.text_files.load_text_from_file(self, file_path)
         if content is None:
             return
+        self.set_input_text(content)
 
+    def set_input_text(self, content: str):
+        """Replaces the textbox content (or restores the placeholder if content is empty)."""
         # Insert content into the textbox
         if hasattr(self, 'textbox') and self.textbox.winfo_exists():
              self.textbox_placeholder_active = False # Ensure placeholder is off
@@ -289,18 +440,18 @@ class EdgeTTSUi(ctk.CTk):
                 # Ensure the widget is fully ready
                 self.textbox.update_idletasks()
                 self.default_textbox_color = self.textbox.cget("text_color")
-                print(f"INFO: Default textbox color fetched: {self.default_textbox_color}")
+                log.info("Default textbox color fetched: %s", self.default_textbox_color)
                 # If placeholder is currently active, ensure its color is correct
                 # This can happen if fetch was delayed past initial set
                 if self.textbox_placeholder_active:
                     self.textbox.configure(text_color=TEXTBOX_PLACEHOLDER_COLOR)
 
             except Exception as e:
-                print(f"WARN: Could not fetch default textbox color: {e}")
+                log.warning("Could not fetch default textbox color: %s", e)
                 # Fallback (might not match theme perfectly)
                 current_mode = ctk.get_appearance_mode()
                 self.default_textbox_color = "#DCE4EE" if current_mode == "Dark" else "#111111"  # Near-white for Dark, Near-black for Light
-                print(f"INFO: Using fallback textbox color for {current_mode} mode: {self.default_textbox_color}")
+                log.info("Using fallback textbox color for %s mode: %s", current_mode, self.default_textbox_color)
         else:
             # Reschedule if textbox doesn't exist or color isn't ready yet
             self.after(50, self._fetch_default_textbox_color)
@@ -312,16 +463,15 @@ class EdgeTTSUi(ctk.CTk):
             return
         # Ensure default color is fetched before proceeding
         if self.default_textbox_color is None:
-            print("INFO: Waiting for default text color fetch before setting placeholder...")
+            log.info("Waiting for default text color fetch before setting placeholder...")
             self.after(50, self._set_initial_textbox_placeholder)  # Retry shortly
             return
 
-        current_text = self.textbox.get("1.0", "end-1c").strip()
-        if not current_text:
+        if not self.text_tracker.has_text:
             self.textbox_placeholder_active = True
             self.textbox.insert("1.0", TEXTBOX_PLACEHOLDER_TEXT)
             self.textbox.configure(text_color=TEXTBOX_PLACEHOLDER_COLOR)
-            print("INFO: Initial textbox placeholder set.")
+            log.info("Initial textbox placeholder set.")
 
     def _on_textbox_focus_in(self, event=None):
         """Handles the textbox gaining focus."""
@@ -342,20 +492,33 @@ class EdgeTTSUi(ctk.CTk):
         if not hasattr(self, 'textbox') or not self.default_textbox_color: return
         # Verify focus is actually lost from textbox (important!)
         if self.focus_get() != self.textbox:
-            current_text = self.textbox.get("1.0", "end-1c").strip()
-            if not current_text:
+            if not self.text_tracker.has_text:
                 self.textbox_placeholder_active = True
                 self.textbox.insert("1.0", TEXTBOX_PLACEHOLDER_TEXT)
                 self.textbox.configure(text_color=TEXTBOX_PLACEHOLDER_COLOR)
 
-    def get_input_text(self) -> str:
-        """Gets the text from the textbox, excluding the placeholder."""
+    def has_input_text(self) -> bool:
+        """Cheap check for non-placeholder, non-whitespace text (no text extraction)."""
+        if not hasattr(self, 'text_tracker') or self.textbox_placeholder_active:
+            return False
+        return self.text_tracker.has_text
+
+    def input_text_revision(self) -> int:
+        """Changes with every edit of the textbox, tells whether an earlier get_input_text is still current."""
+        return self.text_tracker.revision if hasattr(self, 'text_tracker') else 0
+
+    def get_input_text(self, strip: bool = True, max_chars: int | None = None) -> str:
+        """
+        Gets the text from the textbox, excluding the placeholder.
+        Copies the whole document unless max_chars is given, so only call it when generating.
+        """
         if not hasattr(self, 'textbox'):
             return ""
         if self.textbox_placeholder_active:
             return ""
-        else:
-            return self.textbox.get("1.0", "end-1c").strip()
+        end = f"1.0+{max_chars}c" if max_chars is not None else "end-1c"
+        text = self.textbox.get("1.0", end)
+        return text.strip() if strip else text
 
     # --- Theme Toggle ---
     def _toggle_theme_override(self):
@@ -368,17 +531,17 @@ class EdgeTTSUi(ctk.CTk):
             new_mode = "Dark" if switch_state == 1 else "Light"
             # Explicitly set the mode, stopping system following
             ctk.set_appearance_mode(new_mode)
-            print(f"INFO: Appearance mode explicitly set to '{new_mode}' (overriding System).")
+            log.info("Appearance mode explicitly set to '%s' (overriding System).", new_mode)
 
             # Update default color after theme change (needs a slight delay)
             if hasattr(self, 'textbox'):
                  self.after(50, self._update_textbox_colors_after_theme_change)
         else:
-            print("WARN: Theme switch not available.")
+            log.warning("Theme switch not available.")
 
     def _update_textbox_colors_after_theme_change(self):
         """Updates textbox color refs and re-applies placeholder if needed."""
-        print("INFO: Updating textbox colors after theme change...")
+        log.info("Updating textbox colors after theme change...")
         self._fetch_default_textbox_color() # Re-fetch the potentially new default color
         # The fetch function now handles applying placeholder color if active
 
@@ -388,17 +551,17 @@ class EdgeTTSUi(ctk.CTk):
             try:
                 # Use get_appearance_mode() which returns the resolved mode ("Light" or "Dark")
                 current_mode = ctk.get_appearance_mode()
-                print(f"INFO: Updating theme switch state for effective mode: '{current_mode}'")
+                log.info("Updating theme switch state for effective mode: '%s'", current_mode)
                 if current_mode == "Dark":
                     self.theme_switch.select() # Turn switch ON
                 else:
                     self.theme_switch.deselect() # Turn switch OFF
             except Exception as e:
-                 print(f"WARN: Error updating theme switch state: {e}")
+                 log.warning("Error updating theme switch state: %s", e)
         else:
             # Reschedule if switch doesn't exist yet
             self.after(100, self._update_theme_switch_state)
-            print("WARN: Theme switch not available for state update yet, rescheduling.")
+            log.warning("Theme switch not available for state update yet, rescheduling.")
 
    # --- UI & State Update Methods ---
     def update_status(self, message: str, type: UIStatusUpdate = UIStatusUpdate.ONLY):
@@ -415,9 +578,22 @@ class EdgeTTSUi(ctk.CTk):
             self.status_label.configure(text=f"Status: {message}")
 
     def _on_textbox_change(self, event=None):
-        """Called when text is typed in the textbox to update UI state."""
-        # Use after_idle to ensure the text change is processed first
-        self.after_idle(self._update_ui_after_text_change)
+        """Called on <<Modified>> when the textbox content changed, updates counts and UI state."""
+        if not self.textbox.edit_modified():
+            return # Triggered by resetting the flag below
+        self.textbox.edit_modified(False) # Re-arm <<Modified>> for the next change
+        self._update_text_stats_label()
+        # set_ui_state is applied on idle, so the text change is processed first
+        self._update_ui_after_text_change()
+        self.app.on_inputs_changed()
+
+    def _update_text_stats_label(self):
+        """Shows the incrementally tracked word and character count."""
+        if self.textbox_placeholder_active:
+            text = ""
+        else:
+            text = f"{self.text_tracker.word_count:,} words, {self.text_tracker.char_count:,} chars"
+        self._widget_states.apply(self.text_stats_label, text=text)
 
     def _update_ui_after_text_change(self):
         """Updates UI state after text changes, maintaining current state context."""
@@ -431,7 +607,22 @@ class EdgeTTSUi(ctk.CTk):
 
 
     def set_ui_state(self, state: str):
-        """Sets the enabled/disabled state of UI widgets based on application state."""
+        """
+        Requests a UI state change. Bursts of requests are coalesced and applied once
+        per idle cycle, the last requested state wins.
+        """
+        self._pending_ui_state = state
+        if self._ui_state_after_id is None:
+            self._ui_state_after_id = self.after_idle(self._apply_pending_ui_state)
+
+    def _apply_pending_ui_state(self):
+        self._ui_state_after_id = None
+        state, self._pending_ui_state = self._pending_ui_state, None
+        if state is not None:
+            self._apply_ui_state(state)
+
+    def _apply_ui_state(self, state: str):
+        """Sets the enabled/disabled state of UI widgets, touching only widgets whose options changed."""
         is_player_ready = bool(self.app.pyglet_initialized and self.app.player)
         is_audio_loaded = bool(is_player_ready and self.app.audio_file_path)
 
@@ -446,7 +637,7 @@ class EdgeTTSUi(ctk.CTk):
         can_save = is_audio_loaded and is_idle # Can save only when idle/stopped
 
         voices_loaded = bool(self.app.voices_dict)
-        has_input_text = bool(self.get_input_text())
+        has_input_text = self.has_input_text()
 
         # Add proper voice selection validation
         selected_voice = self.voice_dropdown.get() if hasattr(self, 'voice_dropdown') else ""
@@ -457,6 +648,7 @@ class EdgeTTSUi(ctk.CTk):
                            "No match" not in selected_voice)
 
         can_generate = has_valid_voice and has_input_text and state not in ['loading', 'generating', 'playing', 'error_no_audio']
+        can_queue = has_valid_voice and has_input_text and state not in ['loading', 'error_no_audio'] # Also while generating
         can_load_text = state not in ['loading', 'generating', 'playing', 'error_no_audio']
         controls_active = state not in ['loading', 'generating', 'error_no_audio']
         # Theme switch should always be active
@@ -469,6 +661,7 @@ class EdgeTTSUi(ctk.CTk):
         seek_btns_state = ctk.NORMAL if can_seek else ctk.DISABLED
         save_btn_state = ctk.NORMAL if can_save else ctk.DISABLED
         generate_btn_state = ctk.NORMAL if can_generate else ctk.DISABLED
+        queue_add_btn_state = ctk.NORMAL if can_queue else ctk.DISABLED
         chunking_state = ctk.NORMAL if can_generate else ctk.DISABLED
         chunking_state_label_color = "grey" if not can_generate else self.rate_value_label.cget("text_color")  # Dim label text when disabled
         load_file_btn_state = ctk.NORMAL if can_load_text else ctk.DISABLED
@@ -490,36 +683,46 @@ class EdgeTTSUi(ctk.CTk):
             self.has_played = True  # Mark that playback has started
         elif self.has_played and self.app.player.source: play_pause_text= "▶ Resume"
 
+        desired_states = [
+            ('theme_switch', dict(state=theme_switch_state)),
+            ('voice_dropdown', dict(state=voice_ctrl_state)),
+            ('voice_search_entry', dict(state=voice_ctrl_state)),
+            ('voice_preview_btn', dict(state=voice_ctrl_state)),
+            ('rate_slider', dict(state=adj_ctrl_state)),
+            ('pitch_slider', dict(state=adj_ctrl_state)),
+            ('rate_reset_btn', dict(state=adj_ctrl_state)),
+            ('pitch_reset_btn', dict(state=adj_ctrl_state)),
+            ('textbox', dict(state=textbox_state)),
+            ('load_file_btn', dict(state=load_file_btn_state)),
+            ('generate_btn', dict(state=generate_btn_state, text=generate_btn_text)),
+            ('queue_add_btn', dict(state=queue_add_btn_state)),
+            ('export_chapters_btn', dict(state=queue_add_btn_state)),
+            ('save_btn', dict(state=save_btn_state)),
+            ('export_formats_btn', dict(state=save_btn_state)),
+            ('play_pause_btn', dict(state=play_pause_btn_state, text=play_pause_text)),
+            ('next_btn', dict(state=next_btn_state)),
+            ('stop_btn', dict(state=stop_btn_state)),
+            ('rewind_btn', dict(state=seek_btns_state)),
+            ('forward_btn', dict(state=seek_btns_state)),
+        ]
+
         # Apply states to widgets (use try-except for safety during init)
         try:
             # Use 'winfo_exists' for safety, especially during init/close
-            if hasattr(self, 'theme_switch') and self.theme_switch.winfo_exists(): self.theme_switch.configure(state=theme_switch_state)
-            if hasattr(self, 'voice_dropdown') and self.voice_dropdown.winfo_exists(): self.voice_dropdown.configure(state=voice_ctrl_state)
-            if hasattr(self, 'voice_search_entry') and self.voice_search_entry.winfo_exists(): self.voice_search_entry.configure(state=voice_ctrl_state)
-            if hasattr(self, 'rate_slider') and self.rate_slider.winfo_exists(): self.rate_slider.configure(state=adj_ctrl_state)
-            if hasattr(self, 'pitch_slider') and self.pitch_slider.winfo_exists(): self.pitch_slider.configure(state=adj_ctrl_state)
-            if hasattr(self, 'rate_reset_btn') and self.rate_reset_btn.winfo_exists(): self.rate_reset_btn.configure(state=adj_ctrl_state)
-            if hasattr(self, 'pitch_reset_btn') and self.pitch_reset_btn.winfo_exists(): self.pitch_reset_btn.configure(state=adj_ctrl_state)
-            if hasattr(self, 'textbox') and self.textbox.winfo_exists(): self.textbox.configure(state=textbox_state)
-            if hasattr(self, 'load_file_btn') and self.load_file_btn.winfo_exists(): self.load_file_btn.configure(state=load_file_btn_state)
-            if hasattr(self, 'generate_btn') and self.generate_btn.winfo_exists(): self.generate_btn.configure(state=generate_btn_state, text=generate_btn_text)
-            if hasattr(self, 'save_btn') and self.save_btn.winfo_exists(): self.save_btn.configure(state=save_btn_state)
-
-            if hasattr(self, 'play_pause_btn') and self.play_pause_btn.winfo_exists(): self.play_pause_btn.configure(state=play_pause_btn_state, text=play_pause_text)
-            if hasattr(self, 'next_btn') and self.next_btn.winfo_exists(): self.next_btn.configure(state=next_btn_state)
-            if hasattr(self, 'stop_btn') and self.stop_btn.winfo_exists(): self.stop_btn.configure(state=stop_btn_state)
-            if hasattr(self, 'rewind_btn') and self.rewind_btn.winfo_exists(): self.rewind_btn.configure(state=seek_btns_state)
-            if hasattr(self, 'forward_btn') and self.forward_btn.winfo_exists(): self.forward_btn.configure(state=seek_btns_state)
+            for name, options in desired_states:
+                widget = getattr(self, name, None)
+                if widget is not None and widget.winfo_exists():
+                    self._widget_states.apply(widget, **options)
             for widget in getattr(self, 'chunking_widgets', []):
                 if widget.winfo_exists():
                     if isinstance(widget, ctk.CTkLabel):
-                        widget.configure(text_color=chunking_state_label_color)
+                        self._widget_states.apply(widget, text_color=chunking_state_label_color)
                     else:
-                        widget.configure(state=chunking_state)
+                        self._widget_states.apply(widget, state=chunking_state)
         except Exception as e:
             # This might happen during shutdown if widgets are destroyed
             if "application has been destroyed" not in str(e):
-                 print(f"WARN: Error applying UI state '{state}': {e}")
+                 log.warning("Error applying UI state '%s': %s", state, e)
 
 
     def reset_slider(self, slider_type: str):
@@ -535,16 +738,36 @@ class EdgeTTSUi(ctk.CTk):
         """Updates the Rate percentage label."""
         if hasattr(self, 'rate_value_label'):
              self.rate_value_label.configure(text=f"{int(value):+d}%")
+        self.app.on_inputs_changed()
 
     def update_pitch_label(self, value: float):
         """Updates the Pitch Hertz label."""
         if hasattr(self, 'pitch_value_label'):
              self.pitch_value_label.configure(text=f"{int(value):+d}Hz")
+        self.app.on_inputs_changed()
 
     def voice_selected(self, choice: str):
-        """Callback when a voice is selected from the dropdown. Updates the UI state."""
+        """Callback when a voice is selected from the dropdown. Updates the UI state and plays the voice's preview."""
         current_state = self.app.check_current_audio_state()
         self.set_ui_state(current_state)
+        self.app.on_inputs_changed()
+        self._cancel_voice_hover()
+        self.app.preview_voice(choice)
+
+    def _on_voice_hover(self, event):
+        """<<MenuSelect>> of the voice list: previews the hovered voice once the pointer rests on it."""
+        self._cancel_voice_hover()
+        menu = event.widget
+        index = menu.index("active")
+        if index is None:
+            return
+        name = menu.entrycget(index, "label")
+        self._preview_hover_id = self.after(VOICE_PREVIEW_HOVER_MS, lambda: self.app.preview_voice(name))
+
+    def _cancel_voice_hover(self):
+        if self._preview_hover_id is not None:
+            self.after_cancel(self._preview_hover_id)
+            self._preview_hover_id = None
 
 
     def _on_voice_search(self, event=None):
@@ -555,14 +778,16 @@ class EdgeTTSUi(ctk.CTk):
 
         if not filtered_voices:
             # If no results, display message and disable dropdown
-            self.voice_dropdown.configure(values=["No match found"], state=ctk.DISABLED)
+            self.voice_dropdown.configure(values=["No match found"])
+            self._widget_states.apply(self.voice_dropdown, state=ctk.DISABLED)
             self.voice_dropdown.set("No match found")
             # Trigger UI update after setting invalid selection
             current_state = self.app.check_current_audio_state()
             self.set_ui_state(current_state)
         else:
             # If results found, update list and enable dropdown
-            self.voice_dropdown.configure(values=filtered_voices, state=ctk.NORMAL)
+            self.voice_dropdown.configure(values=filtered_voices)
+            self._widget_states.apply(self.voice_dropdown, state=ctk.NORMAL)
             # Try to keep the current selection if it's still in the filtered list
             if current_selection in filtered_voices:
                 self.voice_dropdown.set(current_selection)
@@ -572,6 +797,7 @@ class EdgeTTSUi(ctk.CTk):
             # Trigger UI update after setting new selection
             current_state = self.app.check_current_audio_state()
             self.set_ui_state(current_state)
+            self.app.prefetch_previews(filtered_voices)
 
     def update_voice_dropdown_ui(self, voice_list: list[str], start_voice: str = None):
         """Updates the voice ComboBox on the main thread."""
@@ -580,7 +806,7 @@ class EdgeTTSUi(ctk.CTk):
         if voice_list:
             self.voice_dropdown.configure(values=voice_list)
             if hasattr(self, 'voice_search_entry') and self.voice_search_entry.winfo_exists():
-                 self.voice_search_entry.configure(state=ctk.NORMAL)
+                 self._widget_states.apply(self.voice_search_entry, state=ctk.NORMAL)
             self.update_status("Ready.")
             # Determine final state based on whether audio is already loaded
             current_state = 'generated' if self.app.audio_file_path else 'idle'
@@ -591,9 +817,10 @@ class EdgeTTSUi(ctk.CTk):
                 self.voice_dropdown.set(voice_list[0]) # Select the first voice by default
         else:
             # If the list is empty (error during load)
-            self.voice_dropdown.configure(values=["No voices found"], state=ctk.DISABLED)
+            self.voice_dropdown.configure(values=["No voices found"])
+            self._widget_states.apply(self.voice_dropdown, state=ctk.DISABLED)
             if hasattr(self, 'voice_search_entry') and self.voice_search_entry.winfo_exists():
-                self.voice_search_entry.configure(state=ctk.DISABLED)
+                self._widget_states.apply(self.voice_search_entry, state=ctk.DISABLED)
             self.update_status("❌ Error: No voices could be loaded.")
             self.set_ui_state('error_no_voices') # Specific error state
 
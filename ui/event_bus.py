@@ -0,0 +1,112 @@
+import queue
+import logging
+from enum import Enum
+from typing import Callable
+
+from config.consts import UI_EVENT_DRAIN_INTERVAL_MS
+
+log = logging.getLogger(__name__)
+
+
+class UiEvent(Enum):
+    STATUS = 1       # (message, UIStatusUpdate)
+    STATE = 2        # (ui state name,)
+    CHUNK_READY = 3  # (audio path, word boundary index, first text offset)
+    ERROR = 5        # (message,)
+    FINISHED = 6     # (number of chunks generated,)
+    CALL = 7         # (callable, args) - run an arbitrary callback on the Tk thread
+    QUEUE = 8        # () - the job queue changed
+
+
+# Events for which only the newest one per drain matters. Maps the event to its coalescing key.
+_COALESCED: dict[UiEvent, Callable[[tuple], object]] = {
+    UiEvent.STATUS: lambda payload: payload[1:2], # One message per status slot (generator/playback/...)
+    UiEvent.STATE: lambda payload: None,
+    UiEvent.QUEUE: lambda payload: None,
+}
+
+
+class UiEventBus:
+    """
+    Thread-safe bridge from worker threads to the Tk main thread.
+    Workers post() typed events into a queue; the Tk thread drains it on a single
+    timer, drops superseded status/state/queue updates and dispatches the rest
+    in order. A failing handler is logged and never stops the timer. Nothing posted here ever touches Tk or the player off the main thread.
+    """
+    def __init__(self, widget, interval_ms: int = UI_EVENT_DRAIN_INTERVAL_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._handlers: dict[UiEvent, list[Callable]] = {}
+        self._after_id: str | None = None
+        self.posted = 0 # Counters for diagnostics
+        self.dispatched = 0
+
+    def subscribe(self, event: UiEvent, handler: Callable):
+        self._handlers.setdefault(event, []).append(handler)
+
+    def post(self, event: UiEvent, *payload):
+        """Queues an event. Safe to call from any thread."""
+        self.posted += 1
+        self._queue.put((event, payload))
+
+    def call(self, callback: Callable, *args):
+        """Runs callback(*args) on the Tk thread with the next drain."""
+        self.post(UiEvent.CALL, callback, args)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass # Widget already destroyed
+            self._after_id = None
+
+    def _collect(self) -> list[tuple[UiEvent, tuple]]:
+        """Takes everything queued so far and removes events superseded by a newer one of the same key."""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        seen = set()
+        kept = []
+        for event, payload in reversed(events):
+            key_of = _COALESCED.get(event)
+            if key_of is not None:
+                key = (event, key_of(payload))
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append((event, payload))
+        kept.reverse()
+        return kept
+
+    def _drain(self):
+        self._after_id = None
+        try:
+            for event, payload in self._collect():
+                self._dispatch(event, payload)
+        finally:
+            self.start()
+
+    def _dispatch(self, event: UiEvent, payload: tuple):
+        try:
+            if event == UiEvent.CALL:
+                handlers = [payload[0]]
+                payload = payload[1]
+            else:
+                handlers = self._handlers.get(event, [])
+            for handler in handlers:
+                try:
+                    handler(*payload)
+                except Exception:
+                    log.exception("Exception in UI event handler for %s", event.name)
+        except Exception:
+            log.exception("Malformed UI event %s: %r", event.name, payload)
+        self.dispatched += 1
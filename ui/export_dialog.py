@@ -0,0 +1,30 @@
+import customtkinter as ctk
+
+from config.consts import EXPORT_FORMATS, EXPORT_DEFAULT_FORMATS
+
+
+class ExportFormatsDialog(ctk.CTkToplevel):
+    """Picks the formats the generated audio is exported to; Export asks for the folder and starts the export."""
+    def __init__(self, master, app: 'EdgeTTSApp'):
+        super().__init__(master)
+        self.app = app
+        self.title("Export Formats")
+        self.resizable(False, False)
+        self.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(self, text="Export the generated audio as:", anchor="w")\
+            .grid(row=0, column=0, padx=15, pady=(15, 5), sticky="ew")
+        self.checkboxes: dict[str, ctk.CTkCheckBox] = {}
+        for row, label in enumerate(EXPORT_FORMATS, 1):
+            checkbox = ctk.CTkCheckBox(self, text=label)
+            checkbox.grid(row=row, column=0, padx=25, pady=3, sticky="w")
+            if label in EXPORT_DEFAULT_FORMATS:
+                checkbox.select()
+            self.checkboxes[label] = checkbox
+        ctk.CTkButton(self, text="Export...", command=self._export)\
+            .grid(row=len(EXPORT_FORMATS) + 1, column=0, padx=15, pady=15, sticky="ew")
+        self.after(100, self.focus)
+
+    def _export(self):
+        labels = [label for label, checkbox in self.checkboxes.items() if checkbox.get()]
+        if labels and self.app.export_formats(labels):
+            self.destroy()
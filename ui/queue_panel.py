@@ -0,0 +1,130 @@
+import logging
+import os
+
+import customtkinter as ctk
+
+from config.consts import JOB_QUEUE_PRIORITIES
+from tts.job_queue import JobQueue, QueuedJob, STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED
+from ui.widget_state import WidgetStateCache
+
+log = logging.getLogger(__name__)
+
+_STATUS_TEXT = {
+    STATUS_QUEUED: "Queued",
+    STATUS_RUNNING: "Generating",
+    STATUS_DONE: "✅ Done",
+    STATUS_FAILED: "❌ Failed",
+}
+
+
+class _JobRow(ctk.CTkFrame):
+    """One job in the queue panel: title, status, progress and the reorder/priority/remove controls."""
+    def __init__(self, master, queue: JobQueue, job_id: str, states: WidgetStateCache):
+        super().__init__(master)
+        self.queue = queue
+        self.job_id = job_id
+        self.states = states
+        self._progress: float | None = None
+        self.grid_columnconfigure(0, weight=1)
+
+        self.title_label = ctk.CTkLabel(self, text="", anchor="w", font=ctk.CTkFont(size=12, weight="bold"))
+        self.title_label.grid(row=0, column=0, padx=(8, 5), pady=(4, 0), sticky="ew")
+        self.status_label = ctk.CTkLabel(self, text="", anchor="e", font=ctk.CTkFont(size=11))
+        self.status_label.grid(row=0, column=1, padx=5, pady=(4, 0), sticky="e")
+        self.priority_menu = ctk.CTkOptionMenu(self, values=list(JOB_QUEUE_PRIORITIES), width=85,
+                                               command=lambda priority: queue.set_priority(job_id, priority))
+        self.priority_menu.grid(row=0, column=2, rowspan=2, padx=5, pady=4)
+        self.up_btn = ctk.CTkButton(self, text="▲", width=28, command=lambda: queue.move(job_id, -1))
+        self.up_btn.grid(row=0, column=3, rowspan=2, padx=(0, 2), pady=4)
+        self.down_btn = ctk.CTkButton(self, text="▼", width=28, command=lambda: queue.move(job_id, 1))
+        self.down_btn.grid(row=0, column=4, rowspan=2, padx=(0, 2), pady=4)
+        self.retry_btn = ctk.CTkButton(self, text="↻", width=28, command=lambda: queue.retry(job_id))
+        self.retry_btn.grid(row=0, column=5, rowspan=2, padx=(0, 2), pady=4)
+        self.remove_btn = ctk.CTkButton(self, text="✕", width=28, fg_color="gray40", command=lambda: queue.remove(job_id))
+        self.remove_btn.grid(row=0, column=6, rowspan=2, padx=(0, 8), pady=4)
+        self.progress_bar = ctk.CTkProgressBar(self, height=8)
+        self.progress_bar.grid(row=1, column=0, columnspan=2, padx=(8, 5), pady=(2, 6), sticky="ew")
+
+    def show(self, job: QueuedJob):
+        """Updates the row from the job, configuring only what changed."""
+        status = _STATUS_TEXT.get(job.status, job.status)
+        if job.status == STATUS_RUNNING and job.total:
+            status = f"Generating {job.done}/{job.total}"
+        elif job.status == STATUS_DONE:
+            status = f"✅ {os.path.basename(job.output_path)}"
+        self.states.apply(self.title_label, text=f"{job.title}  ({job.voice}, {job.rate}, {job.pitch})")
+        self.states.apply(self.status_label, text=status)
+        self.states.apply(self.retry_btn, state=ctk.NORMAL if job.status == STATUS_FAILED else ctk.DISABLED)
+        if self.priority_menu.get() != job.priority:
+            self.priority_menu.set(job.priority)
+        progress = 1.0 if job.status == STATUS_DONE else job.progress
+        if progress != self._progress:
+            self._progress = progress
+            self.progress_bar.set(progress)
+
+
+class QueuePanel(ctk.CTkToplevel):
+    """
+    Window showing the job queue. Rows are kept per job and only re-gridded when the
+    order changes, so the frequent progress refreshes only touch changed widgets.
+    """
+    def __init__(self, master, app: 'EdgeTTSApp'):
+        super().__init__(master)
+        self.app = app
+        self.queue: JobQueue = app.job_queue
+        self.title("Job Queue")
+        self.geometry("680x420")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        self._states = WidgetStateCache()
+        self._rows: dict[str, _JobRow] = {}
+        self._order: list[str] = []
+
+        toolbar = ctk.CTkFrame(self, fg_color="transparent")
+        toolbar.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+        toolbar.grid_columnconfigure(4, weight=1)
+        ctk.CTkButton(toolbar, text="Add Current Text", command=lambda: app.add_snapshot_to_queue(self.priority))\
+            .grid(row=0, column=0, padx=(0, 5))
+        ctk.CTkButton(toolbar, text="Add Files...", command=lambda: app.add_files_to_queue(self.priority))\
+            .grid(row=0, column=1, padx=5)
+        ctk.CTkLabel(toolbar, text="Priority:").grid(row=0, column=2, padx=(10, 5))
+        self.priority_menu = ctk.CTkOptionMenu(toolbar, values=list(JOB_QUEUE_PRIORITIES), width=90)
+        self.priority_menu.set("normal")
+        self.priority_menu.grid(row=0, column=3, padx=(0, 5))
+        ctk.CTkButton(toolbar, text="Clear Finished", width=110, command=self.queue.clear_finished)\
+            .grid(row=0, column=5, padx=(5, 0), sticky="e")
+
+        self.list_frame = ctk.CTkScrollableFrame(self)
+        self.list_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        self.list_frame.grid_columnconfigure(0, weight=1)
+        self.empty_label = ctk.CTkLabel(self.list_frame, text="The queue is empty.", text_color="gray")
+
+        self.output_label = ctk.CTkLabel(self, text=f"Output folder: {self.queue.output_dir}", anchor="w",
+                                         font=ctk.CTkFont(size=11))
+        self.output_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="ew")
+        self.refresh()
+
+    @property
+    def priority(self) -> str:
+        return self.priority_menu.get()
+
+    def refresh(self):
+        jobs = self.queue.jobs()
+        order = [job.job_id for job in jobs]
+        if order != self._order:
+            for job_id in set(self._rows) - set(order):
+                row = self._rows.pop(job_id)
+                self._states.forget(row)
+                row.destroy()
+            for i, job in enumerate(jobs):
+                row = self._rows.get(job.job_id)
+                if row is None:
+                    row = self._rows[job.job_id] = _JobRow(self.list_frame, self.queue, job.job_id, self._states)
+                row.grid(row=i, column=0, padx=2, pady=2, sticky="ew")
+            if jobs:
+                self.empty_label.grid_remove()
+            else:
+                self.empty_label.grid(row=0, column=0, pady=20)
+            self._order = order
+        for job in jobs:
+            self._rows[job.job_id].show(job)
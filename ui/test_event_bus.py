@@ -0,0 +1,37 @@
+from ui.event_bus import UiEvent, UiEventBus
+
+
+class StubWidget:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, interval_ms, callback):
+        self.scheduled.append(callback)
+        return f"after#{len(self.scheduled)}"
+
+
+def test_newest_status_per_slot_wins():
+    bus = UiEventBus(StubWidget())
+    shown = []
+    bus.subscribe(UiEvent.STATUS, lambda message, slot: shown.append((message, slot)))
+    bus.post(UiEvent.STATUS, "chunk 1", "generator")
+    bus.post(UiEvent.STATUS, "playing", "playback")
+    bus.post(UiEvent.STATUS, "chunk 2", "generator")
+    bus._drain()
+    assert shown == [("playing", "playback"), ("chunk 2", "generator")]
+
+
+def test_malformed_event_and_failing_handler_keep_the_bus_running():
+    widget = StubWidget()
+    bus = UiEventBus(widget)
+    finished = []
+    bus.subscribe(UiEvent.STATUS, lambda message, slot: None)
+    bus.subscribe(UiEvent.ERROR, lambda message: 1 / 0)
+    bus.subscribe(UiEvent.FINISHED, finished.append)
+    bus.post(UiEvent.STATUS, "message without a slot")
+    bus.post(UiEvent.ERROR, "boom")
+    bus.post(UiEvent.FINISHED, 3)
+    bus._drain()
+    assert finished == [3]
+    assert bus._after_id is not None
+    assert widget.scheduled == [bus._drain]
@@ -0,0 +1,102 @@
+import re
+
+_WORD_PATTERN = re.compile(r'\S+')
+
+
+def _count_words(text: str) -> int:
+    return sum(1 for _ in _WORD_PATTERN.finditer(text))
+
+
+class TextChangeTracker:
+    """
+    Keeps the character and word count of a Tk text widget up to date incrementally.
+    The widget's Tcl command is wrapped so every insert/delete is seen with its index;
+    only the changed span and the characters directly around it are inspected, so a
+    keystroke costs O(1) regardless of document size.
+    Changes Tk makes without going through the widget command (undo/redo) mark the
+    counts dirty and trigger one full recount on the next read.
+    `revision` grows with every change, so callers can tell whether a copy of the
+    text they made earlier is still current without reading it again.
+    """
+    def __init__(self, text_widget):
+        self.widget = text_widget
+        self.tk = text_widget.tk
+        self._orig = text_widget._w + "_orig"
+        self._char_count = 0
+        self._word_count = 0
+        self._dirty = True
+        self.revision = 0
+        self.tk.call("rename", text_widget._w, self._orig)
+        self.tk.createcommand(text_widget._w, self._proxy)
+
+    @property
+    def char_count(self) -> int:
+        self._recount_if_dirty()
+        return self._char_count
+
+    @property
+    def word_count(self) -> int:
+        self._recount_if_dirty()
+        return self._word_count
+
+    @property
+    def has_text(self) -> bool:
+        """True if the widget contains any non-whitespace character."""
+        return self.word_count > 0
+
+    def _call(self, *args):
+        return self.tk.call((self._orig,) + args)
+
+    def _recount_if_dirty(self):
+        if self._dirty:
+            text = self._call("get", "1.0", "end-1c")
+            self._char_count = len(text)
+            self._word_count = _count_words(text)
+            self._dirty = False
+
+    def _context(self, start: str, end: str) -> tuple[str, str]:
+        """The single characters before start and after end (empty at the buffer edges)."""
+        return self._call("get", f"{start}-1c", start), self._call("get", end, f"{end}+1c")
+
+    def _proxy(self, *args):
+        delta = None
+        command = args[0] if args else None
+        untracked = command == "replace" or (command == "edit" and args[1:2] in (("undo",), ("redo",)))
+        if command in ("insert", "delete") or untracked:
+            self.revision += 1
+        if not self._dirty:
+            try:
+                if command == "insert":
+                    delta = self._insert_delta(args[1], "".join(args[2::2]))
+                elif command == "delete":
+                    delta = self._delete_delta(args[1:])
+                elif untracked:
+                    self._dirty = True
+            except Exception:
+                self._dirty = True
+        result = self._call(*args)
+        if delta is not None:
+            self._char_count += delta[0]
+            self._word_count += delta[1]
+        return result
+
+    def _insert_delta(self, index: str, text: str) -> tuple[int, int]:
+        index = self._call("index", index)
+        if self._call("compare", index, ">", "end-1c"):
+            index = self._call("index", "end-1c") # Tk never inserts after the final newline
+        before, after = self._context(index, index)
+        return len(text), _count_words(before + text + after) - _count_words(before + after)
+
+    def _delete_delta(self, indices: tuple) -> tuple[int, int] | None:
+        if len(indices) not in (1, 2):
+            self._dirty = True
+            return None
+        start = self._call("index", indices[0])
+        end = self._call("index", indices[1] if len(indices) == 2 else f"{start}+1c")
+        if self._call("compare", end, ">", "end-1c"):
+            end = self._call("index", "end-1c") # The final newline can't be deleted
+        if not self._call("compare", start, "<", end):
+            return 0, 0
+        removed = self._call("get", start, end)
+        before, after = self._context(start, end)
+        return -len(removed), _count_words(before + after) - _count_words(before + removed + after)
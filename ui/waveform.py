@@ -0,0 +1,128 @@
+import logging
+import tkinter as tk
+
+import customtkinter as ctk
+
+from config.consts import WAVEFORM_HEIGHT, WAVEFORM_MAX_ZOOM_SECONDS, WAVEFORM_SEEK_DELAY_MS
+
+log = logging.getLogger(__name__)
+
+
+class WaveformOverview(ctk.CTkFrame):
+    """
+    Overview of the generated audio for visual scrubbing, drawn from the app's peak
+    pyramid (app.peaks) as one polygon of a min/max pair per pixel column plus a playhead.
+    Pressing or dragging seeks, the mouse wheel zooms around the pointer (a zoomed view
+    follows the playhead) and a double click shows the whole timeline again.
+    """
+    def __init__(self, master, app, height: int = WAVEFORM_HEIGHT):
+        super().__init__(master, fg_color="transparent")
+        self.app = app
+        self.canvas = tk.Canvas(self, height=height, highlightthickness=0, bd=0, cursor="sb_h_double_arrow",
+                                bg=self._apply_appearance_mode(("gray86", "gray17")))
+        self.canvas.pack(fill="both", expand=True)
+        self._wave = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill=self._apply_appearance_mode(("#3a7ebf", "#4a90d9")),
+                                                outline="", state="hidden")
+        self._playhead = self.canvas.create_line(0, 0, 0, height, fill=self._apply_appearance_mode(("#c0392b", "#ff6b5b")),
+                                                 width=2, state="hidden")
+        self._view: tuple[float, float] | None = None # Visible buckets when zoomed in, None shows the whole timeline
+        self._drag_bucket: float | None = None
+        self._redraw_after: str | None = None
+        self._seek_after: str | None = None
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<ButtonPress-1>", self._on_drag)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_release)
+        self.canvas.bind("<Double-Button-1>", lambda event: self.reset_zoom())
+        self.canvas.bind("<MouseWheel>", lambda event: self._zoom(event.x, 0.5 if event.delta > 0 else 2.0))
+        self.canvas.bind("<Button-4>", lambda event: self._zoom(event.x, 0.5)) # X11 wheel
+        self.canvas.bind("<Button-5>", lambda event: self._zoom(event.x, 2.0))
+
+    def _visible(self) -> tuple[float, float]:
+        if self._view is not None:
+            return self._view
+        return 0.0, float(max(1, len(self.app.peaks) if self.app.peaks is not None else 0))
+
+    def _bucket_at(self, x: float) -> float:
+        start, end = self._visible()
+        return start + (end - start) * min(max(x, 0), self.canvas.winfo_width()) / max(1, self.canvas.winfo_width())
+
+    def _x_of(self, bucket: float) -> float:
+        start, end = self._visible()
+        return (bucket - start) / (end - start) * self.canvas.winfo_width()
+
+    def schedule_redraw(self):
+        """Redraws once the Tk loop is idle, so a burst of new chunks costs one redraw."""
+        if self._redraw_after is None:
+            self._redraw_after = self.after_idle(self.redraw)
+
+    def redraw(self):
+        self._redraw_after = None
+        if not self.canvas.winfo_exists():
+            return
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        peaks = self.app.peaks
+        mins, maxs = peaks.columns(*self._visible(), width) if peaks is not None and width > 1 else ((), ())
+        if len(mins) < 2:
+            self.canvas.itemconfigure(self._wave, state="hidden")
+            self.canvas.itemconfigure(self._playhead, state="hidden")
+            return
+        middle = height / 2
+        top = [value for x, peak in enumerate(maxs) for value in (x, middle - max(peak, 1 / 127) * middle)]
+        bottom = [value for x in range(len(mins) - 1, -1, -1) for value in (x, middle - min(mins[x], -1 / 127) * middle)]
+        self.canvas.coords(self._wave, *top, *bottom)
+        self.canvas.itemconfigure(self._wave, state="normal")
+        self.update_playhead()
+
+    def update_playhead(self):
+        """Moves the playhead to the playback position (called on every playback tick)."""
+        bucket = self._drag_bucket if self._drag_bucket is not None else self.app.overview_position()
+        if bucket is None:
+            self.canvas.itemconfigure(self._playhead, state="hidden")
+            return
+        if self._view is not None and self._drag_bucket is None and not self._view[0] <= bucket < self._view[1]:
+            span = self._view[1] - self._view[0] # Page the zoomed view along with playback
+            self._view = (bucket - span * 0.1, bucket + span * 0.9)
+            self.schedule_redraw()
+        x = self._x_of(bucket)
+        self.canvas.coords(self._playhead, x, 0, x, self.canvas.winfo_height())
+        self.canvas.itemconfigure(self._playhead, state="normal")
+
+    def reset_zoom(self):
+        self._view = None
+        self.schedule_redraw()
+
+    def _zoom(self, x: float, factor: float):
+        peaks = self.app.peaks
+        if peaks is None or not len(peaks):
+            return
+        start, end = self._visible()
+        anchor = self._bucket_at(x)
+        span = max(WAVEFORM_MAX_ZOOM_SECONDS / peaks.bucket_seconds, (end - start) * factor)
+        if span >= len(peaks):
+            self._view = None
+        else:
+            start = min(max(0.0, anchor - (anchor - start) * span / (end - start)), len(peaks) - span)
+            self._view = (start, start + span)
+        self.schedule_redraw()
+
+    def _on_drag(self, event):
+        if self.app.peaks is None or not len(self.app.peaks):
+            return
+        self._drag_bucket = min(self._bucket_at(event.x), len(self.app.peaks) - 1)
+        self.update_playhead()
+        # Seeking may rebuild the player queue, so it waits until the pointer rests
+        if self._seek_after is not None:
+            self.after_cancel(self._seek_after)
+        self._seek_after = self.after(WAVEFORM_SEEK_DELAY_MS, self._seek)
+
+    def _on_release(self, event):
+        if self._seek_after is not None:
+            self.after_cancel(self._seek_after)
+            self._seek()
+        self._drag_bucket = None
+
+    def _seek(self):
+        self._seek_after = None
+        if self._drag_bucket is not None:
+            self.app.seek_to_overview_position(self._drag_bucket)
@@ -0,0 +1,32 @@
+class WidgetStateCache:
+    """
+    Remembers the options last applied to each widget so set_ui_state only calls
+    configure() (and triggers a CustomTkinter redraw) for options that actually changed.
+    Code that configures a tracked option directly must go through apply() or forget().
+    """
+    def __init__(self):
+        self._applied: dict[object, dict[str, object]] = {}
+        self.configure_calls = 0 # Number of configure() calls actually issued, for diagnostics
+        self.skipped_calls = 0 # Number of apply() calls that were a no-op
+
+    def apply(self, widget, **options) -> bool:
+        """Configures only the changed options of widget. Returns True if anything was applied."""
+        last = self._applied.get(widget)
+        if last is None:
+            changed = options
+        else:
+            changed = {key: value for key, value in options.items() if key not in last or last[key] != value}
+        if not changed:
+            self.skipped_calls += 1
+            return False
+        widget.configure(**changed)
+        self.configure_calls += 1
+        self._applied.setdefault(widget, {}).update(changed)
+        return True
+
+    def forget(self, widget=None):
+        """Drops the snapshot of one widget (or all), so the next apply() reconfigures it."""
+        if widget is None:
+            self._applied.clear()
+        else:
+            self._applied.pop(widget, None)